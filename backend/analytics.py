@@ -0,0 +1,195 @@
+# backend/analytics.py
+
+"""
+Per-skill and per-cohort score rollups for GET /analytics.
+
+results_store.write_results appends one line per structured result to
+instance/responses/scores_index.jsonl. Each process folds in only the lines
+added since it last looked, updating running counts, sums and score/level
+distributions, so the analytics endpoint never re-reads result files.
+
+Rollups count each student's latest evaluation per rubric: when a student is
+re-evaluated their previous scores are subtracted before the new ones are
+added. Students are grouped by rubric hash (skills differ between rubrics)
+and, within a rubric, by the "cohort" given with the evaluation request.
+
+Single-transcript evaluations are saved as "anonymous"; they are not one
+student, so they go into a separate per-rubric bucket holding each distinct
+transcript once. "evaluations" counts distinct (email, transcript) pairs,
+so re-saving the same student's transcript (a resumed batch, a cache hit)
+doesn't inflate it.
+"""
+
+import json
+import math
+import os
+import threading
+
+from backend import results_store
+
+NO_COHORT = "unassigned"
+ANONYMOUS = "anonymous"
+
+_state_lock = threading.Lock()
+_pos = 0
+_inode = None
+_members = {}
+_rollups = {}
+_evaluated = {}  # rubric hash -> {(email, transcript id)}
+
+
+def _new_stats():
+    return {"students": 0, "overall": _new_series(), "skills": {}}
+
+
+def _new_series():
+    return {"count": 0, "sum": 0.0, "sumsq": 0.0, "distribution": {}}
+
+
+def _bump(counts, key, sign):
+    counts[key] = counts.get(key, 0) + sign
+    if not counts[key]:
+        del counts[key]
+
+
+def _add_value(series, value, bucket, sign):
+    series["count"] += sign
+    series["sum"] += sign * value
+    series["sumsq"] += sign * value * value
+    _bump(series["distribution"], bucket, sign)
+
+
+def _add(stats, record, sign):
+    """Add (sign=1) or remove (sign=-1) one student's scores."""
+    stats["students"] += sign
+    overall = record.get("overall_score")
+    if overall is not None:
+        # Overall scores are means of skill scores; bucket them to the nearest half point
+        _add_value(stats["overall"], overall, f"{round(overall * 2) / 2:g}", sign)
+    for skill, score in record["scores"].items():
+        series = stats["skills"].setdefault(skill, dict(_new_series(), levels={}))
+        _add_value(series, score, str(score), sign)
+        level = record.get("levels", {}).get(skill)
+        if level:
+            _bump(series["levels"], level, sign)
+
+
+def _apply(record):
+    rubric_hash = record.get("rubric_hash") or "unknown"
+    cohort = record.get("cohort") or NO_COHORT
+    entry = _rollups.setdefault(rubric_hash, {"all": _new_stats(), "cohorts": {}, "anonymous": _new_stats()})
+    members = _members.setdefault(rubric_hash, {})
+    # Rows written before transcript ids were indexed fall back to their evaluation time
+    pair = (record["email"], record.get("transcript_id") or record.get("evaluated_at"))
+    evaluated = _evaluated.setdefault(rubric_hash, set())
+    is_new = pair not in evaluated
+    evaluated.add(pair)
+
+    if record["email"] == ANONYMOUS:
+        if is_new:
+            _add(entry["anonymous"], record, 1)
+        return
+
+    previous = members.get(record["email"])
+    if previous is not None:
+        if (previous.get("evaluated_at") or "") > (record.get("evaluated_at") or ""):
+            return  # an older evaluation written late (e.g. a resumed batch) doesn't replace a newer one
+        _add(entry["all"], previous, -1)
+        _add(entry["cohorts"][previous.get("cohort") or NO_COHORT], previous, -1)
+    members[record["email"]] = record
+    _add(entry["all"], record, 1)
+    _add(entry["cohorts"].setdefault(cohort, _new_stats()), record, 1)
+
+
+def _refresh():
+    """Fold in scores_index lines added since the last call (starting over if the index was rebuilt)."""
+    global _pos, _inode, _members, _rollups, _evaluated
+    try:
+        stat = os.stat(results_store.SCORES_PATH)
+    except FileNotFoundError:
+        return
+    if stat.st_ino != _inode or stat.st_size < _pos:
+        _pos, _inode, _members, _rollups, _evaluated = 0, stat.st_ino, {}, {}, {}
+
+    with open(results_store.SCORES_PATH, "rb") as f:
+        f.seek(_pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            _pos += len(line)
+            try:
+                _apply(json.loads(line))
+            except (json.JSONDecodeError, KeyError, AttributeError):
+                continue
+
+
+def _describe(series):
+    count = series["count"]
+    if not count:
+        return {"count": 0, "mean": None, "stdev": None, "distribution": {}}
+    mean = series["sum"] / count
+    variance = max(0.0, series["sumsq"] / count - mean * mean)
+    return {
+        "count": count,
+        "mean": round(mean, 3),
+        "stdev": round(math.sqrt(variance), 3),
+        "distribution": dict(sorted(series["distribution"].items(), key=lambda item: float(item[0])))
+    }
+
+
+def _summary(stats):
+    return {
+        "students": stats["students"],
+        "overall": _describe(stats["overall"]),
+        "skills": {skill: dict(_describe(series), levels=dict(sorted(series["levels"].items())))
+                   for skill, series in stats["skills"].items()}
+    }
+
+
+def _evaluations(rubric_hash):
+    """Distinct (email, transcript) pairs evaluated against rubric_hash, anonymous ones excluded."""
+    return sum(1 for email, _ in _evaluated.get(rubric_hash, ()) if email != ANONYMOUS)
+
+
+def _anonymous(stats):
+    return {"evaluations": stats["students"], "overall_mean": _describe(stats["overall"])["mean"]}
+
+
+def rubrics():
+    """One line per rubric with rollups: students, cohorts and mean overall score."""
+    with _state_lock:
+        _refresh()
+        return [{
+            "rubric_hash": rubric_hash,
+            "students": entry["all"]["students"],
+            "evaluations": _evaluations(rubric_hash),
+            "cohorts": sorted(cohort for cohort, stats in entry["cohorts"].items() if stats["students"]),
+            "overall_mean": _describe(entry["all"]["overall"])["mean"],
+            "anonymous": _anonymous(entry["anonymous"])
+        } for rubric_hash, entry in sorted(_rollups.items())]
+
+
+def rollup(rubric_hash, cohort=None):
+    """
+    Means, standard deviations and score/level distributions per skill (and
+    overall) for one rubric, optionally limited to one cohort. None if the
+    rubric (or cohort) has no structured results.
+    """
+    with _state_lock:
+        _refresh()
+        entry = _rollups.get(rubric_hash)
+        if entry is None:
+            return None
+        if cohort is not None:
+            stats = entry["cohorts"].get(cohort)
+            if stats is None or not stats["students"]:
+                return None
+            return dict(_summary(stats), rubric_hash=rubric_hash, cohort=cohort)
+
+        summary = dict(_summary(entry["all"]), rubric_hash=rubric_hash, cohort=None,
+                       evaluations=_evaluations(rubric_hash), anonymous=_anonymous(entry["anonymous"]))
+        summary["cohorts"] = {
+            name: {"students": stats["students"], "overall_mean": _describe(stats["overall"])["mean"]}
+            for name, stats in sorted(entry["cohorts"].items()) if stats["students"]
+        }
+        return summary
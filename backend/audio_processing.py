@@ -0,0 +1,392 @@
+# backend/audio_processing.py
+
+"""
+Normalization of uploaded recordings before storage and transcription.
+
+Each upload is hashed (SHA-256 of the original bytes), downmixed to mono,
+resampled to SKILLSCOPE_AUDIO_SAMPLE_RATE, stripped of leading and trailing
+silence (ffmpeg silencedetect) and encoded as speech-tuned Opus. The result
+is stored once per content hash, so a duplicate upload only costs the hash:
+
+  instance/uploads/audio/<sha256>.ogg  normalized recording
+  instance/uploads/audio/index.jsonl   append-only, one record per processed
+                                       upload: filename, audio_hash, sizes,
+                                       trimmed range, duplicate flag
+  instance/uploads/audio/index.lock    lock file serializing index writers
+
+The work runs in a process pool (SKILLSCOPE_AUDIO_WORKERS) so decoding and
+hashing large files never hold up request threads.
+
+submit_transcription() chains the two background stages for an upload:
+normalization in the process pool, then Whisper (backend/transcription.py)
+in a thread pool (SKILLSCOPE_TRANSCRIBE_WORKERS). Its status is a small JSON
+file any server process can read:
+
+  instance/uploads/audio/jobs/<id>.json  {"id", "filename", "status":
+                                         processing|done|failed, "transcript",
+                                         "duration", "cached", "audio", "error"}
+
+A job whose process died before it finished reads as failed ("interrupted");
+POST /transcribe still transcribes the stored recording on demand. The original upload is
+removed once its normalized copy is stored, unless
+SKILLSCOPE_KEEP_ORIGINAL_AUDIO=1. Without ffmpeg, or when ffmpeg cannot
+decode a file, the original bytes are stored under their hash instead.
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from backend import metrics, transcription
+from backend.chunked_uploads import UPLOAD_DIR
+from backend.file_lock import locked
+from backend.logs import get_logger
+
+AUDIO_DIR = os.path.join(UPLOAD_DIR, "audio")
+INDEX_PATH = os.path.join(AUDIO_DIR, "index.jsonl")
+LOCK_PATH = os.path.join(AUDIO_DIR, "index.lock")
+JOBS_DIR = os.path.join(AUDIO_DIR, "jobs")
+
+WORKERS = int(os.getenv("SKILLSCOPE_AUDIO_WORKERS", "2"))
+TRANSCRIBE_WORKERS = int(os.getenv("SKILLSCOPE_TRANSCRIBE_WORKERS", "4"))
+KEEP_ORIGINALS = os.getenv("SKILLSCOPE_KEEP_ORIGINAL_AUDIO", "0") == "1"
+SILENCE_DB = float(os.getenv("SKILLSCOPE_SILENCE_DB", "-45"))
+SILENCE_MIN_SECONDS = 0.5
+# Kept on either side of the speech so trimming never clips a first or last word
+SILENCE_PAD_SECONDS = 0.25
+PROCESS_TIMEOUT = float(os.getenv("SKILLSCOPE_AUDIO_TIMEOUT_SECONDS", "600"))
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_SILENCE_START_RE = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end: (\d+(?:\.\d+)?)")
+_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+log = get_logger("audio")
+
+_executor = None
+_transcriber = None
+_executor_lock = threading.Lock()
+_pending = {}
+_state_lock = threading.Lock()
+_records = {}
+_first_by_hash = {}
+_pos = 0
+_inode = None
+
+
+class AudioError(Exception):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ---- worker side ----
+
+def silence_bounds(path):
+    """
+    (start, end, duration) in seconds of the part of the recording to keep:
+    everything between leading and trailing silence, padded a little.
+    """
+    result = transcription.run_ffmpeg(["-i", path, "-vn", "-af",
+                                       f"silencedetect=noise={SILENCE_DB}dB:d={SILENCE_MIN_SECONDS}",
+                                       "-f", "null", "-"])
+    times = _TIME_RE.findall(result.stderr)
+    if result.returncode != 0 or not times:
+        raise AudioError(f"ffmpeg could not decode the recording: {result.stderr.strip()[-300:]}")
+    hours, minutes, seconds = times[-1]
+    duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    starts = [float(value) for value in _SILENCE_START_RE.findall(result.stderr)]
+    ends = [float(value) for value in _SILENCE_END_RE.findall(result.stderr)]
+    keep_from, keep_until = 0.0, duration
+    if starts and starts[0] <= 0.1 and ends:
+        keep_from = max(ends[0] - SILENCE_PAD_SECONDS, 0.0)
+    # Silence that runs to the end has no silence_end, or one at the very end
+    if starts and (len(ends) < len(starts) or ends[-1] >= duration - 0.1) and starts[-1] > keep_from:
+        keep_until = min(starts[-1] + SILENCE_PAD_SECONDS, duration)
+    if keep_until - keep_from < SILENCE_MIN_SECONDS:
+        return 0.0, duration, duration  # (nearly) all silence: keep it as it is
+    return keep_from, keep_until, duration
+
+
+def _original_name(path, content_hash):
+    return f"{content_hash}{os.path.splitext(path)[1].lower() or '.bin'}"
+
+
+def _stored_name(path, content_hash):
+    """Name of an already stored copy of this content (normalized or as uploaded), or None."""
+    for name in (f"{content_hash}.ogg", _original_name(path, content_hash)):
+        if os.path.exists(os.path.join(AUDIO_DIR, name)):
+            return name
+    return None
+
+
+def _store_original(path, content_hash, keep_original):
+    name = _original_name(path, content_hash)
+    target = os.path.join(AUDIO_DIR, name)
+    if keep_original:
+        shutil.copyfile(path, f"{target}.tmp")
+        os.replace(f"{target}.tmp", target)
+    else:
+        os.replace(path, target)
+    return name
+
+
+def _normalize(path, filename, keep_original):
+    """Process-pool side of submit(): hash, dedupe, trim, encode, index. Returns the index record."""
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    content_hash = transcription.audio_hash(path)
+    record = {
+        "filename": filename, "audio_hash": content_hash, "original_bytes": os.path.getsize(path),
+        "duplicate": False, "normalized": False, "processed_at": _now()
+    }
+
+    stored = _stored_name(path, content_hash)
+    if stored is not None:
+        record.update(duplicate=True, normalized=stored.endswith(".ogg"))
+    elif transcription.FFMPEG:
+        try:
+            keep_from, keep_until, duration = silence_bounds(path)
+            # ffmpeg picks the container from the extension, so the temp name ends in .ogg too
+            tmp_path = os.path.join(AUDIO_DIR, f"{content_hash}.{os.getpid()}.part.ogg")
+            transcription.encode_speech(path, tmp_path, keep_from, keep_until - keep_from)
+            stored = f"{content_hash}.ogg"
+            os.replace(tmp_path, os.path.join(AUDIO_DIR, stored))
+            record.update(normalized=True, duration=round(duration, 3),
+                          trimmed=[round(keep_from, 3), round(keep_until, 3)])
+        except (AudioError, transcription.TranscriptionError, OSError) as e:
+            log.warning("⚠️ Storing %s as uploaded: %s", filename, e)
+    if stored is None:
+        stored = _store_original(path, content_hash, keep_original)
+    elif not keep_original:
+        os.remove(path)
+
+    record.update(stored_as=stored, stored_bytes=os.path.getsize(os.path.join(AUDIO_DIR, stored)))
+    with locked(LOCK_PATH):
+        with open(INDEX_PATH, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    return record
+
+
+# ---- request side ----
+
+def _context():
+    # Forking a threaded server process can copy held locks into the child; start workers clean
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=_context())
+        return _executor
+
+
+def _refresh():
+    """Fold in index lines added (by any process) since the last call."""
+    global _pos, _inode, _records, _first_by_hash
+    try:
+        stat = os.stat(INDEX_PATH)
+    except FileNotFoundError:
+        return
+    if stat.st_ino != _inode or stat.st_size < _pos:
+        _pos, _inode, _records, _first_by_hash = 0, stat.st_ino, {}, {}
+
+    with open(INDEX_PATH, "rb") as f:
+        f.seek(_pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            _pos += len(line)
+            try:
+                record = json.loads(line)
+                _records[record["filename"]] = record
+                _first_by_hash.setdefault(record["audio_hash"], record["filename"])
+            except (json.JSONDecodeError, KeyError):
+                continue
+
+
+def _describe(record):
+    """Index record plus duplicate_of: the first upload with the same content."""
+    with _state_lock:
+        _refresh()
+        first = _first_by_hash.get(record["audio_hash"])
+    if record["duplicate"] and first and first != record["filename"]:
+        return dict(record, duplicate_of=first)
+    return dict(record)
+
+
+def _finished(filename, future):
+    with _state_lock:
+        if _pending.get(filename) is future:
+            del _pending[filename]
+    if future.cancelled() or future.exception() is not None:
+        return
+    record = future.result()
+    metrics.AUDIO_BYTES.inc(record["original_bytes"], stage="original")
+    if not record["duplicate"]:
+        metrics.AUDIO_BYTES.inc(record["stored_bytes"], stage="stored")
+
+
+def submit(path, filename=None):
+    """Queue an upload for normalization; returns a Future of its index record."""
+    filename = filename or os.path.basename(path)
+    future = _get_executor().submit(_normalize, os.path.abspath(path), filename, KEEP_ORIGINALS)
+    with _state_lock:
+        _pending[filename] = future
+    future.add_done_callback(lambda done: _finished(filename, done))
+    return future
+
+
+def process(path, filename=None):
+    """Normalize an upload and wait for it. Returns its record (see _describe)."""
+    return _describe(submit(path, filename).result(timeout=PROCESS_TIMEOUT))
+
+
+def lookup(filename):
+    """The latest record for an uploaded filename, or None."""
+    with _state_lock:
+        _refresh()
+        record = _records.get(filename)
+    return _describe(record) if record else None
+
+
+def resolve(filename):
+    """
+    The record for filename, waiting for its normalization if it is still
+    running here and processing it now if nobody has (e.g. uploaded before
+    this stage existed). Raises FileNotFoundError if there is no such upload.
+    """
+    with _state_lock:
+        future = _pending.get(filename)
+    if future is not None:
+        return _describe(future.result(timeout=PROCESS_TIMEOUT))
+
+    record = lookup(filename)
+    if record is not None and os.path.exists(stored_path(record)):
+        return record
+    original = os.path.join(UPLOAD_DIR, filename)
+    try:
+        return process(original, filename)
+    except FileNotFoundError:
+        # Another server process may have just finished it
+        record = lookup(filename)
+        if record is None:
+            raise
+        return record
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _write_job(job):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = _job_path(job["id"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+
+def _get_transcriber():
+    global _transcriber
+    with _executor_lock:
+        if _transcriber is None:
+            _transcriber = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe")
+        return _transcriber
+
+
+def _transcribe_job(job, normalized):
+    """Transcriber side of submit_transcription(): Whisper on the normalized recording, then record the outcome."""
+    try:
+        if normalized.cancelled():
+            raise AudioError("interrupted")
+        record = _describe(normalized.result())
+        result = transcription.transcribe_file(stored_path(record), content_hash=record["audio_hash"])
+        job.update(status="done", transcript={"text": result["text"], "segments": result["segments"],
+                                              "speaker_labels": []},
+                   duration=result["duration"], cached=result["cached"], audio=record)
+        log.info("✅ Transcribed %s (job %s)", job["filename"], job["id"])
+    except Exception as e:
+        log.exception("❌ Transcription job %s failed: %s", job["id"], e)
+        job.update(status="failed", error=str(e))
+    job["finished_at"] = _now()
+    _write_job(job)
+
+
+def _queue_transcription(job, normalized):
+    try:
+        _get_transcriber().submit(_transcribe_job, job, normalized)
+    except RuntimeError:
+        # Shutting down: the recording is stored (or still uploaded), POST /transcribe picks it up
+        job.update(status="failed", error="interrupted", finished_at=_now())
+        _write_job(job)
+
+
+def submit_transcription(path, filename=None):
+    """
+    Normalize an upload and then transcribe it, both in the background.
+    Returns the job id; transcription_job() reports its progress and result.
+    """
+    filename = filename or os.path.basename(path)
+    job = {"id": uuid.uuid4().hex, "filename": filename, "status": "processing", "pid": os.getpid(),
+           "created_at": _now()}
+    _write_job(job)
+    normalized = submit(path, filename)
+    normalized.add_done_callback(lambda done: _queue_transcription(job, done))
+    return job["id"]
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def transcription_job(job_id):
+    """The job record for job_id (see submit_transcription), or None if there is no such job."""
+    if not _JOB_ID_RE.match(job_id or ""):
+        return None
+    try:
+        with open(_job_path(job_id), "r") as f:
+            job = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if job["status"] == "processing" and not _alive(job.get("pid", 0)):
+        job.update(status="failed", error="interrupted")
+    return job
+
+
+def shutdown():
+    """
+    Finish the recordings being processed and their transcriptions; queued
+    ones are processed on demand by resolve() later.
+    """
+    global _executor, _transcriber
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+    with _executor_lock:
+        transcriber, _transcriber = _transcriber, None
+    if transcriber is not None:
+        transcriber.shutdown(wait=True)
+
+
+def stored_path(record):
+    return os.path.join(AUDIO_DIR, record["stored_as"])
@@ -0,0 +1,291 @@
+# backend/batch_eval.py
+
+"""
+Batch-API evaluation mode for the llm_assess_interviews CLI.
+
+All pending transcripts are written into one batch-input JSONL (one
+/v1/chat/completions request per transcript), submitted, polled until the
+batch finishes, and mapped back to emails in the usual
+llm_eval_responses_*.jsonl format.
+
+Progress is checkpointed under instance/batches/<input hash>.json after every
+step, so an interrupted run picks up the same batch instead of resubmitting.
+The "stub" backend completes batches locally for offline testing.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from backend import structured_scores
+from backend.registry import DEFAULT_PROMPT
+from backend.rubric import compile_rubric
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BATCH_DIR = os.path.join(BASE_DIR, "instance", "batches")
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class OpenAIBatchBackend:
+    """Submits to the provider's Batch API through the shared OpenAI client."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from backend.llm_client import get_client
+            client = get_client()
+        self.client = client
+
+    def upload(self, path):
+        with open(path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create(self, input_file_id):
+        batch = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id
+        }
+
+    def download(self, file_id):
+        return self.client.files.content(file_id).text
+
+
+class StubBatchBackend:
+    """
+    Offline stand-in: stores files under instance/batches/stub/ and finishes a
+    batch after `polls_to_complete` status checks with canned completions.
+    """
+
+    def __init__(self, polls_to_complete=2, reply="Score: 3\nFeedback: Clear and well reasoned (stub batch)."):
+        self.dir = os.path.join(BATCH_DIR, "stub")
+        self.polls_to_complete = polls_to_complete
+        self.reply = reply
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _load(self, batch_id):
+        with open(self._path(f"{batch_id}.json"), "r") as f:
+            return json.load(f)
+
+    def _save(self, batch):
+        with open(self._path(f"{batch['id']}.json"), "w") as f:
+            json.dump(batch, f)
+
+    def upload(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        file_id = f"file-stub-{hashlib.sha256(data).hexdigest()[:16]}"
+        with open(self._path(file_id), "wb") as f:
+            f.write(data)
+        return file_id
+
+    def create(self, input_file_id):
+        batch = {"id": f"batch-stub-{os.urandom(6).hex()}", "input_file_id": input_file_id,
+                 "status": "validating", "polls": 0, "output_file_id": None, "error_file_id": None}
+        self._save(batch)
+        return batch["id"]
+
+    def retrieve(self, batch_id):
+        batch = self._load(batch_id)
+        batch["polls"] += 1
+        if batch["status"] not in FINISHED_STATUSES:
+            if batch["polls"] >= self.polls_to_complete:
+                batch["output_file_id"] = self._complete(batch)
+                batch["status"] = "completed"
+            else:
+                batch["status"] = "in_progress"
+        self._save(batch)
+        return {k: batch[k] for k in ("status", "output_file_id", "error_file_id")}
+
+    def _complete(self, batch):
+        output_id = f"{batch['input_file_id']}-output"
+        with open(self._path(batch["input_file_id"]), "r") as infile, open(self._path(output_id), "w") as out:
+            for line in infile:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                out.write(json.dumps({
+                    "id": f"batch_req_{os.urandom(4).hex()}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": {
+                        "model": request["body"]["model"],
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply}}]
+                    }},
+                    "error": None
+                }) + "\n")
+        return output_id
+
+    def download(self, file_id):
+        with open(self._path(file_id), "r") as f:
+            return f.read()
+
+
+def get_backend(name):
+    if name == "stub":
+        return StubBatchBackend()
+    if name == "openai":
+        return OpenAIBatchBackend()
+    raise ValueError(f"Unknown batch backend: {name}")
+
+
+def build_batch_lines(blocks, model, build_system_prompt):
+    """
+    One batch request per transcript. custom_id is "<block>:<transcript>" so
+    results can be mapped back. blocks is a list of request blocks.
+    """
+    lines = []
+    for b, block in enumerate(blocks):
+        system_prompt = build_system_prompt(block["rubric_csv"], block.get("evaluation_prompt", DEFAULT_PROMPT))
+        response_format = structured_scores.response_format(compile_rubric(block["rubric_csv"]), model)
+        for t, entry in enumerate(block.get("transcripts", [])):
+            body = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Student's transcript:\n\n{entry.get('transcript', '')}"}
+                ],
+                "temperature": 0.3
+            }
+            if response_format:
+                body["response_format"] = response_format
+            lines.append(json.dumps({
+                "custom_id": f"{b}:{t}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            }, sort_keys=True))
+    return lines
+
+
+def _parse_output(text):
+    """custom_id -> feedback (or an [ERROR] string) from a batch output/error file."""
+    feedback = {}
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        if item.get("error") or response.get("status_code", 200) != 200:
+            error = item.get("error") or body.get("error") or {"status_code": response.get("status_code")}
+            feedback[item["custom_id"]] = f"[ERROR] Batch request failed: {json.dumps(error)}"
+            continue
+        try:
+            feedback[item["custom_id"]] = body["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError):
+            feedback[item["custom_id"]] = "[ERROR] Batch response had no completion"
+    return feedback
+
+
+def _checkpoint_path(key):
+    return os.path.join(BATCH_DIR, f"{key}.json")
+
+
+def save_checkpoint(checkpoint):
+    checkpoint["updated_at"] = _now()
+    path = _checkpoint_path(checkpoint["key"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_batch(blocks, model, backend, build_system_prompt, poll_interval=30.0, log=print):
+    """
+    Submit (or resume) the batch for these blocks and wait for it.
+    Returns (per-block result lists, checkpoint); a checkpoint whose stage is
+    "done" means a previous run already wrote these results. Results use the same
+    {"email", "feedback", "evaluated_at", ...} shape as synchronous scoring.
+    """
+    lines = build_batch_lines(blocks, model, build_system_prompt)
+    payload = "\n".join(lines) + "\n"
+    key = hashlib.sha256(f"{model}\n{payload}".encode("utf-8")).hexdigest()[:24]
+
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    checkpoint_path = _checkpoint_path(key)
+    input_path = os.path.join(BATCH_DIR, f"{key}.input.jsonl")
+    save = save_checkpoint
+
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+        log(f"🔁 Resuming batch checkpoint {key} (stage: {checkpoint['stage']})")
+    else:
+        with open(input_path, "w") as f:
+            f.write(payload)
+        checkpoint = {"key": key, "stage": "written", "model": model, "requests": len(lines),
+                      "input_path": input_path, "created_at": _now()}
+        save(checkpoint)
+        log(f"📝 Wrote {len(lines)} request(s) to {input_path}")
+
+    if checkpoint["stage"] == "written":
+        checkpoint["input_file_id"] = backend.upload(input_path)
+        checkpoint["stage"] = "uploaded"
+        save(checkpoint)
+        log(f"⬆️  Uploaded batch input as {checkpoint['input_file_id']}")
+
+    if checkpoint["stage"] == "uploaded":
+        checkpoint["batch_id"] = backend.create(checkpoint["input_file_id"])
+        checkpoint["stage"] = "submitted"
+        save(checkpoint)
+        log(f"📨 Submitted batch {checkpoint['batch_id']}")
+
+    while checkpoint["stage"] == "submitted":
+        status = backend.retrieve(checkpoint["batch_id"])
+        checkpoint.update(status)
+        if status["status"] in FINISHED_STATUSES:
+            checkpoint["stage"] = "finished"
+        save(checkpoint)
+        log(f"⏳ Batch {checkpoint['batch_id']}: {status['status']}")
+        if checkpoint["stage"] != "finished":
+            time.sleep(poll_interval)
+
+    feedback = {}
+    if checkpoint.get("output_file_id"):
+        feedback.update(_parse_output(backend.download(checkpoint["output_file_id"])))
+    if checkpoint.get("error_file_id"):
+        feedback.update(_parse_output(backend.download(checkpoint["error_file_id"])))
+
+    evaluated_at = _now()
+    results = []
+    for b, block in enumerate(blocks):
+        block_results = []
+        for t, entry in enumerate(block.get("transcripts", [])):
+            result = {
+                "email": entry.get("email", "unknown"),
+                "feedback": feedback.get(f"{b}:{t}", f"[ERROR] Batch {checkpoint['status']} without a result"),
+                "batch_id": checkpoint["batch_id"],
+                "evaluated_at": evaluated_at
+            }
+            if entry.get("transcript_id"):
+                result["transcript_id"] = entry["transcript_id"]
+            block_results.append(result)
+        results.append(block_results)
+    return results, checkpoint
+
+
+def finish_checkpoint(checkpoint, output_paths):
+    """Mark the batch's results as written so a rerun doesn't write them twice."""
+    checkpoint["stage"] = "done"
+    checkpoint["output_paths"] = output_paths
+    save_checkpoint(checkpoint)
@@ -0,0 +1,222 @@
+# backend/chunked_uploads.py
+
+"""
+Resumable, chunked audio uploads.
+
+Protocol:
+  init      create an upload session; returns its id and the size limits
+  append    write one chunk at a byte offset; chunks stream straight to disk
+  status    report how many bytes the server has, so a client can resume
+  finalize  move the completed file into instance/uploads/
+
+In-progress uploads live in instance/uploads/.partial/ as <id>.part plus a
+<id>.json session record. Each upload is capped at MAX_UPLOAD_BYTES.
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+from werkzeug.utils import secure_filename
+
+from backend.file_lock import locked
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+UPLOAD_DIR = os.path.join(BASE_DIR, "instance", "uploads")
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, ".partial")
+MAX_UPLOAD_BYTES = int(float(os.getenv("SKILLSCOPE_MAX_UPLOAD_MB", "200")) * 1024 * 1024)
+MAX_CHUNK_BYTES = int(float(os.getenv("SKILLSCOPE_MAX_CHUNK_MB", "8")) * 1024 * 1024)
+STALE_AFTER_SECONDS = float(os.getenv("SKILLSCOPE_UPLOAD_TTL_HOURS", "24")) * 3600
+COPY_BUFFER = 64 * 1024
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """Upload protocol error; status is the HTTP status the route should return."""
+
+    def __init__(self, message, status=400, received=None):
+        super().__init__(message)
+        self.status = status
+        self.received = received
+
+
+def _paths(upload_id):
+    if not _UPLOAD_ID_RE.match(upload_id or ""):
+        raise UploadError("Unknown upload id", status=404)
+    base = os.path.join(PARTIAL_DIR, upload_id)
+    return f"{base}.json", f"{base}.part", f"{base}.lock"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _save(session):
+    meta_path, _, _ = _paths(session["id"])
+    session["updated_at"] = _now()
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(session, f)
+    os.replace(tmp_path, meta_path)
+
+
+def safe_audio_filename(filename):
+    filename = secure_filename(filename or "")
+    if not filename:
+        raise UploadError("Filename is missing")
+    return filename
+
+
+def parse_expected_size(value):
+    """Client-declared upload size as a non-negative int (None stays None)."""
+    if value is None:
+        return None
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise UploadError("size must be an integer", status=400)
+    if size < 0:
+        raise UploadError("size must not be negative", status=400)
+    return size
+
+
+def init_upload(filename, expected_size=None):
+    filename = safe_audio_filename(filename)
+    expected_size = parse_expected_size(expected_size)
+    if expected_size is not None:
+        if expected_size > MAX_UPLOAD_BYTES:
+            raise UploadError(f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit", status=413)
+
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    purge_stale_uploads()
+    session = {
+        "id": uuid.uuid4().hex,
+        "filename": filename,
+        "received": 0,
+        "expected_size": expected_size,
+        "status": "open",
+        "created_at": _now()
+    }
+    _, part_path, _ = _paths(session["id"])
+    open(part_path, "wb").close()
+    _save(session)
+    return session
+
+
+def purge_stale_uploads(max_age_seconds=None):
+    """Delete session files nobody has touched within max_age_seconds."""
+    max_age_seconds = STALE_AFTER_SECONDS if max_age_seconds is None else max_age_seconds
+    if not os.path.isdir(PARTIAL_DIR):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for name in os.listdir(PARTIAL_DIR):
+        path = os.path.join(PARTIAL_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def get_upload(upload_id):
+    meta_path, part_path, _ = _paths(upload_id)
+    try:
+        with open(meta_path, "r") as f:
+            session = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        raise UploadError("Unknown upload id", status=404)
+
+    # The .part file is the source of truth if a write was cut off mid-chunk
+    if session["status"] == "open" and os.path.exists(part_path):
+        session["received"] = os.path.getsize(part_path)
+    return session
+
+
+def append_chunk(upload_id, offset, stream, length=None):
+    """
+    Stream a chunk that starts at byte offset into the upload.
+    Bytes the server already has are skipped, so a client can safely resend
+    a chunk whose acknowledgement was lost. A chunk that is cut short of
+    length, too large, or fails mid-write is rolled back, so the upload only
+    ever grows by whole chunks. Returns the updated session.
+    """
+    _, part_path, lock_path = _paths(upload_id)
+    if offset < 0:
+        raise UploadError("Chunk offset must not be negative", status=400)
+    if length is not None and length > MAX_CHUNK_BYTES:
+        raise UploadError(f"Chunk exceeds the {MAX_CHUNK_BYTES} byte limit", status=413)
+
+    with locked(lock_path):
+        session = get_upload(upload_id)
+        if session["status"] != "open":
+            raise UploadError("Upload already finalized", status=409)
+
+        received = session["received"]
+        if offset > received:
+            raise UploadError("Chunk offset is past the end of the upload", status=409, received=received)
+
+        skip = received - offset
+        written = read = 0
+        try:
+            with open(part_path, "ab") as out:
+                while True:
+                    buf = stream.read(COPY_BUFFER)
+                    if not buf:
+                        break
+                    read += len(buf)
+                    if skip:
+                        dropped = min(skip, len(buf))
+                        buf, skip = buf[dropped:], skip - dropped
+                    if not buf:
+                        continue
+                    written += len(buf)
+                    if written > MAX_CHUNK_BYTES or received + written > MAX_UPLOAD_BYTES:
+                        raise UploadError("Upload exceeds the size limit", status=413, received=received)
+                    out.write(buf)
+            if length is not None and read < length:
+                raise UploadError(f"Chunk ended after {read} of {length} bytes", status=400, received=received)
+        except Exception:
+            # Roll back the partial chunk so the client can resume cleanly
+            with open(part_path, "ab") as out:
+                out.truncate(received)
+            raise
+
+        session["received"] = received + written
+        _save(session)
+        return session
+
+
+def finalize_upload(upload_id, expected_size=None):
+    """Move the completed upload into UPLOAD_DIR. Returns (session, final_path)."""
+    _, part_path, lock_path = _paths(upload_id)
+    with locked(lock_path):
+        session = get_upload(upload_id)
+        if session["status"] != "open":
+            raise UploadError("Upload already finalized", status=409)
+
+        expected_size = parse_expected_size(expected_size if expected_size is not None
+                                            else session.get("expected_size"))
+        if expected_size is not None and expected_size != session["received"]:
+            raise UploadError(
+                f"Upload incomplete: have {session['received']} of {expected_size} bytes",
+                status=409, received=session["received"]
+            )
+
+        final_path = os.path.join(UPLOAD_DIR, session["filename"])
+        os.replace(part_path, final_path)
+        session["status"] = "complete"
+        session["completed_at"] = _now()
+        _save(session)
+
+    try:
+        os.remove(lock_path)
+    except OSError:
+        pass
+    return session, final_path
@@ -0,0 +1,165 @@
+# backend/eval_cache.py
+
+"""
+Persistent, content-addressed cache for LLM evaluation results.
+Entries are keyed by a SHA-256 of the normalized rubric CSV, the built system
+prompt, the model name, the transcript text and (for packed scoring) the
+request variant, and stored as small JSON files
+under instance/cache/evaluations/. Old entries expire by age and the cache is
+trimmed (least recently used first) when it grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from backend import metrics
+from backend.rubric import normalize_rubric_csv
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.getenv("SKILLSCOPE_EVAL_CACHE_DIR", os.path.join(BASE_DIR, "instance", "cache", "evaluations"))
+MAX_AGE_SECONDS = float(os.getenv("SKILLSCOPE_EVAL_CACHE_MAX_AGE_DAYS", "30")) * 86400
+MAX_BYTES = int(float(os.getenv("SKILLSCOPE_EVAL_CACHE_MAX_MB", "50")) * 1024 * 1024)
+EVICT_EVERY = 50  # check the size limit once per this many writes
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "writes": 0, "evicted": 0}
+
+
+def cache_key(rubric_csv, system_prompt, model, transcript_text, variant=None):
+    """
+    variant separates results produced by a different request shape for the
+    same inputs (e.g. "packed": scored inside a multi-transcript prompt), so
+    single-transcript lookups never return them.
+    """
+    parts = [normalize_rubric_csv(rubric_csv), system_prompt, model, transcript_text]
+    if variant:
+        parts.append(variant)
+    material = json.dumps(parts)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+# Lookup outcomes also feed skillscope_cache_requests_total
+_METRIC_RESULTS = {"hits": "hit", "misses": "miss", "bypassed": "bypass"}
+
+
+def _count(name, n=1):
+    with _lock:
+        _stats[name] += n
+    if name in _METRIC_RESULTS:
+        metrics.CACHE_REQUESTS.inc(n, cache="evaluation", result=_METRIC_RESULTS[name])
+
+
+def get(key, bypass=False):
+    """Return the cached value for key, or None on a miss / expired entry / bypass."""
+    if bypass:
+        record_lookup(False, bypass=True)
+        return None
+    value = peek(key)
+    record_lookup(value is not None)
+    return value
+
+
+def peek(key):
+    """
+    Like get(), but not counted as a hit or miss. Callers that try several
+    keys for one logical lookup peek at each and then call record_lookup() once.
+    """
+    path = _entry_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > MAX_AGE_SECONDS:
+            os.remove(path)
+            _count("evicted")
+            return None
+        with open(path, "r") as f:
+            entry = json.load(f)
+        os.utime(path)  # refresh for LRU eviction
+    except (OSError, json.JSONDecodeError):
+        return None
+    return entry.get("value")
+
+
+def contains(key):
+    """True if key has a live entry; not counted as a hit or miss."""
+    path = _entry_path(key)
+    try:
+        return time.time() - os.path.getmtime(path) <= MAX_AGE_SECONDS
+    except OSError:
+        return False
+
+
+def record_lookup(hit, bypass=False):
+    """Count one logical lookup as a hit, miss or bypass."""
+    _count("bypassed" if bypass else "hits" if hit else "misses")
+
+
+def put(key, value):
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "value": value, "stored_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        _stats["writes"] += 1
+        should_evict = _stats["writes"] % EVICT_EVERY == 0
+    if should_evict:
+        evict()
+
+
+def evict(max_bytes=None, max_age_seconds=None):
+    """Drop expired entries, then least-recently-used ones until under max_bytes."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    max_age_seconds = MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+
+    now = time.time()
+    entries = []
+    removed = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if now - st.st_mtime > max_age_seconds:
+                removed += _remove(path)
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        removed += _remove(path)
+        total -= size
+
+    _count("evicted", removed)
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
+
+
+def stats():
+    with _lock:
+        snapshot = dict(_stats)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 4) if lookups else 0.0
+    return snapshot
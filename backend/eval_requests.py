@@ -0,0 +1,210 @@
+# backend/eval_requests.py
+
+"""
+Incremental generation of LLM evaluation request blocks.
+
+A persisted high-water mark (byte offset into submissions.jsonl, or row id
+with the SQLite storage backend) records how far previous runs have read, so
+each new block holds only submissions made since the last one, minus
+transcripts already in the scored index. A full rebuild rescans every
+submission and replaces the request log with a single block: every earlier
+block goes, archived segments included, and the new block records how many
+it replaced under "replaced".
+
+With near-duplicate skipping (SKILLSCOPE_NEAR_DUP_MODE=skip or the
+near_duplicates argument) a student's resubmission that is a near-duplicate
+of one of their already-scored transcripts is left out of the block; "link"
+is passed on to the evaluation, which reuses the near-duplicate's evaluation.
+
+Blocks reference their rubric and prompt in the registry (backend/registry.py)
+by {"id", "version"} instead of embedding the CSV and prompt text.
+
+The request log rotates into compressed segments (backend/log_segments.py);
+iter_blocks() reads across them and compact_requests() drops transcripts
+that have been scored since their block was written.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+from backend import registry, similarity_index
+from backend.file_lock import locked
+from backend.log_segments import SegmentedLog
+from backend.storage import get_storage, SUBMISSIONS_PATH, SCORED_PATH
+from backend.transcript_store import entry_hash
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REQUESTS_PATH = os.path.join(BASE_DIR, "instance", "requests", "llm_eval_requests.jsonl")
+STATE_PATH = os.path.join(BASE_DIR, "instance", "requests", "eval_request_state.json")
+LOCK_PATH = os.path.join(BASE_DIR, "instance", "requests", "eval_requests.lock")
+
+requests_log = SegmentedLog(REQUESTS_PATH, LOCK_PATH, time_field="received_at")
+
+
+def transcript_id(email, transcript):
+    """Same email::transcript hash the transcript store dedupes on."""
+    return entry_hash(email, transcript)
+
+
+def load_scored_ids():
+    """Ids of transcripts that already have an evaluation (see mark_scored)."""
+    return get_storage().load_scored_ids()
+
+
+def mark_scored(results):
+    """Record results (dicts with transcript_id and email) in the scored index."""
+    return get_storage().mark_scored(results)
+
+
+def _load_state():
+    try:
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"submissions_offset": 0, "blocks_written": 0}
+
+
+def _save_state(state):
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def update_state(update):
+    """
+    Call update(state) on the persisted state (high-water mark and block
+    count) under the request lock and save what it leaves, unless it raises.
+    For tools that move the mark, e.g. scripts/import_to_sqlite.py, which
+    translates it to the SQLite backend. Returns update's return value.
+    """
+    with locked(LOCK_PATH):
+        state = _load_state()
+        result = update(state)
+        os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+        _save_state(state)
+    return result
+
+
+def _log_contents():
+    """Blocks and archived segments currently in the request log."""
+    stats = requests_log.stats()
+    live_blocks = 0
+    try:
+        with open(REQUESTS_PATH, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                live_blocks += chunk.count(b"\n")
+    except FileNotFoundError:
+        pass
+    return {"blocks": stats["archived_records"] + live_blocks, "archived_segments": stats["segments"]}
+
+
+def _scored_near_duplicate(tid, email, scored_ids):
+    """An already-scored near-duplicate of transcript tid from the same student, or None."""
+    for match in similarity_index.similar_to(tid) or ():
+        if match["email"] == email and match["transcript_id"] in scored_ids:
+            return match
+    return None
+
+
+def generate_request_block(full=False, near_duplicates=None, rubric_id=None, prompt_id=None):
+    """
+    Append a request block holding only new, unscored transcripts.
+
+    With full=True every submission is rescanned from the start, scored ones
+    included, and the request log is replaced by that single block. This
+    discards every earlier block, compressed archive segments included; the
+    block's "replaced" field ({"blocks", "archived_segments"}) says how many.
+    near_duplicates ("off", "skip" or "link") defaults to SKILLSCOPE_NEAR_DUP_MODE.
+    rubric_id/prompt_id pick registry entries (default SKILLSCOPE_DEFAULT_RUBRIC
+    and SKILLSCOPE_DEFAULT_PROMPT); the block pins their current versions.
+
+    Returns (block, status) where block is None when nothing new was found and
+    status is "success", "empty" or "missing". Raises RegistryError or
+    RubricError for a missing or invalid rubric/prompt.
+    """
+    storage = get_storage()
+    if not storage.has_submissions():
+        return None, "missing"
+    rubric = registry.get_rubric(rubric_id or registry.DEFAULT_RUBRIC_ID)
+    prompt = registry.get_prompt(prompt_id or registry.DEFAULT_PROMPT_ID)
+
+    with locked(LOCK_PATH):
+        state = _load_state()
+        start = 0 if full else state.get(storage.position_key, 0)
+        entries, start, end = storage.read_submissions(start)
+        scored_ids = set() if full else load_scored_ids()
+        mode = near_duplicates or similarity_index.MODE
+
+        transcripts, skipped = [], []
+        seen = set()
+        for email, transcript in entries:
+            tid = transcript_id(email, transcript)
+            if tid in seen or tid in scored_ids:
+                continue
+            seen.add(tid)
+            match = _scored_near_duplicate(tid, email, scored_ids) if mode == "skip" and not full else None
+            if match is not None:
+                skipped.append({"transcript_id": tid, "duplicate_of": match["transcript_id"],
+                                "similarity": match["similarity"]})
+                continue
+            transcripts.append({"email": email, "transcript": transcript, "transcript_id": tid})
+
+        block = None
+        if transcripts:
+            block = {
+                "rubric_ref": registry.reference(rubric),
+                "prompt_ref": registry.reference(prompt),
+                "transcripts": transcripts,
+                "submissions_range": [start, end],
+                "full_rebuild": full,
+                "received_at": datetime.now(timezone.utc).isoformat()
+            }
+            if mode == "link":
+                block["near_duplicates"] = "link"
+            if skipped:
+                block["near_duplicates_skipped"] = skipped
+            os.makedirs(os.path.dirname(REQUESTS_PATH), exist_ok=True)
+            if full:
+                block["replaced"] = _log_contents()
+                tmp_path = f"{REQUESTS_PATH}.tmp"
+                with open(tmp_path, "w") as outfile:
+                    outfile.write(json.dumps(block) + "\n")
+                requests_log.replace(tmp_path)
+            else:
+                with open(REQUESTS_PATH, "a") as outfile:
+                    outfile.write(json.dumps(block) + "\n")
+                requests_log.rotate(by_age=False)
+            state["blocks_written"] = state.get("blocks_written", 0) + 1
+
+        state[storage.position_key] = end
+        state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        _save_state(state)
+
+    return block, "success" if block else "empty"
+
+
+def iter_blocks():
+    """Every request block in the log, archived segments first."""
+    for _, block in requests_log.iter_records():
+        yield block
+
+
+def compact_requests(scored_ids=None):
+    """
+    Drop scored transcripts from archived request blocks, and blocks left
+    empty. Returns the number of transcripts dropped.
+    """
+    scored_ids = load_scored_ids() if scored_ids is None else scored_ids
+    dropped = {"transcripts": 0}
+
+    def unscored(block):
+        transcripts = [t for t in block.get("transcripts", []) if t.get("transcript_id") not in scored_ids]
+        dropped["transcripts"] += len(block.get("transcripts", [])) - len(transcripts)
+        if not transcripts:
+            return None
+        return dict(block, transcripts=transcripts) if len(transcripts) < len(block["transcripts"]) else block
+
+    requests_log.compact(unscored)
+    return dropped["transcripts"]
@@ -0,0 +1,55 @@
+# backend/file_lock.py
+
+"""
+Cross-process lock on a lock file, shared by the instance/ stores.
+Uses fcntl.flock where available; on platforms without it only threads in the
+same process are serialized.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_thread_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _thread_lock(path):
+    with _registry_lock:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def locked(lock_path, blocking=True, shared=False):
+    """
+    Hold an exclusive lock on lock_path for the duration of the block.
+    With blocking=False the block runs either way and receives False if
+    another thread or process already holds the lock. shared=True takes a
+    shared lock across processes (threads of one process still take turns).
+    """
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    thread_lock = _thread_lock(lock_path)
+    if not thread_lock.acquire(blocking):
+        yield False
+        return
+    try:
+        with open(lock_path, "a") as handle:
+            if fcntl:
+                try:
+                    mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+                    fcntl.flock(handle, mode if blocking else mode | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+    finally:
+        thread_lock.release()
@@ -1,58 +1,40 @@
 # backend/generate_llm_eval_requests.py
 
 import os
-import json
-import csv
-from datetime import datetime, timezone
-import io
+import sys
+import argparse
 
-
-# Paths
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-submissions_path = os.path.join(BASE_DIR, "instance", "submissions", "submissions.jsonl")
-requests_path = os.path.join(BASE_DIR, "instance", "requests", "llm_eval_requests.jsonl")
-
-# Placeholder rubric
-RUBRIC_CSV = """Skill,Level,Score,Description
-Prompt Engineering,Missing,0,No prompt or completely irrelevant
-Prompt Engineering,Mastery,4,Clear, efficient, task-optimized
-Reflection,Missing,0,No reflection
-Reflection,Mastery,4,Insightful and thoughtful reflection"""
-
-EVAL_PROMPT = "Evaluate the clarity and intent of each transcript as if submitted by a student in a technical interview."
-
-# Load all submissions
-transcripts = []
-if os.path.exists(submissions_path):
-    with open(submissions_path, "r") as infile:
-        for line in infile:
-            try:
-                entry = json.loads(line)
-                if "email" in entry and "transcript" in entry:
-                    transcripts.append({
-                        "email": entry["email"],
-                        "transcript": entry["transcript"]
-                    })
-            except json.JSONDecodeError:
-                continue
-else:
-    print(f"❌ No submissions file at: {submissions_path}")
+sys.path.insert(0, BASE_DIR)
+
+from backend.eval_requests import generate_request_block, REQUESTS_PATH
+from backend.registry import RegistryError
+from backend.rubric import RubricError
+from backend.storage import get_storage, SUBMISSIONS_PATH
+
+parser = argparse.ArgumentParser(description="Append an LLM evaluation request block for new submissions.")
+parser.add_argument("--full", action="store_true",
+                    help="Rescan every submission (scored ones included) and replace the request log")
+parser.add_argument("--rubric", help="Registered rubric id (instance/rubrics/<id>.csv); default SKILLSCOPE_DEFAULT_RUBRIC")
+parser.add_argument("--prompt", help="Registered prompt id (instance/prompts/<id>.txt); default SKILLSCOPE_DEFAULT_PROMPT")
+args = parser.parse_args()
+
+try:
+    block, status = generate_request_block(full=args.full, rubric_id=args.rubric, prompt_id=args.prompt)
+except (RegistryError, RubricError) as e:
+    print(f"❌ {e}")
     exit(1)
 
-if not transcripts:
-    print("⚠️ No valid transcripts found.")
-    exit(0)
-
-# Write new request block
-new_request = {
-    "rubric_csv": RUBRIC_CSV,
-    "evaluation_prompt": EVAL_PROMPT,
-    "transcripts": transcripts,
-    "received_at": datetime.now(timezone.utc).isoformat()
-}
-
-with open(requests_path, "w") as outfile:
+if status == "missing":
+    storage = get_storage()
+    print(f"❌ No submissions found in {SUBMISSIONS_PATH if storage.name == 'files' else storage.path}")
+    exit(1)
 
-    outfile.write(json.dumps(new_request) + "\n")
+if block is None:
+    print("⚠️ No new unscored transcripts found.")
+    exit(0)
 
-print(f"✅ Appended {len(transcripts)} transcript(s) to {requests_path}")
+if block.get("replaced"):
+    print(f"🗑️  Replaced {block['replaced']['blocks']} earlier block(s) and "
+          f"{block['replaced']['archived_segments']} archived segment(s)")
+print(f"✅ Appended {len(block['transcripts'])} transcript(s) to {REQUESTS_PATH}")
@@ -0,0 +1,120 @@
+# backend/http_cache.py
+
+"""
+Response compression and cache validators for the Flask app.
+
+  compress_response()  after_request hook: gzips JSON/NDJSON/text bodies of at
+                       least SKILLSCOPE_GZIP_MIN_BYTES for clients that accept
+                       it (streamed SSE responses and file passthroughs are
+                       left alone)
+  send_page()          serves a page or static asset with an ETag built from
+                       its mtime and size, Cache-Control and a gzipped copy
+                       that is kept in memory until the file changes
+
+Pages get "no-cache" (revalidate every time, usually a 304), static assets
+are cacheable for SKILLSCOPE_STATIC_MAX_AGE seconds before they revalidate.
+"""
+
+import gzip
+import mimetypes
+import os
+import threading
+
+from flask import abort, request
+from werkzeug.security import safe_join
+
+from backend import metrics
+
+MIN_BYTES = int(os.getenv("SKILLSCOPE_GZIP_MIN_BYTES", "1024"))
+LEVEL = int(os.getenv("SKILLSCOPE_GZIP_LEVEL", "6"))
+STATIC_MAX_AGE = int(os.getenv("SKILLSCOPE_STATIC_MAX_AGE", "3600"))
+# Larger files are sent as they are rather than held in memory compressed
+MAX_CACHED_BYTES = 2 * 1024 * 1024
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "application/javascript", "image/svg+xml")
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def _compressible(mimetype):
+    return mimetype is not None and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE)
+
+
+def accepts_gzip():
+    return "gzip" in request.accept_encodings
+
+
+def compress_response(response):
+    """Gzip a buffered response in place when it is worth it."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers or not _compressible(response.mimetype)):
+        return response
+    response.vary.add("Accept-Encoding")
+    if not accepts_gzip():
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_BYTES:
+        return response
+    compressed = gzip.compress(body, compresslevel=LEVEL)
+    metrics.COMPRESSED_BYTES.inc(len(body), stage="original")
+    metrics.COMPRESSED_BYTES.inc(len(compressed), stage="sent")
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def _load(path, stat):
+    """(body, gzipped body or None) of path, cached by mtime and size."""
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _files_lock:
+        cached = _files.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1], cached[2]
+
+    with open(path, "rb") as f:
+        body = f.read()
+    compressed = None
+    if _compressible(mimetypes.guess_type(path)[0]) and len(body) >= MIN_BYTES:
+        compressed = gzip.compress(body, compresslevel=9)
+    with _files_lock:
+        _files[path] = (stamp, body, compressed)
+    return body, compressed
+
+
+def send_page(folder, filename, max_age=None):
+    """
+    folder/filename with ETag, Cache-Control (public with max_age, else
+    no-cache) and gzip. Answers If-None-Match with 304.
+    """
+    from flask import current_app, send_from_directory
+
+    path = safe_join(os.path.join(current_app.root_path, folder), filename)
+    try:
+        stat = os.stat(path) if path else None
+    except OSError:
+        stat = None
+    if stat is None or not os.path.isfile(path):
+        abort(404)
+    if stat.st_size > MAX_CACHED_BYTES:
+        return send_from_directory(folder, filename, max_age=max_age)
+
+    body, compressed = _load(path, stat)
+    response = current_app.response_class(body, mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream")
+    tag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    if compressed is not None:
+        response.vary.add("Accept-Encoding")
+        if accepts_gzip():
+            response.set_data(compressed)
+            response.headers["Content-Encoding"] = "gzip"
+            # Each representation needs its own validator
+            tag += "-gz"
+    response.set_etag(tag)
+    response.last_modified = stat.st_mtime
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
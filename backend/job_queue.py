@@ -0,0 +1,281 @@
+# backend/job_queue.py
+
+"""
+Local background job queue for LLM evaluations.
+
+Each job is persisted under instance/jobs/:
+  <job_id>.json           job record (status, request block); written when the
+                          job starts and finishes, not per result
+  <job_id>.results.jsonl  one line per finished transcript, tagged with its
+                          index; a running job's progress is its line count
+  <job_id>.lock           held by the process currently running the job
+
+Jobs run on a small worker pool through evaluate_transcript_block. After a
+restart, resume_jobs() picks up queued and running jobs and only scores the
+transcripts that have no result line yet. Finished jobs are also saved to the
+indexed results store (backend/results_store.py) and their transcripts
+marked as scored.
+
+On shutdown, drain() stops taking jobs and waits for the running ones; jobs
+that have not started stay queued on disk for the next process to resume.
+"""
+
+import json
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from backend.file_lock import locked
+from backend.logs import get_logger
+from backend.registry import resolve_block
+from backend.rubric import compile_rubric
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+JOBS_DIR = os.path.join(BASE_DIR, "instance", "jobs")
+MAX_WORKERS = int(os.getenv("SKILLSCOPE_JOB_WORKERS", "2"))
+
+FINISHED_STATUSES = ("done", "failed")
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+log = get_logger("jobs")
+
+_executor = None
+_executor_lock = threading.Lock()
+_job_locks = {}
+_futures = set()
+_draining = False
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _paths(job_id):
+    base = os.path.join(JOBS_DIR, job_id)
+    return f"{base}.json", f"{base}.results.jsonl", f"{base}.lock"
+
+
+def _queue(job_id):
+    """Hand a persisted job to the worker pool; while draining it stays queued on disk instead."""
+    global _executor
+    with _executor_lock:
+        if _draining:
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="eval-job")
+        future = _executor.submit(_run_job, job_id)
+        _futures.add(future)
+    future.add_done_callback(_futures.discard)
+
+
+def _job_lock(job_id):
+    with _executor_lock:
+        return _job_locks.setdefault(job_id, threading.Lock())
+
+
+def is_valid_job_id(job_id):
+    return bool(_JOB_ID_RE.match(job_id or ""))
+
+
+def _write_job(job):
+    job_path, _, _ = _paths(job["id"])
+    job["updated_at"] = _now()
+    tmp_path = f"{job_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, job_path)
+
+
+def load_job(job_id):
+    """The job record; "completed" of an unfinished job is counted from its results file."""
+    if not is_valid_job_id(job_id):
+        return None
+    job_path, _, _ = _paths(job_id)
+    try:
+        with open(job_path, "r") as f:
+            job = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if job["status"] not in FINISHED_STATUSES:
+        job["completed"] = count_results(job_id)
+    return job
+
+
+def count_results(job_id):
+    _, results_path, _ = _paths(job_id)
+    count = 0
+    try:
+        with open(results_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                count += chunk.count(b"\n")
+    except FileNotFoundError:
+        pass
+    return count
+
+
+def read_results(job_id, offset=0):
+    """(results, next_offset): complete result lines from byte offset onwards, in completion order."""
+    _, results_path, _ = _paths(job_id)
+    results = []
+    try:
+        with open(results_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return results, offset
+
+
+def _drop_partial_line(job_id):
+    """Cut a result line half-written by a crashed process, so appends start on a fresh line."""
+    _, results_path, _ = _paths(job_id)
+    _, end = read_results(job_id)
+    try:
+        if os.path.getsize(results_path) > end:
+            log.warning("✂️ Dropping a partial result line of job %s", job_id)
+            os.truncate(results_path, end)
+    except FileNotFoundError:
+        pass
+
+
+def load_results(job_id, start=0):
+    """Result lines from position start onwards, in completion order."""
+    return read_results(job_id)[0][start:]
+
+
+def submit_job(request_block, model="gpt-4", max_in_flight=None, bypass_cache=False, kind="evaluate-transcripts"):
+    """Persist a new job and queue it. Returns the job record."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "model": model,
+        "max_in_flight": max_in_flight,
+        "bypass_cache": bypass_cache,
+        "request_block": request_block,
+        "total": len(request_block.get("transcripts", [])),
+        "completed": 0,
+        "error": None,
+        "created_at": _now()
+    }
+    _write_job(job)
+    _queue(job["id"])
+    return job
+
+
+def resume_jobs():
+    """Re-queue every job a previous process left queued or running."""
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    resumed = []
+    for name in sorted(os.listdir(JOBS_DIR)):
+        if not name.endswith(".json"):
+            continue
+        job = load_job(name[:-len(".json")])
+        if job and job["status"] not in FINISHED_STATUSES:
+            _queue(job["id"])
+            resumed.append(job["id"])
+    if resumed:
+        log.info("🔁 Resuming %d evaluation job(s)", len(resumed))
+    return resumed
+
+
+def drain(timeout=None):
+    """
+    Stop taking jobs and wait up to timeout seconds for the running ones.
+    Returns the number still running when it gave up (they resume on the
+    next start like after a crash).
+    """
+    global _draining
+    with _executor_lock:
+        _draining = True
+        executor, futures = _executor, list(_futures)
+    if executor is None:
+        return 0
+    # Jobs that have not started are left "queued" for resume_jobs()
+    executor.shutdown(wait=False, cancel_futures=True)
+    running = [future for future in futures if not future.cancelled()]
+    if running:
+        log.info("⏳ Waiting for %d running evaluation job(s) to finish", len(running))
+    _, not_done = wait(running, timeout=timeout)
+    if not_done:
+        log.warning("⚠️ %d evaluation job(s) still running at shutdown; they resume on the next start", len(not_done))
+    return len(not_done)
+
+
+def _run_job(job_id):
+    from backend.llm_assess_interviews import evaluate_transcript_block, save_results
+
+    _, results_path, lock_path = _paths(job_id)
+
+    # Another worker process may already own this job after a restart
+    with locked(lock_path, blocking=False) as acquired:
+        if not acquired:
+            return
+
+        job = load_job(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return
+
+        _drop_partial_line(job_id)
+        transcripts = job["request_block"].get("transcripts", [])
+        done = {r["index"] for r in load_results(job_id)}
+        pending = [(i, t) for i, t in enumerate(transcripts) if i not in done]
+
+        job["status"] = "running"
+        job["completed"] = len(done)
+        job.setdefault("started_at", _now())
+        _write_job(job)
+
+        write_lock = _job_lock(job_id)
+
+        def on_result(position, result):
+            index, entry = pending[position]
+            line = dict(result, index=index, name=entry.get("name", "Unknown"))
+            # Only the results file grows per result; load_job() counts its lines for progress
+            with write_lock:
+                with open(results_path, "a") as f:
+                    f.write(json.dumps(line) + "\n")
+                job["completed"] += 1
+
+        block = dict(job["request_block"], transcripts=[t for _, t in pending])
+        packing_stats = {}
+        try:
+            evaluate_transcript_block(block, model=job["model"], max_in_flight=job["max_in_flight"],
+                                      bypass_cache=job["bypass_cache"], on_result=on_result, stats=packing_stats)
+            if packing_stats:
+                job["packing"] = packing_stats
+            # Finished jobs land in the indexed results store like CLI runs do
+            results = [
+                {k: v for k, v in r.items() if k != "index"}
+                for r in sorted(load_results(job_id), key=lambda r: r["index"])
+            ]
+            if results:
+                job["results_file"] = os.path.basename(save_results(
+                    results, compile_rubric(resolve_block(job["request_block"])["rubric_csv"]).content_hash, job["model"]))
+            job["status"] = "done"
+            log.info("✅ Job %s evaluated %d/%d transcript(s).", job_id, job["completed"], job["total"])
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            log.exception("❌ Job %s failed: %s", job_id, e)
+
+        with write_lock:
+            job["finished_at"] = _now()
+            _write_job(job)
+
+
+def job_summary(job):
+    """Job record without the (potentially large) request block."""
+    return {k: v for k, v in job.items() if k != "request_block"}
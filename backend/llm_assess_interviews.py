@@ -1,158 +1,587 @@
 # backend/llm_assess_interviews.py
 
 """
-Batch-assess SkillScope interview transcripts using OpenAI's LLM (v1.x SDK).
-Reads requests from instance/requests/ and writes results to instance/responses/
-with smart filenames.
+Assess SkillScope interview transcripts using OpenAI's LLM (v1.x SDK).
+
+Importing this module has no side effects: it only defines the scoring library
+(client access, prompt building, scoring) used by server.py and the job queue.
+The batch CLI lives in main(), which reads requests from instance/requests/
+and writes results to instance/responses/ with smart filenames:
+
+    python -m backend.llm_assess_interviews [--input ...] [--model ...]
 """
 
 import os
+import sys
 import json
 import argparse
+import queue
+import threading
+import time
 from datetime import datetime, timezone
-from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError
-import re
-import io
 
-# Load environment and initialize OpenAI client
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+if __package__ in (None, ""):
+    # Allow running as a script: python backend/llm_assess_interviews.py
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.scoring_engine import call_with_backoff, score_many, is_rate_limit_error, DEFAULT_MAX_IN_FLIGHT
+from backend import eval_cache
+from backend.rubric import compile_rubric, count_tokens
+from backend import packing
+from backend import registry
+from backend import structured_scores
+from backend import similarity_index
+from backend import results_store
+from backend import metrics
+from backend import rate_limiter
+from backend.logs import configure_logging, get_logger
+from backend.eval_requests import iter_blocks, load_scored_ids, mark_scored, transcript_id, REQUESTS_PATH
+from backend.storage import get_storage
+from backend.llm_client import get_client, openai_errors, CHAT_TIMEOUT
+
+log = get_logger("assess")
 
 # Resolve project base directory
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
-# Argument parser
-parser = argparse.ArgumentParser(description="Evaluate SkillScope interviews using an LLM.")
-parser.add_argument("--input", required=False, help="Path to llm_eval_requests.jsonl")
-parser.add_argument("--output", required=False, help="Optional path to write output .jsonl")
-parser.add_argument("--model", default="gpt-4", help="LLM model to use (default: gpt-4)")
-args = parser.parse_args()
+# Completion tokens budgeted per call by the shared TPM limiter until the real usage is known
+EXPECTED_COMPLETION_TOKENS = 300
 
 # Default input path
-default_input_path = os.path.join(BASE_DIR, "instance", "requests", "llm_eval_requests.jsonl")
+DEFAULT_INPUT_PATH = os.path.join(BASE_DIR, "instance", "requests", "llm_eval_requests.jsonl")
 
 # Smart default output name
 def generate_output_filename(transcripts):
-    email = transcripts[0].get("email", "batch") if transcripts else "batch"
-    user = email.split("@")[0]
-    user = re.sub(r"[^\w\-]", "_", user)
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%MZ")
-    return os.path.join(BASE_DIR, "instance", "responses", f"llm_eval_responses_{user}_{timestamp}.jsonl")
+    return os.path.join(results_store.RESPONSES_DIR, results_store.output_filename(transcripts))
 
-# Build system prompt
+# Build system prompt (compiled and memoized per rubric; raises RubricError on a bad rubric)
 def build_system_prompt(rubric_csv, custom_prompt):
-    lines = rubric_csv.strip().split("\n")
-    readable_rubric = "\n".join(f"• {line}" for line in lines[1:] if line.strip())
-    return f"""You are an expert evaluator for undergraduate student interviews.
-
-Use the following rubric to assess the quality of the responses:
+    return compile_rubric(rubric_csv).system_prompt(custom_prompt)
 
-{readable_rubric}
+# Call OpenAI API through the shared client, paced by the cross-process RPM/TPM limiter
+# (latency and token usage are recorded in backend.metrics)
+def complete_chat(system_prompt, user_content, model, response_format=None):
+    estimated_tokens = count_tokens(system_prompt, model) + count_tokens(user_content, model) + EXPECTED_COMPLETION_TOKENS
+    rate_limiter.acquire({"chat.requests": 1, "chat.tokens": estimated_tokens})
+    extra = {"response_format": response_format} if response_format else {}
 
-Evaluation task:
-{custom_prompt}
-
-Return a score and 1–2 sentences of feedback.
-"""
-
-# Call OpenAI API
-def score_transcript(system_prompt, transcript_text, model):
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Student's transcript:\n\n{transcript_text}"}
+                {"role": "user", "content": user_content}
             ],
-            temperature=0.3
+            temperature=0.3,
+            timeout=CHAT_TIMEOUT,
+            **extra
         )
-        return response.choices[0].message.content.strip()
-    except OpenAIError as e:
-        return f"[ERROR] OpenAI API call failed: {str(e)}"
+        outcome = "ok"
+    finally:
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, outcome=outcome)
 
-# Load requests
-input_path = args.input if args.input else default_input_path
-print(f"📂 Looking at: {input_path}")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+        metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+        rate_limiter.settle("chat.tokens", estimated_tokens, usage.total_tokens)
+    return response.choices[0].message.content.strip()
 
-with open(input_path, "r") as infile:
-    requests = [json.loads(line) for line in infile if line.strip()]
+# Stream a chat completion, yielding text deltas as they arrive. Opening the stream
+# is retried like complete_chat; once tokens have been sent an error is final.
+def stream_chat(system_prompt, user_content, model, response_format=None):
+    estimated_tokens = count_tokens(system_prompt, model) + count_tokens(user_content, model) + EXPECTED_COMPLETION_TOKENS
+    extra = {"response_format": response_format} if response_format else {}
 
-# Evaluate each block
-for request in requests:
-    rubric = request["rubric_csv"]
-    prompt = request["evaluation_prompt"]
-    transcripts = request.get("transcripts", [])
-    system_prompt = build_system_prompt(rubric, prompt)
+    def open_stream():
+        rate_limiter.acquire({"chat.requests": 1, "chat.tokens": estimated_tokens})
+        return get_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            temperature=0.3,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=CHAT_TIMEOUT,
+            **extra
+        )
 
-    current_output_path = args.output or generate_output_filename(transcripts)
+    start = time.perf_counter()
+    outcome = "error"
+    first_token = True
+    try:
+        stream = call_with_backoff(open_stream)
+        for chunk in stream:
+            if chunk.usage is not None:
+                metrics.LLM_TOKENS.inc(chunk.usage.prompt_tokens or 0, model=model, kind="prompt")
+                metrics.LLM_TOKENS.inc(chunk.usage.completion_tokens or 0, model=model, kind="completion")
+                rate_limiter.settle("chat.tokens", estimated_tokens, chunk.usage.total_tokens)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if first_token:
+                    metrics.LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, model=model)
+                    first_token = False
+                yield delta
+        outcome = "ok"
+    finally:
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, outcome=outcome)
 
-    results = []
-    for entry in transcripts:
-        email = entry.get("email", "unknown")
-        transcript_text = entry.get("transcript", "")
-        print(f"🧠 Scoring: {email}...")
+# One extra round asking the model to rewrite a reply that local repair could not match
+# to the rubric; keeps the original reply if the rewrite is no better
+def repair_reply(reply, compiled, model):
+    log.info("🩹 Reply did not match the rubric schema, asking the model to repair it")
+    repaired = complete_chat(structured_scores.REPAIR_SYSTEM_PROMPT, structured_scores.repair_message(reply, compiled),
+                             model, structured_scores.response_format(compiled, model))
+    usable = structured_scores.is_usable(repaired, compiled)
+    metrics.SCORE_REPAIRS.inc(outcome="ok" if usable else "failed")
+    return repaired if usable else reply
 
-        feedback = score_transcript(system_prompt, transcript_text, model=args.model)
+# Raises on API errors so call_with_backoff can retry the transient ones. With the
+# compiled rubric the reply is schema-constrained (where the model supports it) and repaired
+def score_transcript(system_prompt, transcript_text, model, compiled=None):
+    reply = complete_chat(system_prompt, f"Student's transcript:\n\n{transcript_text}", model,
+                          structured_scores.response_format(compiled, model))
+    if compiled is not None and not structured_scores.is_usable(reply, compiled):
+        reply = repair_reply(reply, compiled, model)
+    return reply
 
-        results.append({
-            "email": email,
-            "feedback": feedback,
-            "evaluated_at": datetime.now(timezone.utc).isoformat()
-        })
+# Score with backoff; once retries (or the retry budget) run out, fail with an [ERROR] string
+def score_transcript_with_backoff(system_prompt, transcript_text, model, compiled=None):
+    OpenAIError, _ = openai_errors()
+    try:
+        return call_with_backoff(score_transcript, system_prompt, transcript_text, model, compiled)
+    except OpenAIError as e:
+        if is_rate_limit_error(e):
+            return f"[ERROR] OpenAI API rate limit exceeded: {str(e)}"
+        return f"[ERROR] OpenAI API call failed: {str(e)}"
 
-    with open(current_output_path, "a") as outfile:
-        for entry in results:
-            outfile.write(json.dumps(entry) + "\n")
+# Score through the on-disk evaluation cache; failed calls are never cached.
+# The cache holds the model's raw reply; structured fields are derived from it per result
+def score_transcript_cached(rubric_csv, system_prompt, transcript_text, model, bypass_cache=False):
+    key = eval_cache.cache_key(rubric_csv, system_prompt, model, transcript_text)
+    feedback = eval_cache.get(key, bypass=bypass_cache)
+    if feedback is not None:
+        return feedback, True
 
-    print(f"✅ Evaluated {len(results)} transcript(s). Results saved to {current_output_path}")
-def evaluate_transcript_block(request_block, model="gpt-4"):
-    rubric = request_block["rubric_csv"]
-    prompt = request_block["evaluation_prompt"]
-    transcripts = request_block.get("transcripts", [])
-    system_prompt = build_system_prompt(rubric, prompt)
+    feedback = score_transcript_with_backoff(system_prompt, transcript_text, model, compile_rubric(rubric_csv))
+    if not feedback.startswith("[ERROR]"):
+        eval_cache.put(key, feedback)
+    return feedback, False
 
-    results = []
-    for entry in transcripts:
-        email = entry.get("email", "unknown")
-        transcript_text = entry.get("transcript", "")
-        print(f"🧠 Scoring: {email}...")
+# Cached evaluation of a near-duplicate of entry (same rubric, prompt and model) as
+# (feedback, linked_to), or (None, None); used when a block asks for "near_duplicates": "link".
+# Candidates are peeked at, so the caller records the whole lookup as one cache hit or miss
+def linked_feedback(entry, rubric_csv, system_prompt, model):
+    text = entry.get("transcript", "")
+    own_id = entry.get("transcript_id") or transcript_id(entry.get("email", ""), text)
+    storage = get_storage()
+    for match in similarity_index.query(text, exclude=own_id):
+        other = storage.get_transcript(match["id"]) if match["id"] is not None else None
+        if other is None or transcript_id(other["email"], other["transcript"]) != match["transcript_id"]:
+            continue  # the store was compacted or migrated since this match was indexed
+        feedback = eval_cache.peek(eval_cache.cache_key(rubric_csv, system_prompt, model, other["transcript"]))
+        if feedback is not None:
+            log.debug("🔗 Linking %s to the evaluation of %s (similarity %.2f)",
+                      entry.get("email", "unknown"), match["email"], match["similarity"])
+            return feedback, {key: match[key] for key in ("transcript_id", "email", "similarity")}
+    return None, None
 
-        feedback = score_transcript(system_prompt, transcript_text, model=model)
+def _links_near_duplicates(request_block, bypass_cache):
+    return not bypass_cache and (request_block.get("near_duplicates") or similarity_index.MODE) == "link"
 
-        results.append({
-            "email": email,
-            "feedback": feedback,
-            "evaluated_at": datetime.now(timezone.utc).isoformat()
-        })
-def evaluate_single_transcript(transcript_text, rubric_csv, model="gpt-4", prompt="Evaluate this student's performance."):
+def evaluate_single_transcript(transcript_text, rubric_csv, model="gpt-4", prompt=registry.DEFAULT_PROMPT,
+                               bypass_cache=False):
     system_prompt = build_system_prompt(rubric_csv, prompt)
-    feedback = score_transcript(system_prompt, transcript_text, model=model)
+    feedback, cached = score_transcript_cached(rubric_csv, system_prompt, transcript_text, model, bypass_cache)
     return {
         "email": "anonymous",  # optionally pass email if known
-        "feedback": feedback,
+        **structured_scores.result_fields(feedback, compile_rubric(rubric_csv)),
+        "cached": cached,
         "evaluated_at": datetime.now(timezone.utc).isoformat()
     }
-def evaluate_transcript_block(request_block, model="gpt-4"):
-    rubric = request_block["rubric_csv"]
-    prompt = request_block.get("evaluation_prompt", "Evaluate this student's performance.")
+
+# Transcripts of a request block; a block-level "cohort" applies to those without their own
+def _block_transcripts(request_block):
     transcripts = request_block.get("transcripts", [])
-    system_prompt = build_system_prompt(rubric, prompt)
+    cohort = request_block.get("cohort")
+    if cohort:
+        transcripts = [t if t.get("cohort") else dict(t, cohort=cohort) for t in transcripts]
+    return transcripts
 
-    results = []
-    for entry in transcripts:
+def _block_result(entry, feedback, cached, packed=False, compiled=None):
+    result = {
+        "email": entry.get("email", "unknown"),
+        **structured_scores.result_fields(feedback, compiled),
+        "cached": cached,
+        "evaluated_at": datetime.now(timezone.utc).isoformat()
+    }
+    if packed:
+        result["packed"] = True
+    # The scored index (and incremental request blocks) key on this
+    result["transcript_id"] = entry.get("transcript_id") or transcript_id(result["email"], entry.get("transcript", ""))
+    if entry.get("cohort"):
+        result["cohort"] = entry["cohort"]
+    return result
+
+def evaluate_transcript_block(request_block, model="gpt-4", max_in_flight=None, bypass_cache=False,
+                              on_result=None, pack=None, pack_token_budget=None, stats=None):
+    """
+    Score every transcript in request_block; results keep the input order.
+    With pack=True (or "pack": true in the block) short transcripts share a
+    request; pass a dict as stats to receive packing counts and tokens saved.
+    Registry references ("rubric_ref"/"prompt_ref") are resolved first.
+    """
+    request_block = registry.resolve_block(request_block)
+    rubric = request_block["rubric_csv"]
+    prompt = request_block.get("evaluation_prompt", registry.DEFAULT_PROMPT)
+    transcripts = _block_transcripts(request_block)
+    bypass_cache = bypass_cache or bool(request_block.get("bypass_cache"))
+    compiled = compile_rubric(rubric)
+    system_prompt = compiled.system_prompt(prompt)
+
+    link = _links_near_duplicates(request_block, bypass_cache)
+
+    if pack is None:
+        pack = bool(request_block.get("pack"))
+    if pack:
+        return _evaluate_packed(transcripts, rubric, system_prompt, model, max_in_flight, bypass_cache,
+                                on_result, pack_token_budget, stats if stats is not None else {}, link)
+
+    def score_entry(entry):
         email = entry.get("email", "unknown")
         transcript_text = entry.get("transcript", "")
-        print(f"🧠 Scoring: {email}...")
 
-        feedback = score_transcript(system_prompt, transcript_text, model=model)
+        if link and not eval_cache.contains(eval_cache.cache_key(rubric, system_prompt, model, transcript_text)):
+            feedback, linked_to = linked_feedback(entry, rubric, system_prompt, model)
+            if feedback is not None:
+                eval_cache.record_lookup(True)
+                return dict(_block_result(entry, feedback, True, compiled=compiled), linked_to=linked_to)
 
-        results.append({
-            "email": email,
-            "feedback": feedback,
-            "evaluated_at": datetime.now(timezone.utc).isoformat()
-        })
+        log.debug("🧠 Scoring: %s...", email)
+        feedback, cached = score_transcript_cached(rubric, system_prompt, transcript_text, model, bypass_cache)
+        return _block_result(entry, feedback, cached, compiled=compiled)
 
-    return results
+    # Results come back in the same order as request_block["transcripts"]; one failed
+    # transcript becomes an [ERROR] result instead of failing the batch
+    return score_many(transcripts, score_entry, max_in_flight=max_in_flight, on_result=on_result,
+                      on_error=lambda entry, e: _block_result(entry, f"[ERROR] {e}", False, compiled=compiled))
+
+def _evaluate_packed(transcripts, rubric, system_prompt, model, max_in_flight, bypass_cache,
+                     on_result, pack_token_budget, stats, link=False):
+    results = [None] * len(transcripts)
+    compiled = compile_rubric(rubric)
+    system_prompt_tokens = count_tokens(system_prompt, model)
+    stats.update({"requests": 0, "packed_requests": 0, "transcripts_packed": 0,
+                  "fallbacks": 0, "cache_hits": 0, "tokens_saved": 0})
+
+    def score_fresh(text):
+        feedback = score_transcript_with_backoff(system_prompt, text, model, compiled)
+        if not feedback.startswith("[ERROR]"):
+            eval_cache.put(eval_cache.cache_key(rubric, system_prompt, model, text), feedback)
+        return feedback
+
+    def finish(index, feedback, cached, packed=False, linked_to=None):
+        results[index] = _block_result(transcripts[index], feedback, cached, packed, compiled)
+        if linked_to:
+            results[index]["linked_to"] = linked_to
+        if on_result:
+            on_result(index, results[index])
 
+    # Cached transcripts never need to be packed; a single-transcript result is preferred
+    # over one from an earlier packed prompt. Each transcript counts as one cache lookup
+    pending = []
+    for i, entry in enumerate(transcripts):
+        text = entry.get("transcript", "")
+        feedback = linked_to = None
+        if not bypass_cache:
+            feedback = eval_cache.peek(eval_cache.cache_key(rubric, system_prompt, model, text))
+            if feedback is None:
+                feedback = eval_cache.peek(eval_cache.cache_key(rubric, system_prompt, model, text, variant="packed"))
+            if feedback is None and link:
+                feedback, linked_to = linked_feedback(entry, rubric, system_prompt, model)
+        eval_cache.record_lookup(feedback is not None, bypass=bypass_cache)
+        if feedback is not None:
+            stats["cache_hits"] += 1
+            finish(i, feedback, True, linked_to=linked_to)
+            continue
+        pending.append(i)
+
+    packs = packing.plan_packs(
+        [(i, count_tokens(transcripts[i].get("transcript", ""), model)) for i in pending],
+        token_budget=pack_token_budget
+    )
+
+    OpenAIError, _ = openai_errors()
+
+    def score_pack(indexes):
+        if len(indexes) == 1:
+            i = indexes[0]
+            log.debug("🧠 Scoring: %s...", transcripts[i].get("email", "unknown"))
+            return [(i, score_fresh(transcripts[i].get("transcript", "")), False)], 1, 0
+
+        items = [(str(n), transcripts[i].get("transcript", "")) for n, i in enumerate(indexes)]
+        log.debug("📦 Scoring %d packed transcripts: %s", len(indexes),
+                  ", ".join(transcripts[i].get("email", "unknown") for i in indexes))
+        try:
+            reply = call_with_backoff(complete_chat, system_prompt, packing.build_packed_message(items), model,
+                                      structured_scores.response_format(compiled, model, packed=True))
+            parsed = packing.parse_packed_feedback(reply, [item_id for item_id, _ in items])
+        except (OpenAIError, ValueError) as e:
+            log.warning("⚠️ Packed scoring failed, falling back to single scoring: %s", e)
+            parsed = {}
+        # Evaluations that don't match the rubric are re-scored on their own
+        parsed = {item_id: text for item_id, text in parsed.items() if structured_scores.is_usable(text, compiled)}
+
+        scored, requests, saved = [], 1, 0
+        for (item_id, text), i in zip(items, indexes):
+            if item_id in parsed:
+                eval_cache.put(eval_cache.cache_key(rubric, system_prompt, model, text, variant="packed"),
+                               parsed[item_id])
+                scored.append((i, parsed[item_id], True))
+            else:
+                scored.append((i, score_fresh(text), False))
+                requests += 1
+        packed_items = [(item_id, text) for item_id, text in items if item_id in parsed]
+        if len(packed_items) > 1:
+            saved = packing.tokens_saved(system_prompt_tokens, len(packed_items),
+                                         packing.overhead_tokens(packed_items, model))
+        return scored, requests, saved
+
+    def collect(_, outcome):
+        scored, requests, saved = outcome
+        stats["requests"] += requests
+        stats["tokens_saved"] += saved
+        if len(scored) > 1:
+            stats["packed_requests"] += 1
+        for i, feedback, packed in scored:
+            if packed:
+                stats["transcripts_packed"] += 1
+            elif len(scored) > 1:
+                stats["fallbacks"] += 1
+            finish(i, feedback, False, packed)
+
+    score_many(packs, score_pack, max_in_flight=max_in_flight, on_result=collect,
+               on_error=lambda indexes, e: ([(i, f"[ERROR] {e}", False) for i in indexes], 1, 0))
+
+    log.info("📦 Packing: %d transcript(s) in %d packed request(s), %d fallback(s), ~%d prompt tokens saved",
+             stats["transcripts_packed"], stats["packed_requests"], stats["fallbacks"], stats["tokens_saved"])
     return results
+
+_STREAM_END = object()
+
+def stream_evaluation(request_block, model="gpt-4", max_in_flight=None, bypass_cache=False, save=True):
+    """
+    Score request_block like evaluate_transcript_block, but yield events while
+    it runs: {"event": "token", "index", "text"} for every streamed delta,
+    {"event": "result", "index", "name", ...result} per finished transcript and
+    a final {"event": "done", "evaluated", "results_file"} (or "error").
+
+    Scoring runs on a background thread, so results are still cached and
+    saved to the results store when the consumer stops reading early.
+    Packing is not used: each transcript streams on its own request.
+    """
+    request_block = registry.resolve_block(request_block)
+    rubric = request_block["rubric_csv"]
+    prompt = request_block.get("evaluation_prompt", registry.DEFAULT_PROMPT)
+    transcripts = _block_transcripts(request_block)
+    bypass_cache = bypass_cache or bool(request_block.get("bypass_cache"))
+    compiled = compile_rubric(rubric)
+    system_prompt = compiled.system_prompt(prompt)
+    link = _links_near_duplicates(request_block, bypass_cache)
+    events = queue.Queue()
+    OpenAIError, _ = openai_errors()
+
+    def score_entry(item):
+        index, entry = item
+        text = entry.get("transcript", "")
+        key = eval_cache.cache_key(rubric, system_prompt, model, text)
+        feedback = linked_to = None
+        if not bypass_cache:
+            feedback = eval_cache.peek(key)
+            if feedback is None and link:
+                feedback, linked_to = linked_feedback(entry, rubric, system_prompt, model)
+        eval_cache.record_lookup(feedback is not None, bypass=bypass_cache)
+        cached = feedback is not None
+        if not cached:
+            log.debug("🧠 Streaming: %s...", entry.get("email", "unknown"))
+            parts = []
+            try:
+                for delta in stream_chat(system_prompt, f"Student's transcript:\n\n{text}", model,
+                                         structured_scores.response_format(compiled, model)):
+                    parts.append(delta)
+                    events.put({"event": "token", "index": index, "text": delta})
+                feedback = "".join(parts).strip()
+                if not structured_scores.is_usable(feedback, compiled):
+                    feedback = call_with_backoff(repair_reply, feedback, compiled, model)
+                eval_cache.put(key, feedback)
+            except OpenAIError as e:
+                feedback = f"[ERROR] OpenAI API call failed: {str(e)}"
+        return emit(index, entry, feedback, cached, linked_to)
+
+    def emit(index, entry, feedback, cached, linked_to=None):
+        result = dict(_block_result(entry, feedback, cached, compiled=compiled), name=entry.get("name", "Unknown"))
+        if linked_to:
+            result["linked_to"] = linked_to
+        events.put(dict(result, event="result", index=index))
+        return result
+
+    def run():
+        try:
+            results = score_many(list(enumerate(transcripts)), score_entry, max_in_flight=max_in_flight,
+                                 on_error=lambda item, e: emit(item[0], item[1], f"[ERROR] {e}", False))
+            done = {"event": "done", "evaluated": len(results)}
+            if save and results:
+                done["results_file"] = os.path.basename(save_results(results, compiled.content_hash, model))
+            events.put(done)
+        except Exception as e:
+            log.exception("❌ Streaming evaluation failed: %s", e)
+            events.put({"event": "error", "error": str(e)})
+        finally:
+            events.put(_STREAM_END)
+
+    threading.Thread(target=run, name="stream-evaluation", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is _STREAM_END:
+            return
+        yield event
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate SkillScope interviews using an LLM.")
+    parser.add_argument("--input", required=False, help="Path to llm_eval_requests.jsonl")
+    parser.add_argument("--output", required=False, help="Optional path to write output .jsonl")
+    parser.add_argument("--model", default="gpt-4", help="LLM model to use (default: gpt-4)")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help=f"Maximum concurrent LLM calls (default: {DEFAULT_MAX_IN_FLIGHT})")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached evaluations and re-score everything")
+    parser.add_argument("--pack", action="store_true", help="Score several short transcripts per LLM request")
+    parser.add_argument("--pack-token-budget", type=int, default=None,
+                        help="Transcript tokens allowed per packed request (default: SKILLSCOPE_PACK_TOKEN_BUDGET or 6000)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit everything as one offline Batch API job and wait for it (resumable)")
+    parser.add_argument("--batch-backend", choices=["openai", "stub"], default="openai",
+                        help="Batch backend; 'stub' completes batches locally for offline testing")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Seconds between batch status checks")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    # Load requests
+    input_path = args.input if args.input else DEFAULT_INPUT_PATH
+    print(f"📂 Looking at: {input_path}")
+
+    # Blocks that reference registry rubrics/prompts get their content here
+    if os.path.abspath(input_path) == REQUESTS_PATH:
+        # The request log may have rotated into archived segments
+        requests = [registry.resolve_block(block) for block in iter_blocks()]
+    else:
+        with open(input_path, "r") as infile:
+            requests = [registry.resolve_block(json.loads(line)) for line in infile if line.strip()]
+
+    # Skip transcripts the scored index already covers
+    scored_ids = load_scored_ids()
+    pending = []
+    for request in requests:
+        # Blocks written before transcript ids existed get them derived here
+        transcripts = [
+            dict(t, transcript_id=t.get("transcript_id") or transcript_id(t.get("email", ""), t.get("transcript", "")))
+            for t in request.get("transcripts", [])
+        ]
+        if not request.get("full_rebuild"):
+            transcripts = [t for t in transcripts if t.get("transcript_id") not in scored_ids]
+        if transcripts:
+            pending.append(dict(request, transcripts=transcripts))
+            # A transcript repeated in a later block is only scored once per run
+            scored_ids.update(t["transcript_id"] for t in transcripts)
+
+    if args.batch:
+        run_batch_mode(pending, args)
+        return
+
+    # Evaluate each block
+    for request in pending:
+        transcripts = request["transcripts"]
+        compiled = compile_rubric(request["rubric_csv"])
+        prompt_tokens = compiled.token_counts(request.get("evaluation_prompt", registry.DEFAULT_PROMPT),
+                                              model=args.model)
+        print(f"📏 Rubric {compiled.content_hash[:8]}: {prompt_tokens['system_prompt_tokens']} system-prompt tokens per evaluation")
+        current_output_path = args.output or generate_output_filename(transcripts)
+
+        results = evaluate_transcript_block(request, model=args.model, max_in_flight=args.max_in_flight,
+                                            bypass_cache=args.no_cache, pack=args.pack or None,
+                                            pack_token_budget=args.pack_token_budget)
+
+        write_block_results(current_output_path, results, rubric_hash=compiled.content_hash, model=args.model)
+        print(f"✅ Evaluated {len(results)} transcript(s). Results saved to {current_output_path}")
+
+    print(f"🗃️  Evaluation cache: {eval_cache.stats()}")
+
+
+def save_results(results, rubric_hash, model):
+    """
+    Write results to the indexed results store and mark the successful ones
+    as scored, so incremental request blocks leave them out. Returns the path.
+    """
+    path = results_store.write_results(results, rubric_hash=rubric_hash, model=model)
+    mark_scored([r for r in results if not r["feedback"].startswith("[ERROR]")])
+    return path
+
+
+def write_block_results(output_path, results, rubric_hash=None, model=None):
+    # Result files in instance/responses/ go through the indexed store; --output elsewhere is written as-is
+    if (os.path.dirname(os.path.abspath(output_path)) == results_store.RESPONSES_DIR
+            and results_store.is_result_filename(os.path.basename(output_path))):
+        results_store.write_results(results, filename=os.path.basename(output_path),
+                                    rubric_hash=rubric_hash, model=model)
+    else:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "a") as outfile:
+            for entry in results:
+                outfile.write(json.dumps(entry) + "\n")
+    mark_scored([r for r in results if not r["feedback"].startswith("[ERROR]")])
+
+
+def run_batch_mode(blocks, args):
+    from backend import batch_eval
+
+    if not blocks:
+        print("⚠️ No unscored transcripts to submit.")
+        return
+
+    backend = batch_eval.get_backend(args.batch_backend)
+    poll_interval = args.poll_interval if args.batch_backend != "stub" else min(args.poll_interval, 0.5)
+    results, checkpoint = batch_eval.run_batch(blocks, args.model, backend, build_system_prompt,
+                                               poll_interval=poll_interval)
+
+    if checkpoint["stage"] == "done":
+        print(f"✅ Batch {checkpoint['batch_id']} results were already saved to {', '.join(checkpoint['output_paths'])}")
+        return
+
+    output_paths = []
+    for block, block_results in zip(blocks, results):
+        output_path = args.output or generate_output_filename(block["transcripts"])
+        compiled = compile_rubric(block["rubric_csv"])
+        # Cache the raw replies, then turn them into structured results (offline: local repair only)
+        for entry, result in zip(_block_transcripts(block), block_results):
+            if not result["feedback"].startswith("[ERROR]"):
+                system_prompt = build_system_prompt(block["rubric_csv"],
+                                                    block.get("evaluation_prompt", registry.DEFAULT_PROMPT))
+                eval_cache.put(eval_cache.cache_key(block["rubric_csv"], system_prompt, args.model,
+                                                    entry.get("transcript", "")), result["feedback"])
+            result.update(structured_scores.result_fields(result["feedback"], compiled))
+            if entry.get("cohort"):
+                result["cohort"] = entry["cohort"]
+        write_block_results(output_path, block_results, rubric_hash=compiled.content_hash, model=args.model)
+        if output_path not in output_paths:
+            output_paths.append(output_path)
+
+    batch_eval.finish_checkpoint(checkpoint, output_paths)
+    print(f"✅ Batch {checkpoint['batch_id']} evaluated {sum(len(r) for r in results)} transcript(s). "
+          f"Results saved to {', '.join(output_paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# backend/llm_client.py
+
+"""
+Lazily constructed OpenAI client shared by scoring and transcription.
+Nothing here touches the network or imports the OpenAI SDK until a caller
+actually needs a client, so importing the server stays fast.
+
+The client keeps a pool of keep-alive connections (one pool per process,
+shared by all threads) and has default timeouts; pass timeout= per call to
+override them (see CHAT_TIMEOUT and AUDIO_TIMEOUT). SDK retries are off:
+backend.scoring_engine.call_with_backoff retries transient errors itself,
+with jitter and a retry budget, and backend.rate_limiter paces calls across
+processes.
+"""
+
+import os
+import threading
+
+MAX_CONNECTIONS = int(os.getenv("SKILLSCOPE_LLM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("SKILLSCOPE_LLM_MAX_KEEPALIVE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("SKILLSCOPE_LLM_CONNECT_TIMEOUT", "10"))
+CHAT_TIMEOUT = float(os.getenv("SKILLSCOPE_LLM_TIMEOUT", "60"))
+AUDIO_TIMEOUT = float(os.getenv("SKILLSCOPE_WHISPER_TIMEOUT", "300"))
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env():
+    """Load .env once (python-dotenv is optional)."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    _env_loaded = True
+
+
+def get_client():
+    global _client, _client_pid
+    with _lock:
+        # A pool inherited across fork() would share sockets with the parent
+        if _client is None or _client_pid != os.getpid():
+            load_env()
+            import httpx
+            from openai import OpenAI
+            timeout = httpx.Timeout(CHAT_TIMEOUT, connect=CONNECT_TIMEOUT)
+            _client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=timeout,
+                max_retries=0,
+                http_client=httpx.Client(
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE)
+                )
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def openai_errors():
+    """(OpenAIError, RateLimitError), imported on first use."""
+    from openai import OpenAIError, RateLimitError
+    return OpenAIError, RateLimitError
@@ -0,0 +1,466 @@
+# backend/log_segments.py
+
+"""
+Segmented JSONL logs: a live file plus sealed, compressed archive segments.
+
+Writers keep appending to the live file (e.g. instance/submissions/
+submissions.jsonl). Once it passes SKILLSCOPE_SEGMENT_MB, or its first record
+is older than SKILLSCOPE_SEGMENT_MAX_AGE_DAYS, rotate() moves it into
+<dir>/archive/<name>/ and the next append starts a new live file. compress()
+gzips sealed segments other than the newest SKILLSCOPE_HOT_SEGMENTS (zstd
+with SKILLSCOPE_SEGMENT_CODEC=zstd and the zstandard package installed).
+
+Records keep logical offsets: a segment covers [start, end) of one continuous
+byte stream and the live file picks up at the last segment's end, so offsets
+handed out before a rotation (transcript ids, request high-water marks) still
+point at the same record. <dir>/archive/<name>/segments.json is the segment
+index: range, record count, codec and first/last record time per segment.
+
+Rotation, compression and compaction swap files under the log's rotate lock;
+readers take it shared only while they look up the index and open the live
+file. compact() rewrites sealed segments without superseded records; a
+compacted segment keeps its range but not the offsets inside it, so only logs
+nobody addresses by offset are compacted.
+"""
+
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from backend.file_lock import locked
+
+try:
+    import zstandard
+except ImportError:  # zstd segments need the optional zstandard package
+    zstandard = None
+
+SEGMENT_BYTES = int(float(os.getenv("SKILLSCOPE_SEGMENT_MB", "4")) * 1024 * 1024)
+SEGMENT_MAX_AGE_SECONDS = float(os.getenv("SKILLSCOPE_SEGMENT_MAX_AGE_DAYS", "7")) * 86400
+HOT_SEGMENTS = int(os.getenv("SKILLSCOPE_HOT_SEGMENTS", "1"))
+CODEC = os.getenv("SKILLSCOPE_SEGMENT_CODEC", "gzip")
+# Decompressed segments kept in memory per log for random reads (GET /transcripts/<id>)
+SEGMENT_CACHE_SIZE = int(os.getenv("SKILLSCOPE_SEGMENT_CACHE", "4"))
+
+_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _codec():
+    if CODEC == "zstd" and zstandard is None:
+        return "gzip"
+    return CODEC if CODEC in _EXTENSIONS else "gzip"
+
+
+def _open_read(path, codec):
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install zstandard to read it")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path, "rb")
+
+
+def _open_write(path, codec):
+    if codec == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def _parse_time(value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class SegmentedLog:
+    """
+    One append-only JSONL log. writer_lock is the lock its appenders hold;
+    rotate() must be called with it held, maintain() takes it itself.
+    time_field names the record timestamp used for age-based rotation.
+    """
+
+    def __init__(self, path, writer_lock, time_field=None):
+        self.path, self.writer_lock, self.time_field = path, writer_lock, time_field
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.archive_dir = os.path.join(os.path.dirname(path), "archive", name)
+        self.index_path = os.path.join(self.archive_dir, "segments.json")
+        self.lock_path = os.path.join(os.path.dirname(path), f"{name}.rotate.lock")
+        self._index_stamp = None
+        self._index = {"base": 0, "segments": []}
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---- segment index ----
+
+    def _load_index(self):
+        """Current segment index, re-read only when segments.json changed."""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._index_stamp, self._index = None, {"base": 0, "segments": []}
+                return self._index
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._index_stamp:
+                with open(self.index_path, "r") as f:
+                    self._index = json.load(f)
+                self._index_stamp = stamp
+            return self._index
+
+    def _write_index(self, index):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _snapshot(self):
+        """(index, live file handle or None), consistent with each other."""
+        with locked(self.lock_path, shared=True):
+            index = self._load_index()
+            try:
+                live = open(self.path, "rb")
+            except FileNotFoundError:
+                live = None
+        return index, live
+
+    def base(self):
+        """Logical offset of the live file's first byte."""
+        return self._load_index()["base"]
+
+    def end(self):
+        """Logical offset just past the last byte written."""
+        index, live = self._snapshot()
+        if live is None:
+            return index["base"]
+        with live:
+            return index["base"] + os.fstat(live.fileno()).st_size
+
+    def exists(self):
+        return os.path.exists(self.path) or bool(self._load_index()["segments"])
+
+    def segments(self):
+        return list(self._load_index()["segments"])
+
+    # ---- reading ----
+
+    def _segment_path(self, segment):
+        return os.path.join(self.archive_dir, segment["file"])
+
+    def _open_segment(self, segment):
+        """Open a sealed segment, following it if compression or compaction just replaced the file."""
+        try:
+            return _open_read(self._segment_path(segment), segment["codec"])
+        except FileNotFoundError:
+            with locked(self.lock_path, shared=True):
+                index = self._load_index()
+            current = next((s for s in index["segments"] if s["start"] == segment["start"]), None)
+            if current is None:
+                raise
+            return _open_read(self._segment_path(current), current["codec"])
+
+    def _decoded_segment(self, segment):
+        """Whole (decompressed) content of a sealed segment, from a small LRU."""
+        key = (segment["start"], segment["file"], segment["bytes"])
+        with self._lock:
+            data = self._decoded.get(key)
+            if data is not None:
+                self._decoded.move_to_end(key)
+                return data
+        with self._open_segment(segment) as f:
+            data = f.read()
+        with self._lock:
+            self._decoded[key] = data
+            while len(self._decoded) > SEGMENT_CACHE_SIZE:
+                self._decoded.popitem(last=False)
+        return data
+
+    @staticmethod
+    def _containing(index, offset):
+        for segment in index["segments"]:
+            if segment["start"] <= offset < segment["end"]:
+                return segment
+        return None
+
+    def read(self, offset, length=None):
+        """
+        Bytes of the record at logical offset (length bytes, or up to the end
+        of its line), or None if offset is outside the log.
+        """
+        if offset < 0:
+            return None
+        index, live = self._snapshot()
+        try:
+            if offset >= index["base"]:
+                if live is None:
+                    return None
+                live.seek(offset - index["base"])
+                raw = live.read(length) if length else live.readline()
+                return raw or None
+        finally:
+            if live is not None:
+                live.close()
+
+        segment = self._containing(index, offset)
+        if segment is None:
+            return None
+        local = offset - segment["start"]
+        if segment["codec"] == "none":
+            with self._open_segment(segment) as f:
+                f.seek(local)
+                return (f.read(length) if length else f.readline()) or None
+        data = self._decoded_segment(segment)
+        stop = local + length if length else data.find(b"\n", local) + 1 or len(data)
+        return data[local:stop] or None
+
+    def is_line_start(self, offset):
+        """True if a record starts at logical offset."""
+        if offset < 0:
+            return False
+        index = self._load_index()
+        segment = self._containing(index, offset)
+        if offset == index["base"] or (segment is not None and offset == segment["start"]):
+            return self.read(offset, 1) is not None
+        before = self.read(offset - 1, 1)
+        return before == b"\n" and self.read(offset, 1) is not None
+
+    def _segment_lines(self, segment, skip):
+        with self._open_segment(segment) as f:
+            if skip:
+                f.seek(skip)
+            offset = segment["start"] + skip
+            for line in f:
+                yield offset, line
+                offset += len(line)
+
+    def iter_lines(self, start=0):
+        """
+        Yield (offset, line) for every complete line at or after logical
+        offset start, archived segments first, then the live file. Starting
+        inside a compacted segment reads that segment from its beginning.
+        """
+        index, live = self._snapshot()
+        try:
+            for segment in index["segments"]:
+                if segment["end"] <= start:
+                    continue
+                skip = start - segment["start"] if start > segment["start"] and not segment.get("compacted") else 0
+                yield from self._segment_lines(segment, skip)
+
+            if live is None:
+                return
+            position = max(start - index["base"], 0)
+            live.seek(position)
+            for line in live:
+                if not line.endswith(b"\n"):
+                    break  # a record is still being written; pick it up next time
+                yield index["base"] + position, line
+                position += len(line)
+        finally:
+            if live is not None:
+                live.close()
+
+    def iter_records(self, start=0):
+        """Yield (offset, record) for the parseable lines of iter_lines()."""
+        for offset, line in self.iter_lines(start):
+            if not line.strip():
+                continue
+            try:
+                yield offset, json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+    # ---- maintenance ----
+
+    def _live_summary(self):
+        """(records, first_at, last_at) of the live file."""
+        records, first_at, last_at = 0, None, None
+        with open(self.path, "rb") as f:
+            for line in f:
+                records += 1
+                if self.time_field:
+                    try:
+                        stamp = json.loads(line).get(self.time_field)
+                    except (json.JSONDecodeError, AttributeError):
+                        continue
+                    first_at = first_at or stamp
+                    last_at = stamp or last_at
+        return records, first_at, last_at
+
+    def _live_age(self, now):
+        """Seconds since the live file's first record (by time_field, else its mtime)."""
+        with open(self.path, "rb") as f:
+            first = f.readline()
+        stamp = None
+        if self.time_field:
+            try:
+                stamp = _parse_time(json.loads(first).get(self.time_field))
+            except (json.JSONDecodeError, AttributeError):
+                pass
+        if stamp is None:
+            return now - os.path.getmtime(self.path)
+        return now - stamp.timestamp()
+
+    def rotate(self, force=False, by_age=True, now=None):
+        """
+        Seal the live file into a segment if it is over size or (by_age)
+        age, or force. Callers hold writer_lock; appenders call it with
+        by_age=False after each write, which costs one stat(). Returns the
+        new segment or None.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return None
+        if not size:
+            return None
+        now = time.time() if now is None else now
+        if not force and size < SEGMENT_BYTES and (not by_age or self._live_age(now) < SEGMENT_MAX_AGE_SECONDS):
+            return None
+
+        # Appenders are held off by writer_lock, so the live file can be summarized before locking readers out
+        records, first_at, last_at = self._live_summary()
+        with locked(self.lock_path):
+            index = self._load_index()
+            start = index["base"]
+            segment = {
+                "file": f"{start:014d}.jsonl", "start": start, "end": start + size, "codec": "none",
+                "records": records, "bytes": size, "first_at": first_at, "last_at": last_at,
+                "sealed_at": datetime.now(timezone.utc).isoformat()
+            }
+            os.makedirs(self.archive_dir, exist_ok=True)
+            os.replace(self.path, self._segment_path(segment))
+            self._write_index({"base": segment["end"], "segments": index["segments"] + [segment]})
+        return segment
+
+    def _swap(self, segment, tmp_path, **changes):
+        """
+        Replace a sealed segment's file with tmp_path and record changes in
+        the index; a segment left without records is dropped.
+        """
+        with locked(self.lock_path):
+            index = self._load_index()
+            segments = list(index["segments"])
+            position = next((i for i, s in enumerate(segments) if s["start"] == segment["start"]), None)
+            if position is None or segments[position] != segment:
+                os.remove(tmp_path)
+                return False  # replaced or dropped meanwhile
+
+            updated = dict(segment, **changes)
+            if updated["records"]:
+                os.replace(tmp_path, self._segment_path(updated))
+                segments[position] = updated
+            else:
+                os.remove(tmp_path)
+                segments.pop(position)
+            self._write_index(dict(index, segments=segments))
+            # Readers that still hold the old file keep reading it; new ones follow the index
+            if not updated["records"] or updated["file"] != segment["file"]:
+                os.remove(self._segment_path(segment))
+        return True
+
+    def compress(self, hot=None):
+        """Compress sealed segments older than the newest `hot` ones. Returns bytes saved."""
+        hot = HOT_SEGMENTS if hot is None else hot
+        codec = _codec()
+        segments = self._load_index()["segments"]
+        cold = segments[:max(len(segments) - hot, 0)]
+        saved = 0
+        for segment in cold:
+            if segment["codec"] != "none" or codec == "none":
+                continue
+            source = self._segment_path(segment)
+            name = f"{segment['file']}{_EXTENSIONS[codec]}"
+            tmp_path = os.path.join(self.archive_dir, f"{name}.{os.getpid()}.tmp")
+            with open(source, "rb") as src, _open_write(tmp_path, codec) as dst:
+                while True:
+                    chunk = src.read(1 << 20)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            stored = os.path.getsize(tmp_path)
+            if self._swap(segment, tmp_path, file=name, codec=codec, bytes=stored):
+                saved += segment["bytes"] - stored
+        return saved
+
+    def compact(self, transform):
+        """
+        Rewrite sealed segments through transform(record) -> record, or None
+        to drop it. Returns the number of records dropped.
+        """
+        dropped = 0
+        for segment in self._load_index()["segments"]:
+            lines, changed = [], False
+            with self._open_segment(segment) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        changed = True
+                        continue
+                    kept = transform(record)
+                    if kept is None:
+                        changed = True
+                        continue
+                    if kept != record:
+                        changed = True
+                        line = (json.dumps(kept) + "\n").encode("utf-8")
+                    lines.append(line)
+            if not changed:
+                continue
+
+            tmp_path = os.path.join(self.archive_dir, f"{segment['file']}.{os.getpid()}.tmp")
+            with _open_write(tmp_path, segment["codec"]) as f:
+                f.write(b"".join(lines))
+            if self._swap(segment, tmp_path, records=len(lines), bytes=os.path.getsize(tmp_path), compacted=True):
+                dropped += segment["records"] - len(lines)
+        return dropped
+
+    def replace(self, tmp_path):
+        """Make tmp_path the whole log, dropping every archived segment. Callers hold writer_lock."""
+        with locked(self.lock_path):
+            segments = self._load_index()["segments"]
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            os.replace(tmp_path, self.path)
+            for segment in segments:
+                try:
+                    os.remove(self._segment_path(segment))
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._decoded.clear()
+            self._load_index()
+
+    def maintain(self, now=None):
+        """Rotate the live file if it aged out, then compress cold segments."""
+        with locked(self.writer_lock):
+            rotated = self.rotate(now=now)
+        return {"rotated": rotated is not None, "bytes_saved": self.compress()}
+
+    def stats(self):
+        index = self._load_index()
+        segments = index["segments"]
+        try:
+            live_bytes = os.path.getsize(self.path)
+        except FileNotFoundError:
+            live_bytes = 0
+        return {
+            "live_bytes": live_bytes,
+            "end": index["base"] + live_bytes,
+            "segments": len(segments),
+            "compressed_segments": sum(1 for s in segments if s["codec"] != "none"),
+            "archived_records": sum(s["records"] for s in segments),
+            "archived_bytes": sum(s["bytes"] for s in segments),
+            "oldest_at": segments[0]["first_at"] if segments else None
+        }
@@ -0,0 +1,102 @@
+# backend/logs.py
+
+"""
+Level-controlled, optionally JSON-structured logging for the server and jobs.
+
+  SKILLSCOPE_LOG_LEVEL        DEBUG, INFO (default), WARNING, ...
+  SKILLSCOPE_LOG_FORMAT       "text" (default) or "json" (one object per line)
+  SKILLSCOPE_LOG_SAMPLE_RATE  fraction of requests whose summaries are logged
+                              at DEBUG (default 0.01)
+
+Structured fields go in extra={"fields": {...}}; use log_event() for that.
+Request payloads are never logged verbatim, only summarized (see
+summarize_payload), and only for a sampled fraction of requests.
+"""
+
+import json
+import logging
+import os
+import random
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("SKILLSCOPE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("SKILLSCOPE_LOG_FORMAT", "text")
+SAMPLE_RATE = float(os.getenv("SKILLSCOPE_LOG_SAMPLE_RATE", "0.01"))
+
+_configured = False
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        body = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        body.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            body["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(body, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{k}={json.dumps(v, default=str)}" for k, v in fields.items())
+        return text
+
+
+def configure_logging(level=None, fmt=None):
+    """Attach one handler to the "skillscope" logger (idempotent)."""
+    global _configured
+    logger = logging.getLogger("skillscope")
+    logger.setLevel(level or LOG_LEVEL)
+    if _configured:
+        return logger
+
+    handler = logging.StreamHandler()
+    if (fmt or LOG_FORMAT) == "json":
+        handler.setFormatter(_JSONFormatter())
+    else:
+        handler.setFormatter(_TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.propagate = False
+    _configured = True
+    return logger
+
+
+def get_logger(name):
+    """Child of the "skillscope" logger, e.g. get_logger("jobs") -> skillscope.jobs."""
+    return logging.getLogger(f"skillscope.{name}")
+
+
+def log_event(logger, level, message, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"fields": fields})
+
+
+def sampled(rate=None):
+    """True for roughly rate (default SKILLSCOPE_LOG_SAMPLE_RATE) of calls."""
+    rate = SAMPLE_RATE if rate is None else rate
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def summarize_payload(payload):
+    """Shape of a JSON payload (keys, counts, text sizes) without any transcript text."""
+    if not isinstance(payload, dict):
+        return {"type": type(payload).__name__}
+
+    summary = {}
+    for key, value in payload.items():
+        if isinstance(value, str):
+            summary[key] = f"<{len(value)} chars>"
+        elif isinstance(value, list):
+            summary[key] = f"<{len(value)} items>"
+        elif isinstance(value, dict):
+            summary[key] = f"<{len(value)} keys>"
+        else:
+            summary[key] = value
+    return summary
@@ -0,0 +1,127 @@
+# backend/maintenance.py
+
+"""
+Rotation, compression, compaction and archival for the JSONL files under instance/.
+
+One pass (run()):
+  1. rotate    seal live logs (submissions, transcripts, request blocks) whose
+               first record is older than SKILLSCOPE_SEGMENT_MAX_AGE_DAYS;
+               size-based rotation already happens on append
+  2. compress  gzip sealed segments other than the newest SKILLSCOPE_HOT_SEGMENTS
+  3. compact   drop scored transcripts from archived request blocks, repeated
+               lines from the scored index and superseded results-index lines
+  4. archive   gzip result files untouched for SKILLSCOPE_RESULTS_ARCHIVE_DAYS
+
+Every step swaps files under the locks the writers and readers already use,
+so a pass can run while the server is serving. Only one pass runs at a time
+(maintenance.lock). Run it from cron with `python -m backend.maintenance`, or
+let each server process run it every SKILLSCOPE_MAINTENANCE_HOURS.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from backend import eval_requests, results_store, transcript_store
+from backend.file_lock import locked
+from backend.logs import configure_logging, get_logger
+from backend.storage import get_storage, submissions_log
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOCK_PATH = os.path.join(BASE_DIR, "instance", "maintenance.lock")
+INTERVAL_SECONDS = float(os.getenv("SKILLSCOPE_MAINTENANCE_HOURS", "0")) * 3600
+
+log = get_logger("maintenance")
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def segmented_logs():
+    """The rotating logs by name; submissions and transcripts only with the file storage backend."""
+    logs = {"requests": eval_requests.requests_log}
+    if get_storage().name == "files":
+        logs["submissions"] = submissions_log
+        logs["transcripts"] = transcript_store.transcript_log
+    return logs
+
+
+def run(now=None, force_rotate=False):
+    """One maintenance pass. Returns a report, or None if another pass is running."""
+    with locked(LOCK_PATH, blocking=False) as acquired:
+        if not acquired:
+            return None
+        started = time.perf_counter()
+        report = {"logs": {}}
+
+        for name, segmented in segmented_logs().items():
+            with locked(segmented.writer_lock):
+                rotated = segmented.rotate(force=force_rotate, now=now)
+            report["logs"][name] = {"rotated": rotated is not None, "bytes_saved": segmented.compress()}
+
+        report["request_transcripts_dropped"] = eval_requests.compact_requests()
+        storage = get_storage()
+        if hasattr(storage, "compact_scored"):
+            report["scored_lines_dropped"] = storage.compact_scored()
+        report["results_index_lines_dropped"] = results_store.compact_indexes()
+        report["result_files_archived"], report["result_bytes_saved"] = results_store.archive_files(now=now)
+
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        log.info("🧹 Maintenance pass: %s", report)
+        return report
+
+
+def stats():
+    """Live and archived sizes of every rotating log."""
+    return {name: segmented.stats() for name, segmented in segmented_logs().items()}
+
+
+def _loop():
+    while True:
+        time.sleep(INTERVAL_SECONDS)
+        try:
+            run()
+        except Exception:
+            log.exception("❌ Maintenance pass failed")
+
+
+def start_background():
+    """Run a pass every SKILLSCOPE_MAINTENANCE_HOURS in a daemon thread (once per process; off by default)."""
+    global _background
+    with _background_lock:
+        if INTERVAL_SECONDS <= 0 or _background is not None:
+            return
+        _background = threading.Thread(target=_loop, name="maintenance", daemon=True)
+        _background.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rotate, compress and compact the SkillScope data files.")
+    parser.add_argument("--stats", action="store_true", help="Only print live/archived sizes per log")
+    parser.add_argument("--force-rotate", action="store_true",
+                        help="Seal every non-empty live log now instead of waiting for its size or age limit")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if not args.stats:
+        report = run(force_rotate=args.force_rotate)
+        if report is None:
+            print("⚠️ Another maintenance pass is running.")
+            return 1
+        for name, outcome in report["logs"].items():
+            print(f"📦 {name}: {'rotated, ' if outcome['rotated'] else ''}{outcome['bytes_saved']} bytes saved by compression")
+        print(f"🧹 Compacted: {report['request_transcripts_dropped']} scored request transcript(s), "
+              f"{report.get('scored_lines_dropped', 0)} scored-index line(s), "
+              f"{report['results_index_lines_dropped']} results-index line(s)")
+        print(f"🗄️ Archived {report['result_files_archived']} result file(s), {report['result_bytes_saved']} bytes saved")
+
+    for name, info in stats().items():
+        print(f"📊 {name}: live {info['live_bytes']} bytes, {info['segments']} segment(s) "
+              f"({info['compressed_segments']} compressed, {info['archived_bytes']} bytes, "
+              f"{info['archived_records']} records)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
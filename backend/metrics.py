@@ -0,0 +1,396 @@
+# backend/metrics.py
+
+"""
+In-process metrics with a Prometheus text exposition (GET /metrics).
+
+Counters and histograms are labelled and thread-safe; gauges are callbacks
+read at scrape time. Values are per process. With SKILLSCOPE_METRICS_DIR set
+(gunicorn.conf.py does) every worker also writes its values to
+<dir>/<pid>.json every SKILLSCOPE_METRICS_FLUSH_SECONDS and on each scrape,
+and /metrics merges them, whichever worker answers the scrape: counters are
+summed and histograms added bucket by bucket into one series per label set,
+while gauges (point-in-time readings) keep one series per live worker with a
+worker="<pid>" label. When a worker exits its counters and histograms are
+folded into <dir>/archive.json, so totals never go backwards.
+
+Instrumented stages:
+  skillscope_http_request_seconds     route latency (server.py hooks)
+  skillscope_llm_request_seconds      chat completion latency
+  skillscope_llm_first_token_seconds  time to first token of streamed completions
+  skillscope_llm_tokens_total         prompt/completion tokens from API usage
+  skillscope_whisper_request_seconds  Whisper call latency per audio slice
+  skillscope_retries_total            429/transient retries in call_with_backoff
+  skillscope_cache_requests_total     evaluation/transcription cache lookups
+  skillscope_score_repairs_total      model rounds spent repairing off-schema replies
+  skillscope_audio_bytes_total        uploaded vs stored (normalized) audio bytes
+  skillscope_http_compressed_bytes_total  response bytes before and after gzip
+"""
+
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.file_lock import locked
+
+log = logging.getLogger("skillscope.metrics")
+
+MULTIPROCESS_DIR = os.getenv("SKILLSCOPE_METRICS_DIR") or None
+FLUSH_SECONDS = float(os.getenv("SKILLSCOPE_METRICS_FLUSH_SECONDS", "5"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+_flusher_pid = None
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names, key, extra=()):
+    pairs = list(zip(label_names, key)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name, self.documentation, self.label_names = name, documentation, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+
+    def samples(self, extra=()):
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.label_names, key, extra)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+    def render(self):
+        return self.header() + self.samples()
+
+    def dump(self):
+        """Values as JSON-ready [[label values, value], ...] for a snapshot."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def load(self, dumped):
+        """Add another process's dump() to this counter."""
+        with self._lock:
+            for key, value in dumped:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0) + value
+
+    def blank(self):
+        return Counter(self.name, self.documentation, self.label_names)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.documentation, self.label_names = name, documentation, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+
+    def samples(self, extra=()):
+        extra = list(extra)
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    labels = _format_labels(self.label_names, key, extra + [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key, extra + [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                plain = _format_labels(self.label_names, key, extra)
+                lines.append(f"{self.name}_sum{plain} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{plain} {series['count']}")
+        return lines
+
+    def render(self):
+        return self.header() + self.samples()
+
+    def dump(self):
+        """Series as JSON-ready [[label values, bucket counts, sum, count], ...] for a snapshot."""
+        with self._lock:
+            return [[list(key), list(series["counts"]), series["sum"], series["count"]]
+                    for key, series in self._series.items()]
+
+    def load(self, dumped):
+        """Add another process's dump() to this histogram, bucket by bucket."""
+        with self._lock:
+            for key, counts, total, count in dumped:
+                series = self._series.setdefault(tuple(key), {"counts": [0] * len(self.buckets), "sum": 0.0,
+                                                              "count": 0})
+                series["counts"] = [a + b for a, b in zip(series["counts"], counts)]
+                series["sum"] += total
+                series["count"] += count
+
+    def blank(self):
+        return Histogram(self.name, self.documentation, self.label_names, self.buckets)
+
+
+class Gauge:
+    """Value read from callback() at scrape time; callback returns a number or {label_tuple: number}."""
+
+    def __init__(self, name, documentation, callback, labels=()):
+        self.name, self.documentation, self.label_names = name, documentation, tuple(labels)
+        self.callback = callback
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+
+    def samples(self, extra=(), values=None):
+        """values: a dump() from another process; read from the callback by default."""
+        values = self.dump() if values is None else values
+        return [f"{self.name}{_format_labels(self.label_names, tuple(key), extra)} {_format_value(value)}"
+                for key, value in sorted(values) if value is not None]
+
+    def render(self):
+        return self.header() + self.samples()
+
+    def dump(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [[list(key), value] for key, value in values.items()]
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def counter(name, documentation, labels=()):
+    return _register(Counter(name, documentation, labels))
+
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labels, buckets))
+
+
+def gauge(name, documentation, callback, labels=()):
+    return _register(Gauge(name, documentation, callback, labels))
+
+
+def _snapshot_path(pid):
+    return os.path.join(MULTIPROCESS_DIR, f"{pid}.json")
+
+
+def _archive_path():
+    return os.path.join(MULTIPROCESS_DIR, "archive.json")
+
+
+def _lock_path():
+    return os.path.join(MULTIPROCESS_DIR, "metrics.lock")
+
+
+def _metrics():
+    with _registry_lock:
+        return list(_registry)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A worker mid-exit or a torn file; its values come back on the next flush
+        return None
+
+
+def write_snapshot():
+    """Write this process's values to SKILLSCOPE_METRICS_DIR/<pid>.json."""
+    pid = os.getpid()
+    snapshot = {"pid": pid, "metrics": {metric.name: metric.dump() for metric in _metrics()}}
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+    _write_json(_snapshot_path(pid), snapshot)
+
+
+def mark_process_dead(pid):
+    """
+    Fold an exited worker's counters and histograms into archive.json and
+    drop its snapshot, gauges included (gunicorn.conf.py child_exit).
+    """
+    if not MULTIPROCESS_DIR:
+        return
+    with locked(_lock_path()):
+        snapshot = _read_json(_snapshot_path(pid))
+        if snapshot is not None:
+            archive = (_read_json(_archive_path()) or {}).get("metrics", {})
+            for metric in _metrics():
+                if isinstance(metric, Gauge):
+                    continue
+                merged = metric.blank()
+                merged.load(archive.get(metric.name, []))
+                merged.load(snapshot["metrics"].get(metric.name, []))
+                archive[metric.name] = merged.dump()
+            _write_json(_archive_path(), {"pid": None, "metrics": archive})
+        try:
+            os.remove(_snapshot_path(pid))
+        except OSError:
+            pass
+
+
+def clear_snapshots():
+    """Remove snapshots and the archive left over from a previous server run (gunicorn.conf.py on_starting)."""
+    if MULTIPROCESS_DIR:
+        for path in glob.glob(os.path.join(MULTIPROCESS_DIR, "*.json")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def start_flusher():
+    """Write snapshots every FLUSH_SECONDS from a daemon thread (once per process)."""
+    global _flusher_pid
+    if not MULTIPROCESS_DIR or _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+
+    def flush():
+        while True:
+            try:
+                write_snapshot()
+            except OSError as e:
+                log.warning("⚠️ Could not write metrics snapshot: %s", e)
+            time.sleep(FLUSH_SECONDS)
+
+    threading.Thread(target=flush, name="metrics-flusher", daemon=True).start()
+
+
+def _render_multiprocess():
+    write_snapshot()
+    metrics = _metrics()
+    merged = {metric.name: metric.blank() for metric in metrics if not isinstance(metric, Gauge)}
+    gauges = {metric.name: [] for metric in metrics if isinstance(metric, Gauge)}
+    # The lock keeps an exiting worker from being counted both in its snapshot and in the archive
+    with locked(_lock_path()):
+        snapshots = [_read_json(path) for path in sorted(glob.glob(os.path.join(MULTIPROCESS_DIR, "*.json")))]
+    for snapshot in snapshots:
+        if snapshot is None:
+            continue
+        for name, dumped in snapshot["metrics"].items():
+            if name in merged:
+                merged[name].load(dumped)
+            elif name in gauges and snapshot["pid"] is not None:
+                gauges[name].append((snapshot["pid"], dumped))
+
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.header())
+        if metric.name in merged:
+            lines.extend(merged[metric.name].samples())
+        else:
+            for pid, dumped in gauges[metric.name]:
+                lines.extend(metric.samples([("worker", str(pid))], values=dumped))
+    return "\n".join(lines) + "\n"
+
+
+def render():
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    if MULTIPROCESS_DIR:
+        return _render_multiprocess()
+    lines = []
+    for metric in _metrics():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = histogram(
+    "skillscope_http_request_seconds", "HTTP request latency by route.", ("route", "method", "status"))
+LLM_REQUEST_SECONDS = histogram(
+    "skillscope_llm_request_seconds", "Chat completion call latency.", ("model", "outcome"))
+LLM_FIRST_TOKEN_SECONDS = histogram(
+    "skillscope_llm_first_token_seconds", "Time to the first streamed completion token.", ("model",))
+LLM_TOKENS = counter(
+    "skillscope_llm_tokens_total", "Tokens reported by chat completion usage.", ("model", "kind"))
+WHISPER_REQUEST_SECONDS = histogram(
+    "skillscope_whisper_request_seconds", "Whisper transcription call latency per audio slice.", ("model", "outcome"))
+RETRIES = counter(
+    "skillscope_retries_total", "Retries made by call_with_backoff.", ("operation", "reason"))
+SCORE_REPAIRS = counter(
+    "skillscope_score_repairs_total", "Model repair rounds for replies that did not match the rubric.", ("outcome",))
+AUDIO_BYTES = counter(
+    "skillscope_audio_bytes_total", "Audio bytes uploaded (original) and kept after normalization (stored).", ("stage",))
+COMPRESSED_BYTES = counter(
+    "skillscope_http_compressed_bytes_total", "Gzipped response bytes before (original) and after (sent) compression.",
+    ("stage",))
+CACHE_REQUESTS = counter(
+    "skillscope_cache_requests_total", "Cache lookups by cache and result (hit, miss, bypass).", ("cache", "result"))
+
+
+def _cache_hit_ratio():
+    ratios = {}
+    for cache in ("evaluation", "transcription"):
+        hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+        lookups = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+        if lookups:
+            ratios[(cache,)] = hits / lookups
+    return ratios
+
+
+CACHE_HIT_RATIO = gauge(
+    "skillscope_cache_hit_ratio", "Cache hits / (hits + misses) since process start.", _cache_hit_ratio, ("cache",))
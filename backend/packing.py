@@ -0,0 +1,98 @@
+# backend/packing.py
+
+"""
+Multi-transcript packing: score several short transcripts in one chat
+completion so the rubric and instructions are paid for once per pack instead
+of once per student.
+
+The system prompt is left untouched (so it stays a cacheable prefix); the
+packing instructions and the delimited transcripts go in the user message,
+and the model is asked for a JSON object keyed by transcript id whose
+evaluations use the same per-skill shape as a single reply.
+"""
+
+import json
+import os
+import re
+
+from backend.rubric import count_tokens
+
+PACK_TOKEN_BUDGET = int(os.getenv("SKILLSCOPE_PACK_TOKEN_BUDGET", "6000"))
+PACK_MAX_ITEMS = int(os.getenv("SKILLSCOPE_PACK_MAX_ITEMS", "8"))
+
+PACK_INSTRUCTIONS = """You will receive {count} student transcripts, each wrapped in <transcript id="..."> tags.
+Evaluate each transcript independently, as if it were the only one.
+Respond with only a JSON object of the form:
+{{"results": [{{"id": "<transcript id>", "evaluation": <the JSON object described in the instructions>}}]}}
+Include exactly one result for every transcript id."""
+
+
+def plan_packs(items, token_budget=None, max_items=None):
+    """
+    Greedily group [(key, token_count), ...] into packs whose transcripts fit
+    token_budget. Transcripts too large to share a request get a pack of their own.
+    Returns a list of key lists, preserving input order within each pack.
+    """
+    token_budget = token_budget or PACK_TOKEN_BUDGET
+    max_items = max_items or PACK_MAX_ITEMS
+
+    packs, current, used = [], [], 0
+    for key, tokens in items:
+        if current and (used + tokens > token_budget or len(current) >= max_items):
+            packs.append(current)
+            current, used = [], 0
+        current.append(key)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_message(transcripts):
+    """User message for [(id, transcript_text), ...]."""
+    parts = [PACK_INSTRUCTIONS.format(count=len(transcripts))]
+    for transcript_id, text in transcripts:
+        parts.append(f'<transcript id="{transcript_id}">\n{text}\n</transcript>')
+    return "\n\n".join(parts)
+
+
+def parse_packed_feedback(reply, expected_ids):
+    """
+    Map transcript id -> feedback from the model's reply. Tolerates code
+    fences and prose around the JSON. An "evaluation" object is returned as
+    its JSON text, so it is cached and parsed like an unpacked reply. Raises
+    ValueError if the reply can't be parsed; ids the model skipped are simply
+    absent from the result.
+    """
+    match = re.search(r"\{.*\}", reply or "", re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in packed reply")
+    data = json.loads(match.group(0))
+
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        raise ValueError("Packed reply has no results list")
+
+    expected = set(expected_ids)
+    feedback = {}
+    for item in results:
+        if not isinstance(item, dict):
+            continue
+        item_id = str(item.get("id", ""))
+        text = item.get("evaluation", item.get("feedback"))
+        if isinstance(text, dict):
+            text = json.dumps(text)
+        if item_id in expected and isinstance(text, str) and text.strip():
+            feedback[item_id] = text.strip()
+    return feedback
+
+
+def tokens_saved(system_prompt_tokens, pack_size, overhead_tokens):
+    """Prompt tokens saved by sending pack_size transcripts in one request instead of pack_size."""
+    return max(0, (pack_size - 1) * system_prompt_tokens - overhead_tokens)
+
+
+def overhead_tokens(transcripts, model="gpt-4"):
+    """Tokens the packing instructions and delimiters add on top of the transcripts themselves."""
+    packed = count_tokens(build_packed_message(transcripts), model)
+    return max(0, packed - sum(count_tokens(text, model) for _, text in transcripts))
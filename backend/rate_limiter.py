@@ -0,0 +1,119 @@
+# backend/rate_limiter.py
+
+"""
+Token-bucket rate limiter shared by every server worker and CLI process.
+
+Bucket levels live in one small JSON file (instance/ratelimit/buckets.json)
+updated under the cross-process file lock, so N gunicorn workers together
+stay under the organization's quota instead of each assuming it has all of it.
+
+  chat.requests   SKILLSCOPE_LLM_RPM      chat completions per minute
+  chat.tokens     SKILLSCOPE_LLM_TPM      chat tokens per minute
+  audio.requests  SKILLSCOPE_WHISPER_RPM  transcription calls per minute
+
+A limit of 0 (the default) disables that bucket; with every bucket disabled
+acquire() returns immediately without touching the lock file. Token costs are
+estimated before a call and corrected afterwards with settle(), so the
+bucket tracks actual usage.
+"""
+
+import json
+import os
+import random
+import time
+
+from backend import metrics
+from backend.file_lock import locked
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATE_DIR = os.path.join(BASE_DIR, "instance", "ratelimit")
+STATE_PATH = os.path.join(STATE_DIR, "buckets.json")
+LOCK_PATH = os.path.join(STATE_DIR, "buckets.lock")
+
+LIMITS = {
+    "chat.requests": float(os.getenv("SKILLSCOPE_LLM_RPM", "0")),
+    "chat.tokens": float(os.getenv("SKILLSCOPE_LLM_TPM", "0")),
+    "audio.requests": float(os.getenv("SKILLSCOPE_WHISPER_RPM", "0")),
+}
+
+# Longest single sleep while waiting, so other workers get a look at the bucket
+MAX_SLEEP = 0.5
+
+WAIT_SECONDS = metrics.histogram(
+    "skillscope_rate_limiter_wait_seconds", "Time spent waiting for the shared rate limiter.", ("bucket",))
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+def _load_state():
+    try:
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state):
+    tmp_path = f"{STATE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _refill(state, name, now):
+    """Current level of bucket name after refilling at its per-minute rate (capacity: one minute)."""
+    capacity = LIMITS[name]
+    bucket = state.get(name, {"level": capacity, "updated": now})
+    return min(capacity, bucket["level"] + (now - bucket["updated"]) * capacity / 60)
+
+
+def acquire(amounts, timeout=None):
+    """
+    Take amounts ({bucket: cost}) from the shared buckets, waiting until all
+    of them have room. A cost above a bucket's capacity is capped to it, so
+    one oversized request waits for a full bucket instead of forever.
+    Returns the seconds spent waiting; raises RateLimitTimeout after timeout.
+    """
+    amounts = {name: cost for name, cost in amounts.items() if LIMITS.get(name)}
+    if not amounts:
+        return 0.0
+
+    started = time.monotonic()
+    while True:
+        with locked(LOCK_PATH):
+            state = _load_state()
+            now = time.time()
+            levels = {name: _refill(state, name, now) for name in amounts}
+            wait = 0.0
+            for name, cost in amounts.items():
+                cost = min(cost, LIMITS[name])
+                if levels[name] < cost:
+                    wait = max(wait, (cost - levels[name]) * 60 / LIMITS[name])
+            if wait == 0.0:
+                for name, cost in amounts.items():
+                    state[name] = {"level": levels[name] - min(cost, LIMITS[name]), "updated": now}
+                _save_state(state)
+                waited = time.monotonic() - started
+                for name in amounts:
+                    WAIT_SECONDS.observe(waited, bucket=name)
+                return waited
+
+        if timeout is not None and time.monotonic() - started + wait > timeout:
+            raise RateLimitTimeout(f"Rate limiter would wait {wait:.1f}s for {', '.join(amounts)}")
+        # Jitter so waiting workers do not all wake up at the same instant
+        time.sleep(min(wait, MAX_SLEEP) * random.uniform(1.0, 1.2))
+
+
+def settle(name, estimated, actual):
+    """Correct a bucket once the real cost is known (refunds or charges the difference)."""
+    if not LIMITS.get(name) or actual is None or actual == estimated:
+        return
+    with locked(LOCK_PATH):
+        state = _load_state()
+        now = time.time()
+        # The level may go negative: over-estimated calls are refunded, under-estimated ones leave a debt
+        level = _refill(state, name, now) - (actual - estimated)
+        state[name] = {"level": min(LIMITS[name], level), "updated": now}
+        _save_state(state)
@@ -0,0 +1,199 @@
+# backend/registry.py
+
+"""
+Registry of the rubrics in instance/rubrics/ (<id>.csv) and evaluation
+prompts in instance/prompts/ (<id>.txt).
+
+Files are loaded, validated (rubrics are compiled) and cached in memory; a
+stat() per lookup notices edits by mtime and size, so changes are picked up
+without a restart. Each distinct content is a version, named by the first
+12 hex digits of its hash, and is snapshotted write-once under
+<folder>/versions/<id>/<version>.<ext> so references stay resolvable after
+the file is edited.
+
+Request blocks and API requests refer to {"id", "version"} instead of
+carrying the rubric CSV and prompt text; resolve_block() fills those in
+right before scoring. A reference without a version means the current file.
+"""
+
+import hashlib
+import os
+import re
+import threading
+
+from backend.rubric import compile_rubric, RubricError
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUBRICS_DIR = os.path.join(BASE_DIR, "instance", "rubrics")
+PROMPTS_DIR = os.path.join(BASE_DIR, "instance", "prompts")
+
+DEFAULT_RUBRIC_ID = os.getenv("SKILLSCOPE_DEFAULT_RUBRIC", "test_rubric")
+DEFAULT_PROMPT_ID = os.getenv("SKILLSCOPE_DEFAULT_PROMPT", "test_Prompt")
+DEFAULT_PROMPT = "Evaluate this student's performance."
+
+ID_RE = re.compile(r"^[\w\-]+$")
+VERSION_RE = re.compile(r"^[0-9a-f]{12}$")
+
+
+class RegistryError(LookupError):
+    pass
+
+
+class _Kind:
+    """One registry folder: rubrics (validated by compiling) or prompts."""
+
+    def __init__(self, name, folder, ext):
+        self.name, self.folder, self.ext = name, folder, ext
+        self.versions_dir = os.path.join(folder, "versions")
+        self._current = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def path(self, item_id):
+        return os.path.join(self.folder, f"{item_id}{self.ext}")
+
+    def ids(self):
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name[:-len(self.ext)] for name in os.listdir(self.folder)
+                      if name.endswith(self.ext) and ID_RE.match(name[:-len(self.ext)]))
+
+    def _version(self, text):
+        if self.name == "rubric":
+            return compile_rubric(text).content_hash[:12]
+        return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()[:12]
+
+    def _entry(self, item_id, version, text):
+        entry = {"id": item_id, "version": version, "text": text}
+        if self.name == "rubric":
+            entry["compiled"] = compile_rubric(text)
+        return entry
+
+    def _snapshot(self, item_id, version, text):
+        """Keep a write-once copy of this version (no-op if it exists)."""
+        path = os.path.join(self.versions_dir, item_id, f"{version}{self.ext}")
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def current(self, item_id):
+        """The file's current version, reloaded when its mtime or size changed. Raises RegistryError/RubricError."""
+        if not ID_RE.match(item_id or ""):
+            raise RegistryError(f"Invalid {self.name} id: {item_id!r}")
+        path = self.path(item_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise RegistryError(f"Unknown {self.name}: {item_id}")
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._current.get(item_id)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if not text.strip():
+            raise RegistryError(f"{self.name.title()} {item_id} is empty")
+        entry = self._entry(item_id, self._version(text), text)
+        self._snapshot(item_id, entry["version"], text)
+        with self._lock:
+            self._current[item_id] = (stamp, entry)
+            self._versions[(item_id, entry["version"])] = entry
+        return entry
+
+    def get(self, item_id, version=None):
+        """A specific version (current file if version is None). Raises RegistryError/RubricError."""
+        entry = self.current(item_id)
+        if version is None or version == entry["version"]:
+            return entry
+        if not VERSION_RE.match(str(version)):
+            raise RegistryError(f"Invalid {self.name} version: {version!r}")
+
+        with self._lock:
+            cached = self._versions.get((item_id, version))
+        if cached is not None:
+            return cached
+        path = os.path.join(self.versions_dir, item_id, f"{version}{self.ext}")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            raise RegistryError(f"Unknown {self.name} version: {item_id}@{version}")
+        # Snapshots never change, so they are cached for good
+        entry = self._entry(item_id, version, text)
+        with self._lock:
+            self._versions[(item_id, version)] = entry
+        return entry
+
+    def versions(self, item_id):
+        """Snapshotted versions of item_id, oldest first."""
+        folder = os.path.join(self.versions_dir, item_id)
+        if not os.path.isdir(folder):
+            return []
+        names = [name for name in os.listdir(folder) if name.endswith(self.ext)]
+        names.sort(key=lambda name: os.path.getmtime(os.path.join(folder, name)))
+        return [name[:-len(self.ext)] for name in names]
+
+    def describe(self, item_id):
+        """Listing entry; an invalid file is listed with its error instead of failing the whole list."""
+        try:
+            entry = self.current(item_id)
+        except (RegistryError, RubricError) as e:
+            return {"id": item_id, "error": str(e)}
+        info = {"id": item_id, "version": entry["version"], "versions": self.versions(item_id)}
+        if self.name == "rubric":
+            info["rubric_hash"] = entry["compiled"].content_hash
+            info["skills"] = list(entry["compiled"].skills)
+        else:
+            info["chars"] = len(entry["text"])
+        return info
+
+
+rubrics = _Kind("rubric", RUBRICS_DIR, ".csv")
+prompts = _Kind("prompt", PROMPTS_DIR, ".txt")
+
+
+def get_rubric(rubric_id, version=None):
+    """{"id", "version", "text", "compiled"} for a registered rubric."""
+    return rubrics.get(rubric_id, version)
+
+
+def get_prompt(prompt_id, version=None):
+    """{"id", "version", "text"} for a registered prompt."""
+    return prompts.get(prompt_id, version)
+
+
+def list_rubrics():
+    return [rubrics.describe(item_id) for item_id in rubrics.ids()]
+
+
+def list_prompts():
+    return [prompts.describe(item_id) for item_id in prompts.ids()]
+
+
+def reference(entry):
+    """The {"id", "version"} that request blocks store instead of the content."""
+    return {"id": entry["id"], "version": entry["version"]}
+
+
+def resolve_block(block):
+    """
+    block with "rubric_csv" and "evaluation_prompt" filled in from its
+    "rubric_ref"/"prompt_ref" (blocks that carry the content are returned
+    as they are). Raises RegistryError or RubricError.
+    """
+    if "rubric_ref" not in block and "prompt_ref" not in block:
+        return block
+    resolved = dict(block)
+    if "rubric_ref" in block:
+        resolved["rubric_csv"] = get_rubric(block["rubric_ref"]["id"], block["rubric_ref"].get("version"))["text"]
+    if "prompt_ref" in block:
+        prompt = get_prompt(block["prompt_ref"]["id"], block["prompt_ref"].get("version"))
+        resolved["evaluation_prompt"] = prompt["text"].strip()
+    return resolved
@@ -0,0 +1,408 @@
+# backend/results_store.py
+
+"""
+Indexed store for evaluation results in instance/responses/.
+
+Result files keep their usual llm_eval_responses_<user>_<ts>.jsonl names and
+line format. Two append-only indexes sit next to them:
+  manifest.jsonl      one line per write: file, byte range, count, emails,
+                      rubric hash, model, time
+  latest_index.jsonl  one line per result: email -> file, offset, length
+  scores_index.jsonl  one line per structured result: email, cohort, rubric
+                      hash and per-skill scores (folded into rollups by
+                      backend/analytics.py)
+
+Each process folds in only the index lines added since it last looked, so
+listing files and finding a student's latest evaluation never scan the
+result files themselves.
+
+Maintenance (backend/maintenance.py) compacts manifest.jsonl and
+latest_index.jsonl down to one line per file and per student, and gzips
+result files untouched for SKILLSCOPE_RESULTS_ARCHIVE_DAYS into
+<name>.jsonl.gz; file_path()/read_range() read archived files transparently.
+"""
+
+import gzip
+import json
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+from backend.file_lock import locked
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESPONSES_DIR = os.path.join(BASE_DIR, "instance", "responses")
+MANIFEST_PATH = os.path.join(RESPONSES_DIR, "manifest.jsonl")
+LATEST_PATH = os.path.join(RESPONSES_DIR, "latest_index.jsonl")
+SCORES_PATH = os.path.join(RESPONSES_DIR, "scores_index.jsonl")
+LOCK_PATH = os.path.join(RESPONSES_DIR, "results.lock")
+
+RESULT_FILE_RE = re.compile(r"^llm_eval_responses_[\w\-]+\.jsonl$")
+ARCHIVE_AFTER_SECONDS = float(os.getenv("SKILLSCOPE_RESULTS_ARCHIVE_DAYS", "30")) * 86400
+
+_state_lock = threading.Lock()
+_files = {}
+_manifest_pos = 0
+_latest = {}
+_latest_pos = 0
+_inodes = {}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def output_filename(transcripts):
+    """Smart default name: first student's user part plus a UTC timestamp."""
+    email = transcripts[0].get("email", "batch") if transcripts else "batch"
+    user = re.sub(r"[^\w\-]", "_", email.split("@")[0])
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%MZ")
+    return f"llm_eval_responses_{user}_{timestamp}.jsonl"
+
+
+def is_result_filename(filename):
+    return bool(RESULT_FILE_RE.match(filename or ""))
+
+
+def _rewritten(path, pos):
+    """True if path was replaced (compacted or rebuilt) since this process last read it."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    inode, _inodes[path] = _inodes.get(path), stat.st_ino
+    return (inode is not None and inode != stat.st_ino) or stat.st_size < pos
+
+
+def _tail(path, pos, apply):
+    """Feed complete lines after byte pos to apply(); returns the new position."""
+    if not os.path.exists(path):
+        return pos
+    with open(path, "rb") as f:
+        f.seek(pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            pos += len(line)
+            try:
+                apply(json.loads(line))
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return pos
+
+
+def score_record(result, filename, rubric_hash=None, model=None, written_at=None):
+    """scores_index line for a result with per-skill scores, or None."""
+    if not result.get("scores"):
+        return None
+    return {
+        "email": result.get("email", "unknown"), "cohort": result.get("cohort"),
+        "transcript_id": result.get("transcript_id"), "rubric_hash": rubric_hash or result.get("rubric_hash"), "model": model, "filename": filename,
+        "evaluated_at": result.get("evaluated_at", written_at), "overall_score": result.get("overall_score"),
+        "scores": {skill: s["score"] for skill, s in result["scores"].items()},
+        "levels": {skill: s["level"] for skill, s in result["scores"].items()}
+    }
+
+
+def _apply_manifest(record):
+    # Compacted manifest lines cover several writes, from first_written_at to written_at
+    info = _files.setdefault(record["filename"], {
+        "filename": record["filename"], "count": 0, "bytes": 0, "emails": set(),
+        "rubric_hashes": set(), "models": set(), "created_at": record.get("first_written_at", record["written_at"])
+    })
+    info["count"] += record["count"]
+    info["bytes"] = max(info["bytes"], record["offset"] + record["length"])
+    info["emails"].update(record.get("emails", []))
+    if record.get("rubric_hash"):
+        info["rubric_hashes"].add(record["rubric_hash"])
+    if record.get("model"):
+        info["models"].add(record["model"])
+    info["updated_at"] = record["written_at"]
+
+
+def _apply_latest(record):
+    _latest[record["email"]] = record
+
+
+def _refresh():
+    global _files, _manifest_pos, _latest, _latest_pos
+    if not os.path.exists(MANIFEST_PATH) and _legacy_files():
+        rebuild_index(force=False)
+    if _rewritten(MANIFEST_PATH, _manifest_pos):
+        _files, _manifest_pos = {}, 0
+    if _rewritten(LATEST_PATH, _latest_pos):
+        _latest, _latest_pos = {}, 0
+    _manifest_pos = _tail(MANIFEST_PATH, _manifest_pos, _apply_manifest)
+    _latest_pos = _tail(LATEST_PATH, _latest_pos, _apply_latest)
+
+
+def _legacy_files():
+    """Result filenames on disk, archived (.gz) ones under their original name."""
+    if not os.path.isdir(RESPONSES_DIR):
+        return []
+    names = {name[:-3] if name.endswith(".gz") else name for name in os.listdir(RESPONSES_DIR)}
+    return sorted(name for name in names if is_result_filename(name))
+
+
+def _restore(path):
+    """Un-archive a result file that is about to be appended to."""
+    archived = f"{path}.gz"
+    if os.path.exists(path) or not os.path.exists(archived):
+        return
+    tmp_path = f"{path}.tmp"
+    with gzip.open(archived, "rb") as src, open(tmp_path, "wb") as dst:
+        dst.write(src.read())
+    os.replace(tmp_path, path)
+    os.remove(archived)
+
+
+def write_results(results, filename=None, rubric_hash=None, model=None):
+    """
+    Append result dicts to a result file (a new smart-named one by default)
+    and index them. Returns the file path.
+    """
+    if filename is None:
+        filename = output_filename(results)
+    filename = os.path.basename(filename)
+    if not is_result_filename(filename):
+        raise ValueError(f"Not a result filename: {filename}")
+
+    path = os.path.join(RESPONSES_DIR, filename)
+    os.makedirs(RESPONSES_DIR, exist_ok=True)
+
+    with locked(LOCK_PATH):
+        _restore(path)
+        refs = []
+        with open(path, "ab") as out:
+            start = out.seek(0, os.SEEK_END)
+            offset = start
+            for result in results:
+                line = (json.dumps(result) + "\n").encode("utf-8")
+                out.write(line)
+                refs.append((result, offset, len(line)))
+                offset += len(line)
+
+        written_at = _now()
+        with open(MANIFEST_PATH, "a") as manifest:
+            manifest.write(json.dumps({
+                "filename": filename, "offset": start, "length": offset - start, "count": len(results),
+                "emails": sorted({r.get("email", "unknown") for r in results}),
+                "rubric_hash": rubric_hash, "model": model, "written_at": written_at
+            }) + "\n")
+        with open(LATEST_PATH, "a") as latest:
+            for result, line_offset, length in refs:
+                latest.write(json.dumps({
+                    "email": result.get("email", "unknown"), "filename": filename,
+                    "offset": line_offset, "length": length,
+                    "evaluated_at": result.get("evaluated_at", written_at),
+                    "rubric_hash": rubric_hash, "model": model
+                }) + "\n")
+        records = [score_record(result, filename, rubric_hash, model, written_at) for result in results]
+        records = [record for record in records if record]
+        if records:
+            with open(SCORES_PATH, "a") as scores:
+                scores.write("".join(json.dumps(record) + "\n" for record in records))
+
+    return path
+
+
+def _summary(info):
+    return {
+        "filename": info["filename"],
+        "count": info["count"],
+        "bytes": info["bytes"],
+        "emails": sorted(info["emails"]),
+        "rubric_hashes": sorted(info["rubric_hashes"]),
+        "models": sorted(info["models"]),
+        "created_at": info["created_at"],
+        "updated_at": info["updated_at"]
+    }
+
+
+def list_files(offset=0, limit=None, email=None, rubric_hash=None, model=None, since=None, until=None):
+    """Indexed result files, newest first, filtered and paginated. Returns (page, total)."""
+    with _state_lock:
+        _refresh()
+        files = [
+            info for info in _files.values()
+            if (email is None or email in info["emails"])
+            and (rubric_hash is None or rubric_hash in info["rubric_hashes"])
+            and (model is None or model in info["models"])
+            and (since is None or info["updated_at"] >= since)
+            and (until is None or info["created_at"] <= until)
+        ]
+        files.sort(key=lambda info: info["updated_at"], reverse=True)
+        page = files[offset:offset + limit] if limit is not None else files[offset:]
+        return [_summary(info) for info in page], len(files)
+
+
+def file_path(filename):
+    """Absolute path of an indexed result file (its .gz if archived), or None."""
+    if not is_result_filename(filename):
+        return None
+    path = os.path.join(RESPONSES_DIR, filename)
+    for candidate in (path, f"{path}.gz"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def is_archived(path):
+    return path.endswith(".gz")
+
+
+def file_size(filename):
+    """Uncompressed size of a result file."""
+    path = file_path(filename)
+    if path is None:
+        raise FileNotFoundError(filename)
+    if not is_archived(path):
+        return os.path.getsize(path)
+    # gzip keeps the uncompressed size (mod 2**32) in its last 4 bytes
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return struct.unpack("<I", f.read(4))[0]
+
+
+def read_range(filename, start=0, end=None):
+    """Bytes [start, end) of a result file."""
+    path = file_path(filename)
+    if path is None:
+        raise FileNotFoundError(filename)
+    with (gzip.open(path, "rb") if is_archived(path) else open(path, "rb")) as f:
+        f.seek(start)
+        return f.read() if end is None else f.read(max(0, end - start))
+
+
+def latest_for_email(email):
+    """
+    The most recent evaluation stored for email, or None. The result dict
+    carries a _source key ({filename, offset}) naming where it was read from.
+    """
+    with _state_lock:
+        _refresh()
+        ref = _latest.get(email)
+    if ref is None:
+        return None
+    result = json.loads(read_range(ref["filename"], ref["offset"], ref["offset"] + ref["length"]))
+    return dict(result, _source={"filename": ref["filename"], "offset": ref["offset"]})
+
+
+def rebuild_index(force=True):
+    """
+    Re-create the indexes by scanning every result file (also adopts
+    pre-index files). With force=False, does nothing if a manifest exists.
+    """
+    global _files, _manifest_pos, _latest, _latest_pos
+
+    with locked(LOCK_PATH):
+        if os.path.exists(MANIFEST_PATH) and not force:
+            return
+        manifest_lines, latest_lines, score_lines = [], [], []
+        for filename in _legacy_files():
+            path = os.path.join(RESPONSES_DIR, filename)
+            if not os.path.exists(path):
+                path = f"{path}.gz"
+            written_at = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat()
+            emails, count, offset = set(), 0, 0
+            with (gzip.open(path, "rb") if is_archived(path) else open(path, "rb")) as f:
+                for line in f:
+                    start, offset = offset, offset + len(line)
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    count += 1
+                    email = result.get("email", "unknown")
+                    emails.add(email)
+                    latest_lines.append({
+                        "email": email, "filename": filename, "offset": start, "length": len(line),
+                        "evaluated_at": result.get("evaluated_at", written_at), "rubric_hash": None, "model": None
+                    })
+                    record = score_record(result, filename, written_at=written_at)
+                    if record:
+                        score_lines.append(record)
+            manifest_lines.append({
+                "filename": filename, "offset": 0, "length": offset, "count": count, "emails": sorted(emails),
+                "rubric_hash": None, "model": None, "written_at": written_at
+            })
+
+        # Keep "latest" meaning latest by evaluation time when adopting old files
+        latest_lines.sort(key=lambda ref: ref["evaluated_at"])
+        score_lines.sort(key=lambda record: record["evaluated_at"])
+        for path, lines in ((MANIFEST_PATH, manifest_lines), (LATEST_PATH, latest_lines), (SCORES_PATH, score_lines)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                for line in lines:
+                    f.write(json.dumps(line) + "\n")
+            os.replace(tmp_path, path)
+
+        _files, _manifest_pos, _latest, _latest_pos = {}, 0, {}, 0
+
+
+def _rewrite(path, lines):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+    os.replace(tmp_path, path)
+
+
+def compact_indexes():
+    """
+    Rewrite manifest.jsonl with one line per result file and
+    latest_index.jsonl with one line per student. Returns lines dropped.
+    """
+    with locked(LOCK_PATH):
+        manifest, latest, before = {}, {}, 0
+
+        def merge(record):
+            key = (record["filename"], record.get("rubric_hash"), record.get("model"))
+            merged = manifest.get(key)
+            if merged is None:
+                manifest[key] = dict(record, first_written_at=record.get("first_written_at", record["written_at"]),
+                                     emails=sorted(record.get("emails", [])))
+                return
+            end = max(merged["offset"] + merged["length"], record["offset"] + record["length"])
+            merged["offset"] = min(merged["offset"], record["offset"])
+            merged["length"] = end - merged["offset"]
+            merged["count"] += record["count"]
+            merged["emails"] = sorted(set(merged["emails"]) | set(record.get("emails", [])))
+            merged["written_at"] = record["written_at"]
+
+        def keep_latest(record):
+            latest.pop(record["email"], None)  # re-insert so the file stays in write order
+            latest[record["email"]] = record
+
+        for path, apply in ((MANIFEST_PATH, merge), (LATEST_PATH, keep_latest)):
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    before += sum(1 for _ in f)
+                _tail(path, 0, apply)
+
+        _rewrite(MANIFEST_PATH, manifest.values())
+        _rewrite(LATEST_PATH, latest.values())
+        return before - len(manifest) - len(latest)
+
+
+def archive_files(now=None):
+    """Gzip result files not written to for ARCHIVE_AFTER_SECONDS. Returns (files, bytes saved)."""
+    now = time.time() if now is None else now
+    archived, saved = 0, 0
+    for filename in _legacy_files():
+        path = os.path.join(RESPONSES_DIR, filename)
+        with locked(LOCK_PATH):
+            if not os.path.exists(path) or now - os.path.getmtime(path) < ARCHIVE_AFTER_SECONDS:
+                continue
+            tmp_path = f"{path}.gz.tmp"
+            with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                dst.write(src.read())
+            os.utime(tmp_path, (os.path.getatime(path), os.path.getmtime(path)))
+            saved += os.path.getsize(path) - os.path.getsize(tmp_path)
+            os.replace(tmp_path, f"{path}.gz")
+            os.remove(path)
+            archived += 1
+    return archived, saved
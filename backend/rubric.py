@@ -0,0 +1,179 @@
+# backend/rubric.py
+
+"""
+Compiled rubrics.
+
+A rubric CSV (Skill,Level,Score,Description) is parsed once with the csv
+module, validated, and memoized by the hash of its normalized content. The
+compiled rubric renders a system prompt whose long, stable part (instructions
+and rubric) comes first and whose per-batch part (the evaluation task) comes
+last, so provider-side prompt caching can reuse the prefix across every
+transcript scored with the same rubric. The prompt ends with the JSON reply
+format of backend/structured_scores.py, so every skill gets a rubric level.
+"""
+
+import csv
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from backend.structured_scores import format_instructions
+
+REQUIRED_COLUMNS = ("Skill", "Level", "Score", "Description")
+MEMO_SIZE = int(os.getenv("SKILLSCOPE_RUBRIC_MEMO_SIZE", "128"))
+
+_memo = OrderedDict()
+# Exact CSV text -> content hash, so the same string (e.g. from the registry) skips re-normalizing
+_raw_hashes = OrderedDict()
+_memo_lock = threading.Lock()
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a ~4 characters/token estimate
+    tiktoken = None
+
+
+class RubricError(ValueError):
+    pass
+
+
+def normalize_rubric_csv(rubric_csv):
+    """Re-serialize the rubric so whitespace and line-ending differences hash the same."""
+    rows = []
+    for row in csv.reader(io.StringIO(rubric_csv.strip())):
+        cells = [cell.strip() for cell in row]
+        if any(cells):
+            rows.append(cells)
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows(rows)
+    return out.getvalue()
+
+
+def rubric_hash(rubric_csv):
+    return hashlib.sha256(normalize_rubric_csv(rubric_csv).encode("utf-8")).hexdigest()
+
+
+def count_tokens(text, model="gpt-4"):
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+class CompiledRubric:
+    def __init__(self, content_hash, rows):
+        self.content_hash = content_hash
+        self.rows = rows
+        self.skills = OrderedDict()
+        for row in rows:
+            self.skills.setdefault(row["Skill"], []).append(row)
+        self.readable = "\n".join(
+            f"• {row['Skill']} – {row['Level']} ({row['Score']}): {row['Description']}" for row in rows
+        )
+        self.prefix = f"""You are an expert evaluator for undergraduate student interviews.
+
+Use the following rubric to assess the quality of the responses:
+
+{self.readable}
+"""
+        self._prompts = {}
+        self._prompt_lock = threading.Lock()
+
+    def system_prompt(self, custom_prompt):
+        """Stable rubric prefix followed by the evaluation task; memoized per task."""
+        with self._prompt_lock:
+            prompt = self._prompts.get(custom_prompt)
+            if prompt is None:
+                prompt = f"""{self.prefix}
+Evaluation task:
+{custom_prompt}
+
+{format_instructions(self)}
+"""
+                self._prompts[custom_prompt] = prompt
+            return prompt
+
+    def token_counts(self, custom_prompt=None, model="gpt-4"):
+        counts = {
+            "rubric_tokens": count_tokens(self.readable, model),
+            "prefix_tokens": count_tokens(self.prefix, model),
+        }
+        if custom_prompt is not None:
+            counts["system_prompt_tokens"] = count_tokens(self.system_prompt(custom_prompt), model)
+        counts["estimated"] = tiktoken is None
+        return counts
+
+    def summary(self, model="gpt-4"):
+        return {
+            "rubric_hash": self.content_hash,
+            "skills": {skill: [{"level": r["Level"], "score": r["Score"]} for r in rows]
+                       for skill, rows in self.skills.items()},
+            "rows": len(self.rows),
+            **self.token_counts(model=model)
+        }
+
+
+def _parse(normalized_csv):
+    reader = csv.DictReader(io.StringIO(normalized_csv))
+    header = [h.strip() for h in (reader.fieldnames or [])]
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise RubricError(f"Rubric is missing column(s): {', '.join(missing)}")
+
+    rows = []
+    for line_number, raw in enumerate(reader, start=2):
+        if raw.get(None):
+            # Unquoted commas in the description spill into extra cells; fold them back
+            raw["Description"] = ", ".join([raw["Description"] or ""] + raw.pop(None))
+        row = {col: (raw.get(col) or "").strip() for col in REQUIRED_COLUMNS}
+        if not row["Skill"] or not row["Level"]:
+            raise RubricError(f"Rubric line {line_number} needs a Skill and a Level")
+        try:
+            row["Score"] = int(row["Score"])
+        except ValueError:
+            raise RubricError(f"Rubric line {line_number} has a non-integer Score: {row['Score']!r}")
+        rows.append(row)
+
+    if not rows:
+        raise RubricError("Rubric has no rows")
+    return rows
+
+
+def compile_rubric(rubric_csv):
+    """Parse and validate rubric_csv, memoized by content hash. Raises RubricError."""
+    if not rubric_csv or not rubric_csv.strip():
+        raise RubricError("Rubric is empty")
+
+    with _memo_lock:
+        compiled = _memo.get(_raw_hashes.get(rubric_csv))
+        if compiled is not None:
+            _memo.move_to_end(compiled.content_hash)
+            return compiled
+
+    normalized = normalize_rubric_csv(rubric_csv)
+    content_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    with _memo_lock:
+        compiled = _memo.get(content_hash)
+        if compiled is not None:
+            _memo.move_to_end(content_hash)
+            _raw_hashes[rubric_csv] = content_hash
+            while len(_raw_hashes) > MEMO_SIZE:
+                _raw_hashes.popitem(last=False)
+            return compiled
+
+    compiled = CompiledRubric(content_hash, _parse(normalized))
+
+    with _memo_lock:
+        _memo[content_hash] = compiled
+        _raw_hashes[rubric_csv] = content_hash
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+        while len(_raw_hashes) > MEMO_SIZE:
+            _raw_hashes.popitem(last=False)
+    return compiled
@@ -0,0 +1,178 @@
+# backend/scoring_engine.py
+
+"""
+Bounded-concurrency scoring engine for SkillScope.
+Runs a scoring function over many transcripts on a thread pool, keeps at most
+`max_in_flight` LLM calls open at once, backs off and retries on 429s and
+transient failures (within a per-process retry budget), and always returns
+results in the same order as the input.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backend import metrics
+from backend.logs import get_logger
+
+log = get_logger("scoring")
+
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("SKILLSCOPE_MAX_IN_FLIGHT", "4"))
+# Upper bound for a caller-supplied max_in_flight (request payloads, CLI flags)
+MAX_IN_FLIGHT_LIMIT = int(os.getenv("SKILLSCOPE_MAX_IN_FLIGHT_LIMIT", "16"))
+DEFAULT_MAX_RETRIES = int(os.getenv("SKILLSCOPE_RATE_LIMIT_RETRIES", "5"))
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# Status codes worth retrying besides 429; 4xx client errors never are
+TRANSIENT_STATUSES = (408, 409, 500, 502, 503, 504)
+# Retry budget: each call earns RETRY_BUDGET_RATIO retries, banked up to RETRY_RESERVE
+RETRY_BUDGET_RATIO = float(os.getenv("SKILLSCOPE_RETRY_BUDGET_RATIO", "0.2"))
+RETRY_RESERVE = float(os.getenv("SKILLSCOPE_RETRY_RESERVE", "20"))
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_rate_limit_error(exc):
+    return _status_code(exc) == 429
+
+
+def is_transient_error(exc):
+    """429s, 5xx/408/409 answers, timeouts and dropped connections."""
+    status = _status_code(exc)
+    if status is not None:
+        return status == 429 or status in TRANSIENT_STATUSES
+    # The SDK's APIConnectionError / APITimeoutError carry no status code
+    return isinstance(exc, (TimeoutError, ConnectionError)) or \
+        type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class RetryBudget:
+    """
+    Caps retries at roughly `ratio` of calls so an outage does not turn every
+    request into max_retries requests. Starts with `reserve` retries banked.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, reserve=RETRY_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = reserve
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.balance = min(self.reserve, self.balance + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+retry_budget = RetryBudget()
+
+
+def retry_after_seconds(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_backoff(fn, *args, max_retries=None, base_delay=BASE_DELAY, max_delay=MAX_DELAY, **kwargs):
+    """
+    Call fn, retrying with jittered exponential backoff (or the server's
+    Retry-After) while it raises 429s or transient errors. Gives up early
+    when the process-wide retry budget is spent.
+    """
+    if max_retries is None:
+        max_retries = DEFAULT_MAX_RETRIES
+
+    retry_budget.record_call()
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_transient_error(e) or attempt >= max_retries:
+                raise
+            if not retry_budget.try_spend():
+                log.warning("⛔ Retry budget exhausted, not retrying: %s", e)
+                raise
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = min(max_delay, base_delay * (2 ** attempt))
+                delay = random.uniform(delay / 2, delay)
+            attempt += 1
+            reason = "rate_limit" if is_rate_limit_error(e) else "transient"
+            metrics.RETRIES.inc(operation=getattr(fn, "__qualname__", "call"), reason=reason)
+            log.warning("⏳ %s, retry %d/%d in %.1fs",
+                        "Rate limited" if reason == "rate_limit" else f"Transient error ({e})",
+                        attempt, max_retries, delay)
+            time.sleep(delay)
+
+
+def parse_max_in_flight(value):
+    """
+    A caller-supplied max_in_flight as an int in 1..MAX_IN_FLIGHT_LIMIT, or None
+    (use the default) for None. Raises ValueError for anything but an integer.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("max_in_flight must be an integer")
+    return max(1, min(int(value), MAX_IN_FLIGHT_LIMIT))
+
+
+def score_many(items, score_fn, max_in_flight=None, on_result=None, on_error=None):
+    """
+    Apply score_fn to every item with at most max_in_flight calls running at once
+    (never more than MAX_IN_FLIGHT_LIMIT). Results come back in input order.
+    If given, on_error(item, exc) turns a failed item into its result; without
+    it the first exception (in input order) is re-raised.
+    If given, on_result(index, result) is called as each item finishes.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    if max_in_flight is None:
+        max_in_flight = DEFAULT_MAX_IN_FLIGHT
+    max_in_flight = max(1, min(int(max_in_flight), len(items), MAX_IN_FLIGHT_LIMIT))
+
+    def run(item):
+        try:
+            return score_fn(item)
+        except Exception as e:
+            if on_error is None:
+                raise
+            log.warning("❌ Scoring failed for one item: %s", e)
+            return on_error(item, e)
+
+    if max_in_flight == 1:
+        results = []
+        for index, item in enumerate(items):
+            results.append(run(item))
+            if on_result:
+                on_result(index, results[-1])
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="scoring") as pool:
+        futures = [pool.submit(run, item) for item in items]
+        if on_result:
+            positions = {future: index for index, future in enumerate(futures)}
+            for future in as_completed(futures):
+                if future.exception() is None:
+                    on_result(positions[future], future.result())
+        return [f.result() for f in futures]
@@ -0,0 +1,253 @@
+# backend/similarity_index.py
+
+"""
+Near-duplicate transcript index: word shingles, MinHash signatures and LSH.
+
+Every stored transcript gets a NUM_HASHES-value MinHash signature of its word
+SHINGLE_SIZE-grams. Signatures are split into BANDS bands; transcripts that
+agree on every value of any band land in the same bucket, so a query only
+compares against the few candidates sharing a bucket instead of the whole
+corpus. Candidates are ranked by estimated Jaccard similarity (the share of
+equal signature values) and kept above SKILLSCOPE_NEAR_DUP_THRESHOLD.
+
+Layout under instance/transcripts/:
+  minhash.jsonl  append-only, one {"transcript_id", "id", "email", "sig"} per
+                 indexed transcript (id is the storage backend's transcript id);
+                 update() appends the entry again with "replace": true and
+                 remove() appends {"transcript_id", "removed": true}
+  minhash.lock   lock file serializing writers across processes
+
+Like the transcript store, each process folds in only the lines appended
+since it last looked; rebuild() re-creates the file from the storage backend
+(after compaction or an import changed transcript ids).
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+
+from backend.file_lock import locked
+from backend.transcript_store import TRANSCRIPT_DIR, entry_hash
+
+INDEX_PATH = os.path.join(TRANSCRIPT_DIR, "minhash.jsonl")
+LOCK_PATH = os.path.join(TRANSCRIPT_DIR, "minhash.lock")
+
+SHINGLE_SIZE = int(os.getenv("SKILLSCOPE_SHINGLE_SIZE", "5"))
+THRESHOLD = float(os.getenv("SKILLSCOPE_NEAR_DUP_THRESHOLD", "0.8"))
+# What evaluation does with near-duplicates by default: off, skip (a student's
+# resubmission of an already-scored transcript) or link (reuse a near-duplicate's
+# cached evaluation); request blocks override it with "near_duplicates"
+MODE = os.getenv("SKILLSCOPE_NEAR_DUP_MODE", "off")
+# 16 bands of 4 rows: pairs at Jaccard 0.8 share a bucket with probability ~1.0, at 0.3 ~0.12
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+_SIG_FORMAT = f"<{NUM_HASHES}I"
+_EMPTY = (0xFFFFFFFF,) * NUM_HASHES
+
+_state_lock = threading.Lock()
+_pos = 0
+_inode = None
+_entries = {}
+_buckets = {}
+
+
+def shingles(text):
+    """Set of word SHINGLE_SIZE-grams of the lowercased text (one shingle for shorter texts)."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """MinHash signature of text, or None for text without words."""
+    # One 256-byte SHAKE digest per shingle yields all NUM_HASHES independent 32-bit hashes at once
+    sig = _EMPTY
+    for shingle in shingles(text):
+        hashes = struct.unpack(_SIG_FORMAT, hashlib.shake_128(shingle.encode()).digest(NUM_HASHES * 4))
+        sig = tuple(map(min, sig, hashes))
+    return None if sig is _EMPTY else sig
+
+
+def _encode(sig):
+    return base64.b64encode(struct.pack(_SIG_FORMAT, *sig)).decode()
+
+
+def _decode(text):
+    return struct.unpack(_SIG_FORMAT, base64.b64decode(text))
+
+
+def _bands(sig):
+    return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+
+def _drop(transcript_id):
+    """Forget an entry and its band buckets."""
+    sig = _entries.pop(transcript_id)[0]
+    for key in _bands(sig):
+        bucket = _buckets[key]
+        bucket.remove(transcript_id)
+        if not bucket:
+            del _buckets[key]
+
+
+def _apply(record):
+    if record.get("removed"):
+        if record["transcript_id"] in _entries:
+            _drop(record["transcript_id"])
+        return
+    if record["transcript_id"] in _entries:
+        if not record.get("replace"):
+            return
+        _drop(record["transcript_id"])
+    sig = _decode(record["sig"])
+    _entries[record["transcript_id"]] = (sig, record.get("id"), record.get("email"))
+    for key in _bands(sig):
+        _buckets.setdefault(key, []).append(record["transcript_id"])
+
+
+def _refresh():
+    """Fold in index lines added since the last call (starting over if the index was rebuilt)."""
+    global _pos, _inode, _entries, _buckets
+    try:
+        stat = os.stat(INDEX_PATH)
+    except FileNotFoundError:
+        return
+    if stat.st_ino != _inode or stat.st_size < _pos:
+        _pos, _inode, _entries, _buckets = 0, stat.st_ino, {}, {}
+
+    with open(INDEX_PATH, "rb") as f:
+        f.seek(_pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            _pos += len(line)
+            try:
+                _apply(json.loads(line))
+            except (json.JSONDecodeError, KeyError, ValueError):
+                continue
+
+
+def _matches(sig, threshold, limit, exclude):
+    candidates = set()
+    for key in _bands(sig):
+        candidates.update(_buckets.get(key, ()))
+    candidates.discard(exclude)
+
+    matches = []
+    for candidate in candidates:
+        other, storage_id, email = _entries[candidate]
+        score = similarity(sig, other)
+        if score >= threshold:
+            matches.append({"transcript_id": candidate, "id": storage_id, "email": email,
+                            "similarity": round(score, 3)})
+    matches.sort(key=lambda match: (-match["similarity"], match["transcript_id"]))
+    return matches[:limit] if limit else matches
+
+
+def add(transcript_id, email, text, storage_id=None, threshold=None, limit=10):
+    """
+    Index a newly stored transcript and return its near-duplicates among the
+    transcripts indexed before it (same shape as query()).
+    """
+    sig = signature(text)
+    if sig is None:
+        return []
+    threshold = THRESHOLD if threshold is None else threshold
+    line = json.dumps({"transcript_id": transcript_id, "id": storage_id, "email": email, "sig": _encode(sig)}) + "\n"
+
+    with locked(LOCK_PATH), _state_lock:
+        _refresh()
+        matches = _matches(sig, threshold, limit, transcript_id)
+        if transcript_id not in _entries:
+            with open(INDEX_PATH, "a") as f:
+                f.write(line)
+            _refresh()
+    return matches
+
+
+def update(transcript_id, email, text, storage_id=None):
+    """
+    Re-index transcript_id with new text, email or storage id (its old band
+    entries are dropped). Text without words removes it. Returns False if it
+    was not indexed.
+    """
+    sig = signature(text)
+    if sig is None:
+        return remove(transcript_id)
+    line = json.dumps({"transcript_id": transcript_id, "id": storage_id, "email": email, "sig": _encode(sig),
+                       "replace": True}) + "\n"
+    return _append_if_indexed(transcript_id, line)
+
+
+def remove(transcript_id):
+    """Drop transcript_id from the index. Returns False if it was not indexed."""
+    return _append_if_indexed(transcript_id, json.dumps({"transcript_id": transcript_id, "removed": True}) + "\n")
+
+
+def _append_if_indexed(transcript_id, line):
+    with locked(LOCK_PATH), _state_lock:
+        _refresh()
+        if transcript_id not in _entries:
+            return False
+        with open(INDEX_PATH, "a") as f:
+            f.write(line)
+        _refresh()
+    return True
+
+
+def query(text, threshold=None, limit=10, exclude=None):
+    """
+    Indexed transcripts similar to text: [{"transcript_id", "id", "email",
+    "similarity"}, ...], most similar first.
+    """
+    sig = signature(text)
+    if sig is None:
+        return []
+    with _state_lock:
+        _refresh()
+        return _matches(sig, THRESHOLD if threshold is None else threshold, limit, exclude)
+
+
+def similar_to(transcript_id, threshold=None, limit=10):
+    """Near-duplicates of an indexed transcript, or None if it is not indexed."""
+    with _state_lock:
+        _refresh()
+        entry = _entries.get(transcript_id)
+        if entry is None:
+            return None
+        return _matches(entry[0], THRESHOLD if threshold is None else threshold, limit, transcript_id)
+
+
+def size():
+    with _state_lock:
+        _refresh()
+        return len(_entries)
+
+
+def rebuild(storage):
+    """Re-create the index from every transcript in storage. Returns the number indexed."""
+    count = 0
+    with locked(LOCK_PATH):
+        tmp_path = f"{INDEX_PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            for storage_id, entry in storage.scan_transcripts():
+                sig = signature(entry.get("transcript", ""))
+                if sig is None:
+                    continue
+                f.write(json.dumps({"transcript_id": entry_hash(entry["email"], entry["transcript"]),
+                                    "id": storage_id, "email": entry["email"], "sig": _encode(sig)}) + "\n")
+                count += 1
+        os.replace(tmp_path, INDEX_PATH)
+    return count
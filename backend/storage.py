@@ -0,0 +1,375 @@
+# backend/storage.py
+
+"""
+Pluggable storage for submissions, transcripts and the scored-transcript index.
+
+SKILLSCOPE_STORAGE picks the backend:
+  files   (default) the locked JSONL files under instance/: submissions.jsonl,
+          the indexed transcript log (backend/transcript_store.py) and
+          responses/scored_transcripts.jsonl
+  sqlite  one SQLite database in WAL mode (SKILLSCOPE_SQLITE_PATH) with
+          indexed tables; several server workers can read while one writes
+
+Both backends expose the same methods, so server.py and eval_requests.py
+never touch the files directly. Transcript ids are the sequence numbers
+stored with each entry for the file backend and row ids for SQLite (an
+import keeps the file ids); either way they only grow, so they also work as
+pagination cursors. import_files() seeds an empty database from the
+JSONL files (see scripts/import_to_sqlite.py).
+
+With the file backend, submissions.jsonl rotates into compressed segments
+like the transcript log (backend/log_segments.py), and the scored index is
+tailed incrementally; backend/maintenance.py compacts it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from backend import transcript_store
+from backend.file_lock import locked
+from backend.log_segments import SegmentedLog
+from backend.transcript_store import entry_hash
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SUBMISSIONS_PATH = os.path.join(BASE_DIR, "instance", "submissions", "submissions.jsonl")
+SUBMISSIONS_LOCK_PATH = os.path.join(BASE_DIR, "instance", "submissions", "submissions.lock")
+SCORED_PATH = os.path.join(BASE_DIR, "instance", "responses", "scored_transcripts.jsonl")
+SCORED_LOCK_PATH = os.path.join(BASE_DIR, "instance", "responses", "scored_transcripts.lock")
+SQLITE_PATH = os.getenv("SKILLSCOPE_SQLITE_PATH", os.path.join(BASE_DIR, "instance", "skillscope.db"))
+STORAGE = os.getenv("SKILLSCOPE_STORAGE", "files")
+
+# Rows per transaction when importing
+IMPORT_BATCH_SIZE = 500
+
+submissions_log = SegmentedLog(SUBMISSIONS_PATH, SUBMISSIONS_LOCK_PATH, time_field="submitted_at")
+
+
+class StorageError(Exception):
+    pass
+
+
+def _scored_record(result):
+    return {
+        "transcript_id": result["transcript_id"],
+        "email": result.get("email"),
+        "scored_at": result.get("evaluated_at") or datetime.now(timezone.utc).isoformat()
+    }
+
+
+class FileStorage:
+    """The JSONL files under instance/, each append guarded by a file lock."""
+
+    name = "files"
+    # Key of the request high-water mark in eval_requests' state file
+    position_key = "submissions_offset"
+
+    def __init__(self):
+        self._scored_lock = threading.Lock()
+        self._scored = {}
+        self._scored_pos = 0
+        self._scored_inode = None
+
+    def add_submission(self, entry):
+        """Log the raw submission and store its transcript unless it is a duplicate. Returns (added, id)."""
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with locked(SUBMISSIONS_LOCK_PATH):
+            with open(SUBMISSIONS_PATH, "ab") as f:
+                f.write(line)
+            submissions_log.rotate(by_age=False)
+        return transcript_store.append_transcript(entry)
+
+    def has_submissions(self):
+        return submissions_log.exists()
+
+    def iter_submissions(self, start=0):
+        """Yield (offset, entry) for submissions at or after logical offset start, archived ones included."""
+        return submissions_log.iter_records(start)
+
+    def read_submissions(self, start):
+        """Return ([(email, transcript), ...], start, end) for complete lines after logical offset start."""
+        if start > submissions_log.end():
+            start = 0  # submissions.jsonl was replaced since the last run
+
+        entries = []
+        offset = start
+        # Partial lines (a submission still being written) are left for next time
+        for line_offset, line in submissions_log.iter_lines(start):
+            offset = line_offset + len(line)
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "email" in entry and "transcript" in entry:
+                entries.append((entry["email"], entry["transcript"]))
+        return entries, start, offset
+
+    def scan_transcripts(self, start=0, email=None, since=None, until=None):
+        for entry_id, _, entry in transcript_store.scan(start=start, email=email, since=since, until=until):
+            yield entry_id, entry
+
+    def is_transcript_id(self, transcript_id):
+        return transcript_store.is_entry_id(transcript_id)
+
+    def get_transcript(self, transcript_id):
+        return transcript_store.get_entry(transcript_id)
+
+    def _refresh_scored(self):
+        """Fold in scored-index lines added since the last call (starting over if it was compacted)."""
+        try:
+            stat = os.stat(SCORED_PATH)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._scored_inode or stat.st_size < self._scored_pos:
+            self._scored, self._scored_pos, self._scored_inode = {}, 0, stat.st_ino
+
+        with open(SCORED_PATH, "rb") as f:
+            f.seek(self._scored_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._scored_pos += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Older index lines used "filename" for the same purpose
+                scored_id = entry.get("transcript_id") or entry.get("filename")
+                if scored_id:
+                    self._scored[scored_id] = (entry.get("email"), entry.get("scored_at"))
+
+    def iter_scored(self):
+        """Yield scored-index records as (transcript_id, email, scored_at), latest per transcript."""
+        with self._scored_lock:
+            self._refresh_scored()
+            records = [(scored_id, email, scored_at) for scored_id, (email, scored_at) in self._scored.items()]
+        yield from records
+
+    def load_scored_ids(self):
+        with self._scored_lock:
+            self._refresh_scored()
+            return set(self._scored)
+
+    def mark_scored(self, results):
+        lines = [json.dumps(_scored_record(r)) + "\n" for r in results if r.get("transcript_id")]
+        if not lines:
+            return 0
+
+        os.makedirs(os.path.dirname(SCORED_PATH), exist_ok=True)
+        with locked(SCORED_LOCK_PATH):
+            with open(SCORED_PATH, "a") as f:
+                f.write("".join(lines))
+        return len(lines)
+
+    def compact_scored(self):
+        """Rewrite the scored index with one line per transcript (its latest). Returns lines dropped."""
+        with locked(SCORED_LOCK_PATH):
+            if not os.path.exists(SCORED_PATH):
+                return 0
+            with open(SCORED_PATH, "rb") as f:
+                total = sum(1 for _ in f)
+            with self._scored_lock:
+                self._refresh_scored()
+                records = dict(self._scored)
+            tmp_path = f"{SCORED_PATH}.tmp"
+            with open(tmp_path, "w") as f:
+                for scored_id, (email, scored_at) in records.items():
+                    f.write(json.dumps({"transcript_id": scored_id, "email": email, "scored_at": scored_at}) + "\n")
+            os.replace(tmp_path, SCORED_PATH)
+        return total - len(records)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    transcript_id TEXT NOT NULL,
+    submitted_at TEXT,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transcript_id TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL,
+    submitted_at TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_email ON transcripts (email, id);
+CREATE INDEX IF NOT EXISTS transcripts_submitted_at ON transcripts (submitted_at);
+CREATE TABLE IF NOT EXISTS scored (
+    transcript_id TEXT PRIMARY KEY,
+    email TEXT,
+    scored_at TEXT
+);
+"""
+
+
+class SQLiteStorage:
+    """Submissions, transcripts and the scored index in one WAL-mode SQLite database."""
+
+    name = "sqlite"
+    position_key = "submissions_rowid"
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork (e.g. gunicorn workers)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def add_submission(self, entry):
+        digest = entry_hash(entry["email"], entry["transcript"])
+        payload = json.dumps(entry)
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO submissions (email, transcript_id, submitted_at, entry) VALUES (?, ?, ?, ?)",
+                         (entry["email"], digest, entry.get("submitted_at"), payload))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO transcripts (transcript_id, email, submitted_at, entry) VALUES (?, ?, ?, ?)",
+                (digest, entry["email"], entry.get("submitted_at"), payload))
+        if cursor.rowcount == 1:
+            return True, cursor.lastrowid
+        return False, None
+
+    def has_submissions(self):
+        return self._connect().execute("SELECT 1 FROM submissions LIMIT 1").fetchone() is not None
+
+    def read_submissions(self, start):
+        """Return ([(email, transcript), ...], start, end) for submissions with row id above start."""
+        rows = self._connect().execute("SELECT id, entry FROM submissions WHERE id > ? ORDER BY id",
+                                       (start,)).fetchall()
+        entries = []
+        for _, payload in rows:
+            entry = json.loads(payload)
+            entries.append((entry["email"], entry["transcript"]))
+        return entries, start, rows[-1][0] if rows else start
+
+    def scan_transcripts(self, start=0, email=None, since=None, until=None):
+        query = "SELECT id, entry FROM transcripts WHERE id >= ?"
+        params = [start]
+        if email is not None:
+            query += " AND email = ?"
+            params.append(email)
+        if since is not None:
+            query += " AND submitted_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND submitted_at <= ?"
+            params.append(until)
+        for transcript_id, payload in self._connect().execute(query + " ORDER BY id", params):
+            yield transcript_id, json.loads(payload)
+
+    def is_transcript_id(self, transcript_id):
+        return self.get_transcript(transcript_id) is not None
+
+    def get_transcript(self, transcript_id):
+        row = self._connect().execute("SELECT entry FROM transcripts WHERE id = ?", (transcript_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_scored_ids(self):
+        return {row[0] for row in self._connect().execute("SELECT transcript_id FROM scored")}
+
+    def mark_scored(self, results):
+        records = [_scored_record(r) for r in results if r.get("transcript_id")]
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO scored (transcript_id, email, scored_at) VALUES (?, ?, ?)",
+                             [(r["transcript_id"], r["email"], r["scored_at"]) for r in records])
+        return len(records)
+
+    def _insert_batches(self, sql, rows):
+        conn = self._connect()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                with conn:
+                    conn.executemany(sql, batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(sql, batch)
+
+    def import_files(self, state=None):
+        """
+        Copy submissions.jsonl, the transcript log and the scored index into
+        this (empty) database in batched transactions, keeping their order.
+
+        state is eval_requests' state dict; its byte-offset high-water mark is
+        translated to the matching submission row id so the next request
+        block only holds submissions the file backend had not handed out yet.
+        Returns counts of imported rows.
+        """
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM submissions UNION ALL SELECT 1 FROM transcripts LIMIT 1").fetchone():
+            raise StorageError(f"{self.path} already holds data; import only into an empty database")
+
+        counts = {"submissions": 0, "transcripts": 0, "scored": 0}
+        files = FileStorage()
+        high_water = (state or {}).get(FileStorage.position_key, 0)
+        position = {"rowid": 0}
+
+        def submission_rows():
+            for offset, line in submissions_log.iter_lines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not entry.get("email") or not entry.get("transcript"):
+                    continue
+                counts["submissions"] += 1
+                if offset + len(line) <= high_water:
+                    position["rowid"] = counts["submissions"]
+                yield (counts["submissions"], entry["email"], entry_hash(entry["email"], entry["transcript"]),
+                       entry.get("submitted_at"), json.dumps(entry))
+
+        def transcript_rows():
+            for entry_id, entry in transcript_store.iter_entries():
+                counts["transcripts"] += 1
+                yield (entry_id, entry_hash(entry["email"], entry["transcript"]), entry["email"],
+                       entry.get("submitted_at"), json.dumps(entry))
+
+        def scored_rows():
+            for record in files.iter_scored():
+                counts["scored"] += 1
+                yield record
+
+        self._insert_batches("INSERT INTO submissions (id, email, transcript_id, submitted_at, entry) "
+                             "VALUES (?, ?, ?, ?, ?)", submission_rows())
+        self._insert_batches("INSERT OR IGNORE INTO transcripts (id, transcript_id, email, submitted_at, entry) "
+                             "VALUES (?, ?, ?, ?, ?)", transcript_rows())
+        self._insert_batches("INSERT OR REPLACE INTO scored (transcript_id, email, scored_at) VALUES (?, ?, ?)",
+                             scored_rows())
+
+        if state is not None:
+            state[self.position_key] = position["rowid"]
+        return counts
+
+
+_BACKENDS = {"files": FileStorage, "sqlite": SQLiteStorage}
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The configured backend (SKILLSCOPE_STORAGE), created on first use."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE not in _BACKENDS:
+                raise StorageError(f"Unknown SKILLSCOPE_STORAGE {STORAGE!r}; expected one of {sorted(_BACKENDS)}")
+            _storage = _BACKENDS[STORAGE]()
+        return _storage
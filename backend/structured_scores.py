@@ -0,0 +1,268 @@
+# backend/structured_scores.py
+
+"""
+Structured, per-skill scoring output.
+
+The model is asked for one JSON object per transcript:
+
+    {"skills": [{"skill": "<rubric skill>", "level": "<rubric level>", "score": <level score>}, ...],
+     "feedback": "<1–2 sentences>"}
+
+Models that support it get the same shape as a strict JSON schema through
+response_format (SKILLSCOPE_STRUCTURED_OUTPUT); the rest only see the prompt
+instructions. Either way every reply is validated against the compiled
+rubric's Skill/Level/Score rows: near misses (code fences, trailing commas,
+a level in the wrong case, a score that disagrees with its level) are
+repaired here, and only replies with nothing usable raise ScoreParseError so
+the caller can ask the model to repair them.
+"""
+
+import ast
+import json
+import os
+import re
+
+# auto: json_schema response_format for models known to support it
+# schema: always send it; off: rely on the prompt instructions only
+STRUCTURED_OUTPUT = os.getenv("SKILLSCOPE_STRUCTURED_OUTPUT", "auto")
+SCHEMA_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+REPAIR_SYSTEM_PROMPT = """You fix malformed evaluation replies.
+Rewrite the reply you are given as a single JSON object matching the schema below, keeping its judgements.
+Respond with only the JSON object."""
+
+
+class ScoreParseError(ValueError):
+    pass
+
+
+def format_instructions(compiled):
+    """Prompt text describing the reply format for this rubric."""
+    return (
+        "Respond with only a JSON object, without code fences or other text:\n"
+        '{"skills": [{"skill": "<skill>", "level": "<level>", "score": <score>}], '
+        '"feedback": "<1–2 sentences of feedback>"}\n'
+        f"Include exactly one entry for each skill: {'; '.join(compiled.skills)}.\n"
+        "Each level and score must be a Level and its Score from that skill's rubric rows."
+    )
+
+
+def json_schema(compiled):
+    """JSON schema of one evaluation reply (strict-mode compatible)."""
+    levels = sorted({row["Level"] for row in compiled.rows})
+    scores = sorted({row["Score"] for row in compiled.rows})
+    return {
+        "type": "object",
+        "properties": {
+            "skills": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "skill": {"type": "string", "enum": list(compiled.skills)},
+                        "level": {"type": "string", "enum": levels},
+                        "score": {"type": "integer", "enum": scores}
+                    },
+                    "required": ["skill", "level", "score"],
+                    "additionalProperties": False
+                }
+            },
+            "feedback": {"type": "string"}
+        },
+        "required": ["skills", "feedback"],
+        "additionalProperties": False
+    }
+
+
+def packed_json_schema(compiled):
+    """Schema of a packed reply: one evaluation per transcript id."""
+    return {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"id": {"type": "string"}, "evaluation": json_schema(compiled)},
+                    "required": ["id", "evaluation"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["results"],
+        "additionalProperties": False
+    }
+
+
+def uses_schema(model):
+    if STRUCTURED_OUTPUT == "schema":
+        return True
+    if STRUCTURED_OUTPUT == "off":
+        return False
+    return model.startswith(SCHEMA_MODEL_PREFIXES)
+
+
+def response_format(compiled, model, packed=False):
+    """response_format for a chat completion, or None when the model only gets prompt instructions."""
+    if compiled is None or not uses_schema(model):
+        return None
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "packed_rubric_scores" if packed else "rubric_scores",
+            "strict": True,
+            "schema": packed_json_schema(compiled) if packed else json_schema(compiled)
+        }
+    }
+
+
+def repair_message(reply, compiled):
+    """User message asking the model to rewrite an unusable reply."""
+    return (f"Schema:\n{json.dumps(json_schema(compiled))}\n\n"
+            f"{format_instructions(compiled)}\n\nReply to fix:\n{reply}")
+
+
+def _load_object(reply):
+    """The JSON object in reply, tolerating fences, prose, trailing commas and Python literals."""
+    match = re.search(r"\{.*\}", reply or "", re.DOTALL)
+    if not match:
+        raise ScoreParseError("No JSON object in reply")
+    text = match.group(0)
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+
+    text = re.sub(r",\s*([}\]])", r"\1", text.replace("“", '"').replace("”", '"'))
+    try:
+        return json.loads(text), True
+    except json.JSONDecodeError:
+        pass
+    try:
+        data = ast.literal_eval(re.sub(r"\btrue\b", "True", re.sub(r"\bfalse\b", "False",
+                                                                    re.sub(r"\bnull\b", "None", text))))
+    except (ValueError, SyntaxError):
+        raise ScoreParseError("Reply is not valid JSON")
+    return data, True
+
+
+def _key(text):
+    return " ".join(str(text).split()).casefold()
+
+
+def _as_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if float(value).is_integer() else None
+    match = re.match(r"\s*(-?\d+)(?:\.0+)?\s*(?:/\s*\d+)?\s*$", str(value or ""))
+    return int(match.group(1)) if match else None
+
+
+def _skill_entries(data):
+    """[(skill, level, score), ...] from a list of entries or a {skill: entry} mapping."""
+    skills = data.get("skills", data.get("scores"))
+    if isinstance(skills, dict):
+        skills = [dict(value, skill=name) if isinstance(value, dict) else {"skill": name, "score": value}
+                  for name, value in skills.items()]
+    if not isinstance(skills, list):
+        raise ScoreParseError("Reply has no skills list")
+    return [(item.get("skill"), item.get("level"), item.get("score")) for item in skills if isinstance(item, dict)]
+
+
+def parse_scores(reply, compiled):
+    """
+    Validate reply against the rubric. Returns {"scores": {skill: {"level",
+    "score"}}, "feedback", "overall_score", "max_score", "status", "missing"}
+    where status is "valid" or "repaired". Raises ScoreParseError when no
+    skill could be matched to a rubric row.
+    """
+    data, repaired = _load_object(reply)
+    if not isinstance(data, dict):
+        raise ScoreParseError("Reply is not a JSON object")
+    skills_by_key = {_key(skill): skill for skill in compiled.skills}
+
+    scores = {}
+    for name, level, score in _skill_entries(data):
+        skill = name if isinstance(name, str) and name in compiled.skills else skills_by_key.get(_key(name))
+        if skill is None or skill in scores:
+            repaired = True
+            continue
+        rows = compiled.skills[skill]
+        by_level = next((row for row in rows if row["Level"] == level), None)
+        if by_level is None:
+            by_level = next((row for row in rows if _key(row["Level"]) == _key(level)), None)
+            repaired = repaired or by_level is not None
+        score = _as_int(score)
+        by_score = next((row for row in rows if row["Score"] == score), None)
+
+        # The level is the judgement; a score that disagrees with it is taken from the rubric
+        row = by_level or by_score
+        if row is None:
+            repaired = True
+            continue
+        if by_level is None or by_level["Score"] != score:
+            repaired = True
+        scores[skill] = {"level": row["Level"], "score": row["Score"]}
+
+    if not scores:
+        raise ScoreParseError("No skill in the reply matches the rubric")
+
+    feedback = data.get("feedback")
+    if not isinstance(feedback, str):
+        feedback = "" if feedback is None else str(feedback)
+        repaired = True
+    missing = [skill for skill in compiled.skills if skill not in scores]
+    ordered = {skill: scores[skill] for skill in compiled.skills if skill in scores}
+    return {
+        "scores": ordered,
+        "feedback": feedback.strip(),
+        "overall_score": round(sum(s["score"] for s in ordered.values()) / len(ordered), 2),
+        "max_score": max(row["Score"] for row in compiled.rows),
+        "status": "repaired" if repaired or missing else "valid",
+        "missing": missing
+    }
+
+
+def render_feedback(sheet):
+    """Readable text for the UIs, which show result["feedback"] as-is."""
+    lines = [f"Score: {sheet['overall_score']:g}/{sheet['max_score']}"]
+    lines += [f"{skill}: {s['level']} ({s['score']}/{sheet['max_score']})" for skill, s in sheet["scores"].items()]
+    if sheet["feedback"]:
+        lines.append(f"Feedback: {sheet['feedback']}")
+    return "\n".join(lines)
+
+
+def result_fields(reply, compiled):
+    """
+    Fields to merge into a result for the model's reply: readable "feedback",
+    per-skill "scores", "overall_score", "score_status" (valid, repaired or
+    unparsed) and "rubric_hash". Error strings pass through untouched.
+    """
+    if compiled is None or reply.startswith("[ERROR]"):
+        return {"feedback": reply}
+    try:
+        sheet = parse_scores(reply, compiled)
+    except ScoreParseError:
+        return {"feedback": reply, "score_status": "unparsed"}
+
+    fields = {
+        "feedback": render_feedback(sheet),
+        "scores": sheet["scores"],
+        "overall_score": sheet["overall_score"],
+        "score_status": sheet["status"],
+        # Scores only mean something against their rubric; kept so rebuilt indexes can group them
+        "rubric_hash": compiled.content_hash
+    }
+    if sheet["missing"]:
+        fields["missing_skills"] = sheet["missing"]
+    return fields
+
+
+def is_usable(reply, compiled):
+    """True if reply parses (possibly after local repair); used to decide on a model repair round."""
+    try:
+        parse_scores(reply, compiled)
+        return True
+    except ScoreParseError:
+        return False
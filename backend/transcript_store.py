@@ -0,0 +1,293 @@
+# backend/transcript_store.py
+
+"""
+Append-only, indexed store for submitted transcripts.
+
+Layout under instance/transcripts/:
+  transcripts.jsonl         append-only log, one deduplicated entry per line
+  transcripts.hashes        dedupe index, one MD5 of "email::transcript" per line
+  transcripts.emails.jsonl  position index, {"email", "id", "offset", "length"} per log line
+  transcripts.lock          lock file serializing writers across processes
+  archive/transcripts/      sealed (gzip) segments of the log, see backend/log_segments.py
+
+Appends take an exclusive file lock, read only the index lines written since
+this process last looked, and write one line to each file, so a submission
+costs the same no matter how large the corpus grows.
+
+Every entry is stored with an "id": a sequence number, increasing in log
+order, that rebuild() and compact() carry over, so transcript ids survive
+compaction as well as rotation. Entries written before ids were stored keep
+their logical byte offset as their id. Offsets (logical across the archived
+segments and the live log) only locate lines and never leave this module.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from backend.file_lock import locked
+from backend.log_segments import SegmentedLog
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TRANSCRIPT_DIR = os.path.join(BASE_DIR, "instance", "transcripts")
+LOG_PATH = os.path.join(TRANSCRIPT_DIR, "transcripts.jsonl")
+HASH_INDEX_PATH = os.path.join(TRANSCRIPT_DIR, "transcripts.hashes")
+EMAIL_INDEX_PATH = os.path.join(TRANSCRIPT_DIR, "transcripts.emails.jsonl")
+LOCK_PATH = os.path.join(TRANSCRIPT_DIR, "transcripts.lock")
+
+transcript_log = SegmentedLog(LOG_PATH, LOCK_PATH, time_field="submitted_at")
+
+_state_lock = threading.Lock()
+_hashes = set()
+_hash_pos = 0
+_hash_inode = None
+_emails = {}
+_positions = {}
+_email_pos = 0
+_email_inode = None
+_next_id = 0
+
+
+def entry_hash(email, transcript):
+    key = f"{email}::{transcript}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _writer_lock():
+    """Exclusive lock held by whichever thread/process is writing the store."""
+    return locked(LOCK_PATH)
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _refresh_indexes():
+    """Pull in index lines appended (by any process) since the last refresh."""
+    global _hash_pos, _hash_inode, _email_pos, _email_inode, _hashes, _emails, _positions, _next_id
+
+    # rebuild() swaps in new index files: a different inode (or a shorter file) means start over
+    stat = _stat(HASH_INDEX_PATH)
+    if stat is not None:
+        if stat.st_ino != _hash_inode or stat.st_size < _hash_pos:
+            _hashes, _hash_pos, _hash_inode = set(), 0, stat.st_ino
+        with open(HASH_INDEX_PATH, "rb") as f:
+            f.seek(_hash_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial line from an in-progress write
+                _hashes.add(line.strip().decode())
+                _hash_pos += len(line)
+
+    stat = _stat(EMAIL_INDEX_PATH)
+    if stat is not None:
+        if stat.st_ino != _email_inode or stat.st_size < _email_pos:
+            _emails, _positions, _email_pos, _email_inode, _next_id = {}, {}, 0, stat.st_ino, 0
+        with open(EMAIL_INDEX_PATH, "rb") as f:
+            f.seek(_email_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    ref = json.loads(line)
+                    entry_id = ref.get("id", ref["offset"])
+                    _positions[entry_id] = (ref["offset"], ref["length"])
+                    _emails.setdefault(ref["email"], []).append(entry_id)
+                    _next_id = max(_next_id, entry_id + 1)
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    pass
+                _email_pos += len(line)
+
+
+def _index_line(entry_id, email, offset, length):
+    return (json.dumps({"email": email, "id": entry_id, "offset": offset, "length": length}) + "\n").encode()
+
+
+def append_transcript(entry):
+    """
+    Append entry unless the same email + transcript is already stored.
+    Returns (added, id) where id is the stored entry's transcript id.
+    """
+    digest = entry_hash(entry["email"], entry["transcript"])
+
+    with _writer_lock(), _state_lock:
+        _refresh_indexes()
+        if digest in _hashes:
+            return False, None
+
+        entry_id = _next_id
+        line = (json.dumps(dict(entry, id=entry_id)) + "\n").encode("utf-8")
+        os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+        base = transcript_log.base()
+        with open(LOG_PATH, "ab") as f:
+            offset = base + f.seek(0, os.SEEK_END)
+            f.write(line)
+        with open(HASH_INDEX_PATH, "ab") as f:
+            f.write(f"{digest}\n".encode())
+        with open(EMAIL_INDEX_PATH, "ab") as f:
+            f.write(_index_line(entry_id, entry["email"], offset, len(line)))
+
+        # Keep our own view current without re-reading what we just wrote
+        _refresh_indexes()
+        transcript_log.rotate(by_age=False)
+        return True, entry_id
+
+
+def read_entry(offset, length=None):
+    raw = transcript_log.read(offset, length)
+    if raw is None:
+        raise KeyError(offset)
+    return json.loads(raw)
+
+
+def _position(entry_id):
+    """(offset, length) of the entry with this id, or None."""
+    with _state_lock:
+        _refresh_indexes()
+        return _positions.get(entry_id)
+
+
+def ids_for_email(email):
+    with _state_lock:
+        _refresh_indexes()
+        return list(_emails.get(email, []))
+
+
+def entries_for_email(email):
+    return [get_entry(entry_id) for entry_id in ids_for_email(email)]
+
+
+def iter_entries():
+    """Yield (id, entry) for every entry in the log, archived segments included."""
+    for offset, entry in transcript_log.iter_records():
+        yield entry.get("id", offset), entry
+
+
+def is_entry_id(entry_id):
+    """True if a stored entry has this id."""
+    return _position(entry_id) is not None
+
+
+def get_entry(entry_id):
+    """Return the entry with this id, or None if there isn't one."""
+    position = _position(entry_id)
+    if position is None:
+        return None
+    try:
+        return read_entry(*position)
+    except (json.JSONDecodeError, KeyError):
+        return None
+
+
+def _in_range(entry, since, until):
+    submitted_at = entry.get("submitted_at") or ""
+    if since and submitted_at < since:
+        return False
+    if until and submitted_at > until:
+        return False
+    return True
+
+
+def scan(start=0, email=None, since=None, until=None):
+    """
+    Lazily yield (id, length, entry) for entries with an id of at least
+    start, optionally filtered by email and an ISO submitted_at range.
+    Email filters read only that student's lines via the email index.
+    """
+    if email is not None:
+        for entry_id in ids_for_email(email):
+            if entry_id < start:
+                continue
+            position = _position(entry_id)
+            try:
+                entry = read_entry(*position)
+            except (TypeError, json.JSONDecodeError, KeyError):
+                continue
+            if _in_range(entry, since, until):
+                yield entry_id, position[1], entry
+        return
+
+    # Ids increase in log order, so a known id is also where reading can begin
+    position = _position(start) if start else None
+    for offset, line in transcript_log.iter_lines(position[0] if position else 0):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        entry_id = entry.get("id", offset)
+        if entry_id >= start and _in_range(entry, since, until):
+            yield entry_id, len(line), entry
+
+
+def project(entry, entry_id, fields=None):
+    """Copy of entry with its transcript id as "id", limited to fields if given."""
+    if fields:
+        projected = {k: entry[k] for k in fields if k in entry}
+    else:
+        projected = dict(entry)
+    projected["id"] = entry_id
+    return projected
+
+
+def rebuild(entries):
+    """
+    Rewrite the log and both indexes from scratch with the given entries,
+    dropping duplicates and entries without an email or transcript. The new
+    log replaces every archived segment. Entries keep their "id"; one
+    without an id (or out of order) is numbered after the previous entry.
+    Returns the number of entries kept.
+    """
+    with _writer_lock(), _state_lock:
+        return _rebuild_locked(entries)
+
+
+def compact():
+    """Rewrite the log without duplicate or malformed lines and rebuild the indexes; ids are kept."""
+    with _writer_lock(), _state_lock:
+        entries = [dict(entry, id=entry_id) for entry_id, entry in iter_entries()]
+        return _rebuild_locked(entries)
+
+
+def _rebuild_locked(entries):
+    global _hashes, _hash_pos, _hash_inode, _emails, _positions, _email_pos, _email_inode, _next_id
+
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    seen = set()
+    last_id = -1
+    tmp_paths = {path: f"{path}.tmp" for path in (LOG_PATH, HASH_INDEX_PATH, EMAIL_INDEX_PATH)}
+    with open(tmp_paths[LOG_PATH], "wb") as out, \
+            open(tmp_paths[HASH_INDEX_PATH], "wb") as hashes, \
+            open(tmp_paths[EMAIL_INDEX_PATH], "wb") as emails:
+        for entry in entries:
+            if not entry.get("email") or not entry.get("transcript"):
+                continue
+            digest = entry_hash(entry["email"], entry["transcript"])
+            if digest in seen:
+                continue
+            seen.add(digest)
+
+            entry_id = entry.get("id")
+            if not isinstance(entry_id, int) or isinstance(entry_id, bool) or entry_id <= last_id:
+                entry_id = last_id + 1
+            last_id = entry_id
+
+            line = (json.dumps(dict(entry, id=entry_id)) + "\n").encode("utf-8")
+            offset = out.tell()
+            out.write(line)
+            hashes.write(f"{digest}\n".encode())
+            emails.write(_index_line(entry_id, entry["email"], offset, len(line)))
+
+    transcript_log.replace(tmp_paths.pop(LOG_PATH))
+    for path, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, path)
+
+    _hashes, _hash_pos, _hash_inode = set(), 0, None
+    _emails, _positions, _email_pos, _email_inode, _next_id = {}, {}, 0, None, 0
+    _refresh_indexes()
+    return len(seen)
@@ -0,0 +1,235 @@
+# backend/transcription.py
+
+"""
+Segmented, parallel Whisper transcription for long recordings.
+
+Recordings longer than SEGMENT_SECONDS are cut into overlapping segments with
+ffmpeg, transcribed concurrently (bounded, with 429 backoff), and merged back
+into one text plus timestamped segments. Results are cached per SHA-256 of the
+audio bytes under instance/transcripts/audio_cache/.
+
+ffmpeg is optional: without it, files under the API size limit are sent in a
+single call and larger ones are rejected.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from backend import metrics
+from backend import rate_limiter
+from backend.llm_client import AUDIO_TIMEOUT
+from backend.scoring_engine import call_with_backoff, score_many
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_DIR, "instance", "transcripts", "audio_cache")
+FFMPEG = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+
+SEGMENT_SECONDS = float(os.getenv("SKILLSCOPE_WHISPER_SEGMENT_SECONDS", "600"))
+OVERLAP_SECONDS = float(os.getenv("SKILLSCOPE_WHISPER_OVERLAP_SECONDS", "5"))
+MAX_IN_FLIGHT = int(os.getenv("SKILLSCOPE_WHISPER_MAX_IN_FLIGHT", "3"))
+# Speech-optimized Opus: Whisper works at 16 kHz mono internally
+SAMPLE_RATE = int(os.getenv("SKILLSCOPE_AUDIO_SAMPLE_RATE", "16000"))
+BITRATE = os.getenv("SKILLSCOPE_AUDIO_BITRATE", "24k")
+API_FILE_LIMIT = 25 * 1024 * 1024
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+class TranscriptionError(Exception):
+    pass
+
+
+def audio_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(content_hash, model):
+    return os.path.join(CACHE_DIR, f"{content_hash}.{model}.json")
+
+
+def load_cached(content_hash, model="whisper-1"):
+    try:
+        with open(_cache_path(content_hash, model), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _store_cached(content_hash, model, result):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(content_hash, model)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+
+
+def run_ffmpeg(args):
+    return subprocess.run([FFMPEG, "-hide_banner", "-nostdin", *args],
+                          capture_output=True, text=True)
+
+
+def probe_duration(path):
+    """Duration in seconds from ffmpeg's header parse, or None if it can't tell."""
+    match = _DURATION_RE.search(run_ffmpeg(["-i", path]).stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def encode_speech(path, out_path, start=None, length=None):
+    """Re-encode (a slice of) path as 16 kHz mono Opus, the cheapest form Whisper accepts."""
+    args = ["-y"]
+    if start is not None:
+        args += ["-ss", f"{start:.3f}"]
+    args += ["-i", path]
+    if length is not None:
+        args += ["-t", f"{length:.3f}"]
+    args += ["-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-c:a", "libopus", "-b:a", BITRATE,
+             "-application", "voip", out_path]
+    result = run_ffmpeg(args)
+    if result.returncode != 0:
+        raise TranscriptionError(f"ffmpeg failed: {result.stderr.strip()[-300:]}")
+    return out_path
+
+
+def plan_segments(duration, segment_seconds=SEGMENT_SECONDS, overlap_seconds=OVERLAP_SECONDS):
+    """[(start, length), ...] covering duration with overlap_seconds shared between neighbours."""
+    if duration <= segment_seconds:
+        return [(0.0, duration)]
+    step = segment_seconds - overlap_seconds
+    plan = []
+    start = 0.0
+    while start < duration:
+        plan.append((start, min(segment_seconds, duration - start)))
+        if start + segment_seconds >= duration:
+            break
+        start += step
+    return plan
+
+
+def _field(obj, name, default=None):
+    return obj.get(name, default) if isinstance(obj, dict) else getattr(obj, name, default)
+
+
+def merge_segments(pieces, overlap_seconds=OVERLAP_SECONDS):
+    """
+    Merge per-slice results [(slice_start, response), ...] into one transcript.
+    Speech inside an overlap is kept from whichever slice it sits nearer the
+    middle of, by cutting at the midpoint of each overlap window.
+    """
+    merged = []
+    for i, (start, response) in enumerate(pieces):
+        keep_from = start + overlap_seconds / 2 if i > 0 else float("-inf")
+        keep_until = pieces[i + 1][0] + overlap_seconds / 2 if i + 1 < len(pieces) else float("inf")
+
+        segments = _field(response, "segments") or []
+        if not segments:
+            text = (_field(response, "text") or "").strip()
+            if text:
+                merged.append({"start": round(start, 2), "end": None, "text": text})
+            continue
+
+        for seg in segments:
+            seg_start = start + float(_field(seg, "start", 0.0))
+            if not (keep_from <= seg_start < keep_until):
+                continue
+            merged.append({
+                "start": round(seg_start, 2),
+                "end": round(start + float(_field(seg, "end", 0.0)), 2),
+                "text": (_field(seg, "text") or "").strip()
+            })
+
+    text = " ".join(seg["text"] for seg in merged if seg["text"])
+    return text, merged
+
+
+def _default_client():
+    from backend.llm_client import get_client
+    return get_client()
+
+
+def transcribe_file(path, model="whisper-1", client=None, max_in_flight=None, bypass_cache=False,
+                    content_hash=None):
+    """
+    Transcribe an audio file. Returns
+    {"text", "segments", "duration", "audio_hash", "model", "cached"}.
+    content_hash keys the cache when path is a normalized copy (see
+    backend/audio_processing.py); by default it is the hash of path itself.
+    """
+    client = client or _default_client()
+    content_hash = content_hash or audio_hash(path)
+
+    if bypass_cache:
+        metrics.CACHE_REQUESTS.inc(cache="transcription", result="bypass")
+    else:
+        cached = load_cached(content_hash, model)
+        metrics.CACHE_REQUESTS.inc(cache="transcription", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return dict(cached, cached=True)
+
+    def transcribe_call(slice_path):
+        rate_limiter.acquire({"audio.requests": 1})
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            # Reopened per attempt so a retry uploads the whole file again
+            with open(slice_path, "rb") as audio_file:
+                response = client.audio.transcriptions.create(
+                    model=model, file=audio_file, response_format="verbose_json", timeout=AUDIO_TIMEOUT
+                )
+            outcome = "ok"
+            return response
+        finally:
+            metrics.WHISPER_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, outcome=outcome)
+
+    def transcribe_slice(item):
+        start, slice_path = item
+        return start, call_with_backoff(transcribe_call, slice_path)
+
+    with tempfile.TemporaryDirectory(prefix="skillscope-whisper-") as workdir:
+        if not FFMPEG:
+            if os.path.getsize(path) > API_FILE_LIMIT:
+                raise TranscriptionError("Recording exceeds the 25 MB API limit and ffmpeg is not installed to split it")
+            slices, duration = [(0.0, path)], None
+        else:
+            duration = probe_duration(path)
+            if duration is None:
+                # MediaRecorder webm often has no duration header; normalize first to get one
+                path = encode_speech(path, os.path.join(workdir, "full.ogg"))
+                duration = probe_duration(path)
+            if duration is None:
+                raise TranscriptionError("Could not determine recording duration")
+
+            plan = plan_segments(duration)
+            if len(plan) == 1 and os.path.getsize(path) <= API_FILE_LIMIT:
+                slices = [(0.0, path)]
+            else:
+                slices = [
+                    (start, encode_speech(path, os.path.join(workdir, f"segment_{i:03d}.ogg"), start, length))
+                    for i, (start, length) in enumerate(plan)
+                ]
+
+        pieces = score_many(slices, transcribe_slice, max_in_flight=max_in_flight or MAX_IN_FLIGHT)
+
+    text, segments = merge_segments(pieces)
+    result = {
+        "text": text,
+        "segments": segments,
+        "duration": duration,
+        "audio_hash": content_hash,
+        "model": model
+    }
+    _store_cached(content_hash, model, result)
+    return dict(result, cached=False)
@@ -0,0 +1,261 @@
+# benchmarks/bench_load.py
+
+"""
+Class-sized load test for the SkillScope server, fully offline.
+
+Boots the real Flask app (threaded werkzeug server) in a subprocess inside a
+throwaway sandbox, so instance/ data of the checkout is never touched, points
+it at the local stub OpenAI API, and replays an end-of-lab burst:
+
+  submit    every student POSTs /submit-transcript
+  upload    every student POSTs a recording to /upload-audio and polls its
+            transcription job until the transcript is ready (stub Whisper)
+  list      the instructor pages /transcripts and /list-evaluation-files
+  evaluate  the instructor POSTs all transcripts to /evaluate-transcripts
+            (cold, then again warm from the evaluation cache)
+
+For each scenario it reports requests, errors, throughput, p50/p95/p99
+latency and the server's resident memory; --json appends the run to a file
+so regressions can be tracked over time.
+
+Usage:  python -m benchmarks.bench_load --students 200 --concurrency 50 --latency 0.2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.stub_openai import start_stub_server
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCENARIOS = ("submit", "upload", "list", "evaluate")
+
+SERVE = r"""
+import sys
+from werkzeug.serving import make_server
+import server
+
+httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+print(httpd.server_port, flush=True)
+httpd.serve_forever()
+"""
+
+
+def make_sandbox():
+    """Temp dir that looks like the checkout but has its own empty instance/."""
+    sandbox = tempfile.mkdtemp(prefix="skillscope-load-")
+    for name in ("server.py", "backend", "templates", "static"):
+        os.symlink(os.path.join(BASE_DIR, name), os.path.join(sandbox, name))
+    # The default rubric lives under instance/rubrics
+    shutil.copytree(os.path.join(BASE_DIR, "instance", "rubrics"), os.path.join(sandbox, "instance", "rubrics"))
+    return sandbox
+
+
+def start_app(sandbox, stub_url):
+    env = dict(os.environ, OPENAI_BASE_URL=stub_url, OPENAI_API_KEY="stub",
+               SKILLSCOPE_LOG_LEVEL=os.getenv("SKILLSCOPE_LOG_LEVEL", "WARNING"),
+               SKILLSCOPE_EVAL_CACHE_DIR=os.path.join(sandbox, "instance", "cache", "evaluations"),
+               PYTHONPATH=sandbox)
+    log = open(os.path.join(sandbox, "server.log"), "w")
+    process = subprocess.Popen([sys.executable, "-c", SERVE], cwd=sandbox, env=env,
+                               stdout=subprocess.PIPE, stderr=log, text=True)
+    port = process.stdout.readline().strip()
+    if not port:
+        process.wait()
+        raise RuntimeError(f"server failed to start, see {log.name}")
+    return process, f"http://127.0.0.1:{port}"
+
+
+def memory_mb(pid):
+    """(current, peak) resident MB of pid from /proc, or (None, None) off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_requests(calls, concurrency):
+    """Run callables (each returning a requests.Response) concurrently; returns timing stats."""
+    def timed(call):
+        start = time.perf_counter()
+        try:
+            ok = call().ok
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        outcomes = list(pool.map(timed, calls))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(seconds for seconds, _ in outcomes)
+    return {
+        "requests": len(outcomes),
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "wall_s": wall,
+        "throughput_rps": len(outcomes) / wall if wall else None,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else None
+    }
+
+
+def students(count):
+    return [{
+        "email": f"student{i:03d}@ucsc.edu",
+        "transcript": f"Q: Explain your prompt.\nA: Student {i} walks through constraints, examples and a rubric. " * 20
+    } for i in range(count)]
+
+
+def scenario_submit(base_url, args, roster):
+    return run_requests([
+        lambda s=s: requests.post(f"{base_url}/submit-transcript", json=s, timeout=60) for s in roster
+    ], args.concurrency)
+
+
+def upload_and_transcribe(base_url, audio, i, poll_interval=0.25, timeout=300):
+    # Like the page: upload, then poll the transcription job until it is done or failed
+    response = requests.post(f"{base_url}/upload-audio", timeout=120,
+                             files={"audio": (f"s{i}.webm", audio + i.to_bytes(4, "big"), "audio/webm")},
+                             data={"filename": f"student{i:03d}.webm"})
+    if not response.ok:
+        return response
+    deadline = time.time() + timeout
+    status_url = f"{base_url}{response.json()['status_url']}"
+    while True:
+        response = requests.get(status_url, timeout=60)
+        if not response.ok or response.json()["status"] != "processing" or time.time() > deadline:
+            return response
+        time.sleep(poll_interval)
+
+
+def scenario_upload(base_url, args, roster):
+    audio = os.urandom(args.audio_kb * 1024)
+    return run_requests([lambda i=i: upload_and_transcribe(base_url, audio, i) for i in range(len(roster))],
+                        args.concurrency)
+
+
+def scenario_list(base_url, args, roster):
+    calls = [lambda: requests.get(f"{base_url}/transcripts", timeout=60),
+             lambda: requests.get(f"{base_url}/list-evaluation-files", timeout=60)]
+    cursor = 0
+    while True:
+        page = requests.get(f"{base_url}/transcripts", params={"limit": 50, "cursor": cursor,
+                                                                "fields": "name,email,submitted_at"}, timeout=60).json()
+        calls.append(lambda c=cursor: requests.get(f"{base_url}/transcripts", timeout=60,
+                                                   params={"limit": 50, "cursor": c, "fields": "name,email,submitted_at"}))
+        if page.get("next_cursor") is None:
+            break
+        cursor = page["next_cursor"]
+    # Several instructors/tabs refreshing at once
+    return run_requests(calls * args.list_repeat, args.concurrency)
+
+
+def scenario_evaluate(base_url, args, roster):
+    with open(os.path.join(BASE_DIR, "instance", "rubrics", "test_rubric.csv")) as f:
+        rubric_csv = f.read()
+    payload = {"rubric_csv": rubric_csv, "max_in_flight": args.max_in_flight,
+               "transcripts": [dict(s, name=s["email"].split("@")[0]) for s in roster]}
+    cold = run_requests([lambda: requests.post(f"{base_url}/evaluate-transcripts", json=payload, timeout=3600)], 1)
+    warm = run_requests([lambda: requests.post(f"{base_url}/evaluate-transcripts", json=payload, timeout=3600)], 1)
+    cold["warm_wall_s"] = warm["wall_s"]
+    cold["errors"] += warm["errors"]
+    return cold
+
+
+RUNNERS = {"submit": scenario_submit, "upload": scenario_upload, "list": scenario_list, "evaluate": scenario_evaluate}
+
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the SkillScope server.")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent clients for submit/upload/list")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub seconds per API call")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Extra random stub latency (seconds)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of stub responses that are 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub responses that are 500")
+    parser.add_argument("--audio-kb", type=int, default=64, help="Size of each uploaded recording")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="LLM concurrency for /evaluate-transcripts")
+    parser.add_argument("--list-repeat", type=int, default=5, help="Times the listing requests are replayed")
+    parser.add_argument("--json", help="Append this run's report as one JSON line to this file")
+    parser.add_argument("--keep-sandbox", action="store_true", help="Leave the sandbox (and server.log) on disk")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    stub, stub_url = start_stub_server(latency=args.latency, jitter=args.jitter,
+                                       rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate)
+    sandbox = make_sandbox()
+    process, base_url = start_app(sandbox, stub_url)
+    roster = students(args.students)
+
+    report = {"run_at": datetime.now(timezone.utc).isoformat(), "args": vars(args), "scenarios": {}}
+    try:
+        rss, _ = memory_mb(process.pid)
+        report["server_rss_start_mb"] = rss
+        print(f"🧪 {args.students} students, concurrency {args.concurrency}, stub latency {args.latency}s, "
+              f"429 rate {args.rate_limit_rate:.0%}, 500 rate {args.error_rate:.0%}")
+        print(f"{'scenario':>10} {'reqs':>6} {'errors':>7} {'wall s':>8} {'req/s':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8}")
+
+        for name in scenarios:
+            stats = RUNNERS[name](base_url, args, roster)
+            stats["server_rss_mb"], stats["server_peak_rss_mb"] = memory_mb(process.pid)
+            report["scenarios"][name] = stats
+            print(f"{name:>10} {stats['requests']:>6} {stats['errors']:>7} {stats['wall_s']:>8.2f} "
+                  f"{fmt(stats['throughput_rps'], '8.1f')} {fmt(stats['p50_ms'], '8.1f')} "
+                  f"{fmt(stats['p95_ms'], '8.1f')} {fmt(stats['p99_ms'], '8.1f')} {fmt(stats['server_rss_mb'], '8.1f')}")
+            if "warm_wall_s" in stats:
+                print(f"{'':>10} warm re-run from the evaluation cache: {stats['warm_wall_s']:.2f}s")
+
+        report["stub"] = {"requests": stub.config.requests, "rate_limited": stub.config.rate_limited,
+                          "errors": stub.config.errors, "max_in_flight": stub.config.max_in_flight}
+        _, peak = memory_mb(process.pid)
+        report["server_peak_rss_mb"] = peak
+        print(f"📡 stub: {stub.config.requests} API calls, {stub.config.rate_limited} × 429, "
+              f"{stub.config.errors} × 500, peak {stub.config.max_in_flight} in flight; "
+              f"server peak RSS {fmt(peak, '.1f')} MB")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+        if args.keep_sandbox:
+            print(f"📁 sandbox kept at {sandbox}")
+        else:
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "a") as f:
+            f.write(json.dumps(report) + "\n")
+        print(f"📝 Appended report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/bench_server.py
+
+"""
+Development server vs. the production entry point (gunicorn wsgi:app with
+gunicorn.conf.py), fully offline.
+
+Both servers run the same app in a throwaway sandbox against the stub OpenAI
+API (see bench_load.py); the development server is the threaded werkzeug
+server `python server.py` uses, without the debugger and reloader. Scenarios:
+
+  pages     browsers loading pages and static assets, revalidating them
+            with If-None-Match like a cached browser would
+  list      instructors fetching the full /transcripts listing (large JSON)
+  evaluate  concurrent /evaluate-transcript calls (I/O-bound on the LLM)
+
+For each server and scenario it reports throughput, p50/p95 latency and the
+bytes on the wire per response.
+
+Usage:  python -m benchmarks.bench_server --requests 400 --concurrency 32 --latency 0.2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.bench_load import fmt, make_sandbox, run_requests, start_app, students
+from benchmarks.stub_openai import start_stub_server
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCENARIOS = ("pages", "list", "evaluate")
+PAGES = ("/login", "/interview", "/interviewer", "/static/scripts/interview.js", "/static/css/style.css")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(sandbox, stub_url, args):
+    for name in ("wsgi.py", "gunicorn.conf.py"):
+        os.symlink(os.path.join(BASE_DIR, name), os.path.join(sandbox, name))
+    port = free_port()
+    env = dict(os.environ, OPENAI_BASE_URL=stub_url, OPENAI_API_KEY="stub",
+               SKILLSCOPE_LOG_LEVEL=os.getenv("SKILLSCOPE_LOG_LEVEL", "WARNING"),
+               SKILLSCOPE_EVAL_CACHE_DIR=os.path.join(sandbox, "instance", "cache", "evaluations"),
+               SKILLSCOPE_BIND=f"127.0.0.1:{port}", SKILLSCOPE_WEB_THREADS=str(args.threads), PYTHONPATH=sandbox)
+    if args.workers:
+        env["SKILLSCOPE_WEB_WORKERS"] = str(args.workers)
+    log = open(os.path.join(sandbox, "gunicorn.log"), "w")
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn"], cwd=sandbox, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            requests.get(f"{base_url}/login", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"gunicorn failed to start, see {log.name}")
+
+
+def wire_bytes(response):
+    # requests decodes gzip transparently; Content-Length is what was actually sent
+    return int(response.headers.get("Content-Length", len(response.content)))
+
+
+def scenario_pages(base_url, args):
+    # One browser's cache: the ETag each path came with
+    etags = {}
+    sizes = []
+    for path in PAGES:
+        response = requests.get(f"{base_url}{path}", timeout=30)
+        etags[path] = response.headers.get("ETag")
+        sizes.append(wire_bytes(response))
+
+    # A 304 (the browser reuses its copy) counts as a success like a 200
+    calls = [
+        lambda p=PAGES[i % len(PAGES)]: requests.get(f"{base_url}{p}", timeout=30,
+                                                     headers={"If-None-Match": etags[p]} if etags[p] else {})
+        for i in range(args.requests)
+    ]
+    stats = run_requests(calls, args.concurrency)
+    stats["first_load_bytes"] = sum(sizes)
+    revalidated = [requests.get(f"{base_url}{path}", timeout=30,
+                                headers={"If-None-Match": etags[path]} if etags[path] else {}) for path in PAGES]
+    stats["revalidate_bytes"] = sum(len(response.content) for response in revalidated)
+    return stats
+
+
+def scenario_list(base_url, args):
+    for entry in students(args.students):
+        requests.post(f"{base_url}/submit-transcript", json=entry, timeout=60)
+    calls = [lambda: requests.get(f"{base_url}/transcripts", timeout=60) for _ in range(args.requests // 4)]
+    stats = run_requests(calls, args.concurrency)
+    response = requests.get(f"{base_url}/transcripts", timeout=60)
+    stats["response_bytes"], stats["uncompressed_bytes"] = wire_bytes(response), len(response.content)
+    return stats
+
+
+def scenario_evaluate(base_url, args):
+    with open(os.path.join(BASE_DIR, "instance", "rubrics", "test_rubric.csv")) as f:
+        rubric_csv = f.read()
+    calls = [
+        lambda i=i: requests.post(f"{base_url}/evaluate-transcript", timeout=600, json={
+            "rubric": rubric_csv, "bypass_cache": True,
+            "transcript": f"Q: Explain your prompt.\nA: Attempt {i} covers constraints and examples. " * 20})
+        for i in range(args.requests // 4)
+    ]
+    return run_requests(calls, args.concurrency)
+
+
+RUNNERS = {"pages": scenario_pages, "list": scenario_list, "evaluate": scenario_evaluate}
+
+
+def run_server(name, start, stub_url, args, scenarios):
+    sandbox = make_sandbox()
+    process, base_url = start(sandbox, stub_url)
+    results = {}
+    try:
+        for scenario in scenarios:
+            stats = RUNNERS[scenario](base_url, args)
+            results[scenario] = stats
+            size = stats.get("response_bytes", stats.get("first_load_bytes"))
+            print(f"{name:>10} {scenario:>9} {stats['requests']:>6} {stats['errors']:>7} "
+                  f"{fmt(stats['throughput_rps'], '8.1f')} {fmt(stats['p50_ms'], '8.1f')} "
+                  f"{fmt(stats['p95_ms'], '8.1f')} {fmt(size, '10d')}")
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+        if args.keep_sandbox:
+            print(f"📁 {name} sandbox kept at {sandbox}")
+        else:
+            shutil.rmtree(sandbox, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the development server with gunicorn wsgi:app.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per scenario (a quarter for list/evaluate)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--students", type=int, default=200, help="Transcripts in the /transcripts listing")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub seconds per API call")
+    parser.add_argument("--workers", type=int, help="gunicorn worker processes (default: gunicorn.conf.py's, one per CPU up to 4)")
+    parser.add_argument("--threads", type=int, default=32, help="Threads per gunicorn worker")
+    parser.add_argument("--json", help="Append this run's report as one JSON line to this file")
+    parser.add_argument("--keep-sandbox", action="store_true", help="Leave the sandboxes (and server logs) on disk")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    stub, stub_url = start_stub_server(latency=args.latency)
+    report = {"run_at": datetime.now(timezone.utc).isoformat(), "args": vars(args), "servers": {}}
+    print(f"🧪 {args.requests} requests per scenario, concurrency {args.concurrency}, stub latency {args.latency}s, "
+          f"gunicorn {args.workers or 'default'}×{args.threads} gthread")
+    print(f"{'server':>10} {'scenario':>9} {'reqs':>6} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>10}")
+    try:
+        report["servers"]["dev"] = run_server("dev", start_app, stub_url, args, scenarios)
+        report["servers"]["gunicorn"] = run_server(
+            "gunicorn", lambda sandbox, url: start_gunicorn(sandbox, url, args), stub_url, args, scenarios)
+    finally:
+        stub.shutdown()
+
+    for scenario in scenarios:
+        dev, prod = report["servers"]["dev"][scenario], report["servers"]["gunicorn"][scenario]
+        if dev["throughput_rps"] and prod["throughput_rps"]:
+            print(f"📈 {scenario}: gunicorn {prod['throughput_rps'] / dev['throughput_rps']:.2f}× the dev server's throughput")
+
+    if args.json:
+        with open(args.json, "a") as f:
+            f.write(json.dumps(report) + "\n")
+        print(f"📝 Appended report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
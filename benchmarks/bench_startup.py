@@ -0,0 +1,82 @@
+# benchmarks/bench_startup.py
+
+"""
+Measure how long `import server` takes in a fresh interpreter, and check that
+booting the app does no network I/O and does not load the OpenAI SDK.
+
+Each run uses a gunicorn-style argv so argument parsing at import time would
+show up as a failure. Exits non-zero if any run is over --budget seconds,
+touches the network, or imports openai.
+
+Usage:  python -m benchmarks.bench_startup --runs 5 --budget 1.0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = r"""
+import json, socket, sys, time
+
+network_calls = []
+
+def refuse(name):
+    def guard(*args, **kwargs):
+        network_calls.append(name)
+        raise OSError(f"network disabled during startup benchmark ({name})")
+    return guard
+
+socket.socket.connect = refuse("connect")
+socket.create_connection = refuse("create_connection")
+socket.getaddrinfo = refuse("getaddrinfo")
+
+sys.argv = ["gunicorn", "--workers", "4", "--bind", "0.0.0.0:5050", "server:app"]
+start = time.perf_counter()
+import server
+elapsed = time.perf_counter() - start
+
+print(json.dumps({
+    "seconds": elapsed,
+    "network_calls": network_calls,
+    "openai_loaded": "openai" in sys.modules,
+    "routes": len(list(server.app.url_map.iter_rules())),
+}))
+"""
+
+
+def run_once():
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=BASE_DIR,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server import time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="Max seconds allowed per import")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    times = [r["seconds"] for r in runs]
+    network = sorted({call for r in runs for call in r["network_calls"]})
+    openai_loaded = any(r["openai_loaded"] for r in runs)
+
+    print(f"🚀 import server over {args.runs} run(s): "
+          f"median {statistics.median(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms "
+          f"({runs[0]['routes']} routes)")
+    print(f"   network calls: {network or 'none'}   openai imported: {openai_loaded}")
+
+    ok = max(times) < args.budget and not network and not openai_loaded
+    print("✅ within budget" if ok else "❌ startup budget exceeded")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
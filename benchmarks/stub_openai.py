@@ -0,0 +1,256 @@
+# benchmarks/stub_openai.py
+
+"""
+Local stand-in for the OpenAI HTTP API, used by the SkillScope benchmarks.
+Answers /v1/chat/completions (plain or streamed) and /v1/audio/transcriptions
+after a configurable delay and can inject 429s and 500s, so scoring and transcription code can
+be measured offline with the real OpenAI SDK. Evaluations come back in the
+structured per-skill shape, with levels picked from the rubric in the system
+prompt (deterministically per transcript).
+
+Run standalone:  python -m benchmarks.stub_openai --port 8089 --latency 0.5
+Then point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, jitter=0.0, rate_limit_rate=0.0, error_rate=0.0, audio_bytes_per_second=4000,
+                 token_interval=0.02):
+        self.latency = latency
+        # Streamed completions: latency is the time to the first token, then one token per interval
+        self.token_interval = token_interval
+        self.audio_bytes_per_second = audio_bytes_per_second
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+RUBRIC_ROW_RE = re.compile(r"^• (.+?) – (.+?) \((-?\d+)\):", re.MULTILINE)
+
+
+def stub_evaluation(system_prompt, transcript):
+    """Structured evaluation of transcript using the rubric rows found in system_prompt."""
+    skills = {}
+    for skill, level, score in RUBRIC_ROW_RE.findall(system_prompt or ""):
+        skills.setdefault(skill, []).append((level, int(score)))
+    digest = hashlib.sha1((transcript or "").encode()).digest()
+    entries = []
+    for i, (skill, rows) in enumerate(skills.items()):
+        level, score = rows[digest[i % len(digest)] % len(rows)]
+        entries.append({"skill": skill, "level": level, "score": score})
+    return {"skills": entries, "feedback": "Clear and well reasoned (stub)."}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self):
+        try:
+            return json.loads(self._read_body() or b"{}")
+        except json.JSONDecodeError:
+            return {}
+
+    def _admit(self):
+        """Count the request; returns False (after answering 429 or 500) if it was rejected."""
+        config = self.server.config
+        roll = random.random()
+        with config.lock:
+            config.requests += 1
+            limited = roll < config.rate_limit_rate
+            failed = not limited and roll < config.rate_limit_rate + config.error_rate
+            if limited:
+                config.rate_limited += 1
+            if failed:
+                config.errors += 1
+
+        if limited:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                headers={"retry-after": "0.05"},
+            )
+        elif failed:
+            self._send_json(500, {"error": {"message": "Internal error (stub)", "type": "server_error"}})
+        return not (limited or failed)
+
+    def _simulate_latency(self):
+        config = self.server.config
+        with config.lock:
+            config.in_flight += 1
+            config.max_in_flight = max(config.max_in_flight, config.in_flight)
+        try:
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+        finally:
+            with config.lock:
+                config.in_flight -= 1
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            self._chat_completion()
+        elif path.endswith("/audio/transcriptions"):
+            self._transcription()
+        else:
+            self._read_body()
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _chat_completion(self):
+        body = self._read_json()
+        if not self._admit():
+            return
+        self._simulate_latency()
+
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        system_prompt = next((m.get("content") or "" for m in body.get("messages", []) if m.get("role") == "system"), "")
+        user_content = next((m.get("content") or "" for m in body.get("messages", []) if m.get("role") == "user"), "")
+        packed = re.findall(r'<transcript id="([^"]+)">\n(.*?)\n</transcript>', user_content, re.DOTALL)
+        if packed:
+            content = json.dumps({"results": [
+                {"id": packed_id, "evaluation": stub_evaluation(system_prompt, text)} for packed_id, text in packed
+            ]})
+        else:
+            content = json.dumps(stub_evaluation(system_prompt, user_content))
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": 12,
+            "total_tokens": prompt_chars // 4 + 12,
+        }
+        if body.get("stream"):
+            self._stream_chat(body, content, usage)
+            return
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream_chat(self, body, content, usage):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(chunk):
+            data = f"data: {chunk if isinstance(chunk, str) else json.dumps(chunk)}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [] if chunk_usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                "usage": chunk_usage,
+            }
+
+        send(chunk({"role": "assistant", "content": ""}))
+        for i, token in enumerate(re.findall(r"\S+\s*", content)):
+            if i:
+                time.sleep(self.server.config.token_interval)
+            send(chunk({"content": token}))
+        send(chunk({}, finish_reason="stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send(chunk({}, chunk_usage=usage))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _transcription(self):
+        # The multipart body is not parsed: its size stands in for the audio length
+        body = self._read_body()
+        if not self._admit():
+            return
+        self._simulate_latency()
+
+        duration = max(1.0, len(body) / self.server.config.audio_bytes_per_second)
+        tag = hashlib.sha1(body).hexdigest()[:6]
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + 5.0)
+            segments.append({"id": len(segments), "start": start, "end": end,
+                             "text": f" Stub speech {len(segments)} ({tag})."})
+            start = end
+        self._send_json(200, {
+            "task": "transcribe",
+            "language": "english",
+            "duration": duration,
+            "text": "".join(seg["text"] for seg in segments).strip(),
+            "segments": segments,
+        })
+
+
+def start_stub_server(host="127.0.0.1", port=0, **config):
+    """Start the stub on a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(**config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the OpenAI API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency (seconds)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--audio-bytes-per-second", type=int, default=4000,
+                        help="Upload bytes the transcription stub treats as one second of audio")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.host, args.port, latency=args.latency,
+                                         jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+                                         error_rate=args.error_rate,
+                                         audio_bytes_per_second=args.audio_bytes_per_second)
+    print(f"🧪 Stub OpenAI API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
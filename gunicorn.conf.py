@@ -0,0 +1,70 @@
+# gunicorn.conf.py
+
+"""
+Gunicorn settings for `gunicorn wsgi:app`.
+
+The evaluation routes spend nearly all their time waiting on the OpenAI API,
+so each worker process runs many threads (gthread) instead of one request at
+a time; a few processes spread the JSON and hashing work over the CPUs. Each
+worker resumes evaluation jobs and runs its own job and audio pools, which
+already coordinate through file locks.
+
+On SIGTERM a worker stops accepting connections, finishes in-flight requests
+and then drains running evaluation jobs (server.drain). Gunicorn kills
+workers still busy after SKILLSCOPE_SHUTDOWN_GRACE_SECONDS; jobs cut off that
+way resume on the next start.
+
+Metrics are per worker process; SKILLSCOPE_METRICS_DIR (default
+instance/metrics) is where each worker publishes its values so that
+/metrics reports the sum over every worker, not just the one that took the
+scrape. An exiting worker writes a last snapshot, which child_exit folds
+into the archive of exited workers' totals.
+"""
+
+import multiprocessing
+import os
+
+# Before any worker imports backend.metrics
+os.environ.setdefault("SKILLSCOPE_METRICS_DIR",
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "metrics"))
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("SKILLSCOPE_BIND", "0.0.0.0:5050")
+worker_class = "gthread"
+workers = int(os.getenv("SKILLSCOPE_WEB_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+threads = int(os.getenv("SKILLSCOPE_WEB_THREADS", "32"))
+# gthread workers heartbeat from their main loop, so this does not cut off slow evaluations
+timeout = 120
+graceful_timeout = int(os.getenv("SKILLSCOPE_SHUTDOWN_GRACE_SECONDS", "300"))
+keepalive = 5
+# Each worker imports the app itself: executors, HTTP clients and locks are never shared across fork
+preload_app = False
+
+
+def on_starting(server):
+    from backend import metrics
+
+    metrics.clear_snapshots()
+
+
+def post_worker_init(worker):
+    from backend import metrics
+
+    metrics.start_flusher()
+
+
+def child_exit(server, worker):
+    from backend import metrics
+
+    metrics.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    from server import drain
+
+    drain(timeout=max(graceful_timeout - 5, 0))
+
+    from backend import metrics
+
+    if metrics.MULTIPROCESS_DIR:
+        metrics.write_snapshot()
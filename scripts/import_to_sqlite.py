@@ -0,0 +1,31 @@
+import os
+import sys
+import argparse
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from backend import eval_requests, similarity_index
+from backend.storage import SQLiteStorage, StorageError, SQLITE_PATH
+
+parser = argparse.ArgumentParser(description="Import the SkillScope JSONL stores into a SQLite database.")
+parser.add_argument("--db", default=SQLITE_PATH, help=f"Database to create (default: {SQLITE_PATH})")
+args = parser.parse_args()
+
+print(f"🔍 Importing instance/ JSONL files into {args.db}")
+storage = SQLiteStorage(args.db)
+
+# The request high-water mark is translated from a byte offset to a row id
+try:
+    counts = eval_requests.update_state(storage.import_files)
+except StorageError as e:
+    print(f"❌ {e}")
+    exit(1)
+
+print(f"✅ Imported {counts['submissions']} submissions, {counts['transcripts']} transcripts "
+      f"and {counts['scored']} scored ids")
+
+# Transcript ids are row ids from now on
+indexed = similarity_index.rebuild(storage)
+print(f"🪞 Re-indexed {indexed} transcripts for near-duplicate detection")
+print("👉 Set SKILLSCOPE_STORAGE=sqlite (and SKILLSCOPE_SQLITE_PATH if not the default) to use it")
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import argparse
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BASE_DIR)
+
+from backend import similarity_index, transcript_store
+from backend.storage import FileStorage
+
+submissions_path = os.path.join(BASE_DIR, "instance", "submissions", "submissions.jsonl")
+transcripts_json_path = os.path.join(BASE_DIR, "instance", "transcripts", "transcripts.json")
+
+parser = argparse.ArgumentParser(description="Rebuild or compact the SkillScope transcript store and its indexes.")
+parser.add_argument("--from-submissions", action="store_true",
+                    help="Rebuild the store from submissions.jsonl instead of compacting the existing log")
+parser.add_argument("--export-json", action="store_true",
+                    help="Also write a transcripts.json snapshot of the store")
+args = parser.parse_args()
+
+
+def load_submissions():
+    # Archived submission segments included
+    for _, entry in FileStorage().iter_submissions():
+        email = entry.get("email")
+        transcript = entry.get("transcript")
+        if not email or not transcript:
+            continue
+
+        yield {
+            "name": email.split("@")[0].replace(".", " ").title(),
+            "email": email,
+            "transcript": transcript,
+            "reflection": entry.get("reflection", ""),
+            "submitted_at": entry.get("submitted_at")
+        }
+
+
+if args.from_submissions:
+    print(f"🔍 Checking: {submissions_path}")
+    if not FileStorage().has_submissions():
+        print("❌ No submissions.jsonl found.")
+        exit(1)
+    kept = transcript_store.rebuild(load_submissions())
+    print(f"✅ Rebuilt {kept} transcripts into {transcript_store.LOG_PATH}")
+else:
+    print(f"🔍 Compacting: {transcript_store.LOG_PATH}")
+    kept = transcript_store.compact()
+    print(f"✅ Compacted store to {kept} transcripts and rebuilt indexes")
+
+# Both paths rewrite the log, so the near-duplicate index needs the new transcript ids
+indexed = similarity_index.rebuild(FileStorage())
+print(f"🪞 Re-indexed {indexed} transcripts for near-duplicate detection")
+
+if args.export_json:
+    transcripts = [entry for _, entry in transcript_store.iter_entries()]
+    with open(transcripts_json_path, "w") as outfile:
+        json.dump(transcripts, outfile, indent=2)
+    print(f"📄 Exported {len(transcripts)} transcripts to {transcripts_json_path}")
@@ -2,25 +2,90 @@ import os
 import json
 import csv
 import uuid
-from flask import Flask, request, jsonify, send_from_directory, render_template
+import time
+import logging
+from flask import Flask, request, jsonify, send_from_directory, render_template, g
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
-import openai
 from datetime import datetime
+from backend.llm_client import load_env
+
+# Load environment variables before backend modules read their settings
+load_env()
+
 from backend.llm_assess_interviews import evaluate_transcript_block
+from backend.rubric import compile_rubric, RubricError
+from backend import http_cache, metrics
+from backend.logs import configure_logging, get_logger, log_event, sampled, summarize_payload
 
-# Load environment variables
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+configure_logging()
+log = get_logger("server")
 
 # App and folders
-app = Flask(__name__, static_url_path='/static')
+app = Flask(__name__, static_folder=None)
+# Uploads raise this per route (see apply_request_limits); everything else is JSON and forms
+app.config["MAX_CONTENT_LENGTH"] = int(float(os.getenv("SKILLSCOPE_MAX_REQUEST_MB", "32")) * 1024 * 1024)
 CORS(app)
 
 @app.before_request
-def debug_route_origin():
-    print(f"➡️  Incoming request: {request.method} {request.path}")
+def apply_request_limits():
+    from backend.chunked_uploads import MAX_CHUNK_BYTES, MAX_UPLOAD_BYTES
+
+    if request.endpoint == "upload_audio":
+        # Room for the multipart envelope around the recording
+        request.max_content_length = MAX_UPLOAD_BYTES + 1024 * 1024
+    elif request.endpoint == "append_upload_chunk":
+        request.max_content_length = MAX_CHUNK_BYTES
+
+@app.errorhandler(413)
+def request_too_large(e):
+    limit = request.max_content_length
+    return jsonify({"success": False, "error": f"Request body exceeds the {limit} byte limit"}), 413
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Sample a small share of requests for debug summaries instead of logging every one
+    g.log_sampled = sampled()
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.get("request_started", time.perf_counter())
+    # The URL rule keeps label cardinality bounded (/jobs/<job_id>, not every job id)
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    if g.get("log_sampled"):
+        log_event(log, logging.DEBUG, "request", method=request.method, path=request.path,
+                  status=response.status_code, ms=round(elapsed * 1000, 1))
+    return response
+
+@app.after_request
+def compress_response(response):
+    return http_cache.compress_response(response)
+
+_jobs_resumed = False
+
+@app.before_request
+def resume_evaluation_jobs():
+    # Pick up jobs a previous server process left unfinished (once per process)
+    global _jobs_resumed
+    if not _jobs_resumed:
+        _jobs_resumed = True
+        from backend import job_queue, maintenance
+        job_queue.resume_jobs()
+        maintenance.start_background()
+
+def drain(timeout=None):
+    """
+    Graceful-shutdown hook (gunicorn.conf.py): let running evaluation jobs and
+    audio processing finish, up to timeout seconds for the jobs. Returns the
+    number of jobs still running.
+    """
+    from backend import audio_processing, job_queue
+
+    still_running = job_queue.drain(timeout)
+    audio_processing.shutdown()
+    return still_running
 
 UPLOAD_FOLDER = "instance/uploads"
 TRANSCRIPT_FOLDER = "instance/transcripts"
@@ -31,32 +96,20 @@ EVALUATION_FOLDER = "instance/evaluations"
 for folder in [UPLOAD_FOLDER, TRANSCRIPT_FOLDER, RUBRIC_FOLDER, EVALUATION_FOLDER]:
     os.makedirs(folder, exist_ok=True)
 
-#only uploads unscored transcripts based on a persistent index file (e.g., scored_transcripts.jsonl)
-
-def load_scored_filenames():
-    scored_path = os.path.join("instance", "responses", "scored_transcripts.jsonl")
-    if not os.path.exists(scored_path):
-        return set()
-    
-    scored_filenames = set()
-    with open(scored_path, "r") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                if "filename" in entry:
-                    scored_filenames.add(entry["filename"])
-            except json.JSONDecodeError:
-                continue
-    return scored_filenames
+@app.route("/static/<path:filename>", endpoint="static")
+def static_file(filename):
+    return http_cache.send_page("static", filename, max_age=http_cache.STATIC_MAX_AGE)
+
+
 @app.route("/")
 @app.route("/login")
 def login():
-    return send_from_directory("templates", "login.html")
+    return http_cache.send_page("templates", "login.html")
 
 
 @app.route("/home")
 def home():
-    return send_from_directory("templates", "index.html")
+    return http_cache.send_page("templates", "index.html")
 
 
 @app.route("/register", methods=["POST"])
@@ -69,94 +122,268 @@ def register():
 
 @app.route("/interview")
 def interview():
-    return send_from_directory("templates", "interview.html")
+    return http_cache.send_page("templates", "interview.html")
 
 
 @app.route("/interviewer")
 def interviewer():
-    return send_from_directory("templates", "interviewer.html")
+    return http_cache.send_page("templates", "interviewer.html")
 
 
 @app.route("/evaluate")
 def evaluate():
-    return send_from_directory("templates", "evaluate.html")
+    return http_cache.send_page("templates", "evaluate.html")
 
 
 @app.route("/upload-audio", methods=["POST"])
 def upload_audio():
+    """
+    Store a recording and start its transcription in the background
+    (normalization, then segmented Whisper; see backend/audio_processing.py).
+    Answers 202 with {"success", "filename", "processing", "job_id",
+    "status_url"}; GET status_url returns the transcript and its timestamped
+    segments once the job is done.
+    """
     if "audio" not in request.files:
         return jsonify({"success": False, "error": "No audio file provided"}), 400
 
+    from backend import audio_processing
+    from backend.chunked_uploads import MAX_UPLOAD_BYTES
+
     audio = request.files["audio"]
-    filename = request.form.get("filename", "interview.webm")
+    filename = secure_filename(request.form.get("filename", "interview.webm") or "")
 
     if not filename:
         return jsonify({"success": False, "error": "Filename is missing"}), 400
 
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+        return jsonify({"success": False, "error": "Upload exceeds the size limit"}), 413
+
     try:
         filepath = os.path.join(UPLOAD_FOLDER, filename)
         audio.save(filepath)
-        print(f"✅ Saved audio file to: {filepath}")
+        log.info("✅ Saved audio file to: %s", filepath)
+    except OSError as e:
+        log.exception("❌ Upload failed: %s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        # Placeholder for Whisper or other transcription logic
-        transcript_json = {
-            "text": "This is a placeholder transcript.",
-            "segments": [],
-            "speaker_labels": [],
-        }
+    # A slow or failing Whisper call never fails the upload: the job reports it instead
+    job_id = audio_processing.submit_transcription(filepath, filename)
+    return jsonify({"success": True, "filename": filename, "processing": True, "job_id": job_id,
+                    "status_url": f"/transcriptions/{job_id}"}), 202
+
+
+@app.route("/transcriptions/<job_id>", methods=["GET"])
+def transcription_status(job_id):
+    """
+    Status of an /upload-audio transcription job: {"status": "processing"},
+    then {"status": "done", "transcript": {"text", "segments",
+    "speaker_labels"}, "duration", "cached", "audio"}, or a 500 with the error
+    if it failed (POST /transcribe retries a stored recording).
+    """
+    from backend import audio_processing
+
+    job = audio_processing.transcription_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Transcription job not found"}), 404
+
+    body = {"success": job["status"] != "failed", "job_id": job_id, "filename": job["filename"],
+            "status": job["status"]}
+    if job["status"] == "failed":
+        body["error"] = job.get("error")
+        return jsonify(body), 500
+    if job["status"] == "done":
+        body.update(transcript=job["transcript"], duration=job.get("duration"), cached=job.get("cached"),
+                    audio=audio_summary(job["audio"]))
+    return jsonify(body)
+
+def audio_summary(record):
+    """What the upload routes report about a processed recording (see backend/audio_processing.py)."""
+    return {key: record[key] for key in ("audio_hash", "duplicate", "duplicate_of", "normalized", "trimmed",
+                                         "original_bytes", "stored_bytes") if key in record}
+
+# ---- Chunked, resumable uploads (init / append / status / finalize) ----
+
+def upload_error_response(e):
+    body = {"success": False, "error": str(e)}
+    if e.received is not None:
+        body["received"] = e.received
+    return jsonify(body), e.status
+
+
+@app.route("/uploads", methods=["POST"])
+def init_chunked_upload():
+    from backend import chunked_uploads
+
+    data = request.get_json(silent=True) or {}
+    try:
+        session = chunked_uploads.init_upload(data.get("filename", "interview.webm"), data.get("size"))
+    except chunked_uploads.UploadError as e:
+        return upload_error_response(e)
 
-        return jsonify({"success": True, "transcript": transcript_json})
-    except Exception as e:
-        print(f"❌ Upload or transcription failed: {e}")
-        return jsonify({"success": False, "error": str(e)}), 500
+    return jsonify({
+        "success": True,
+        "upload_id": session["id"],
+        "filename": session["filename"],
+        "max_bytes": chunked_uploads.MAX_UPLOAD_BYTES,
+        "max_chunk_bytes": chunked_uploads.MAX_CHUNK_BYTES
+    }), 201
+
+
+@app.route("/uploads/<upload_id>", methods=["GET"])
+def chunked_upload_status(upload_id):
+    from backend import chunked_uploads
+
+    try:
+        session = chunked_uploads.get_upload(upload_id)
+    except chunked_uploads.UploadError as e:
+        return upload_error_response(e)
+    return jsonify({"success": True, "received": session["received"], "status": session["status"]})
+
+
+@app.route("/uploads/<upload_id>", methods=["PUT"])
+def append_upload_chunk(upload_id):
+    from backend import chunked_uploads
+
+    try:
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        return jsonify({"success": False, "error": "offset must be an integer"}), 400
+    if offset < 0:
+        return jsonify({"success": False, "error": "offset must not be negative"}), 400
+
+    try:
+        session = chunked_uploads.append_chunk(upload_id, offset, request.stream, request.content_length)
+    except chunked_uploads.UploadError as e:
+        return upload_error_response(e)
+    return jsonify({"success": True, "received": session["received"]})
+
+
+@app.route("/uploads/<upload_id>/finalize", methods=["POST"])
+def finalize_chunked_upload(upload_id):
+    from backend import audio_processing, chunked_uploads
+
+    data = request.get_json(silent=True) or {}
+    try:
+        session, filepath = chunked_uploads.finalize_upload(upload_id, data.get("size"))
+    except chunked_uploads.UploadError as e:
+        return upload_error_response(e)
+
+    log.info("✅ Saved audio file to: %s", filepath)
+    # Normalized in the background; /transcribe waits for it if it comes in first
+    audio_processing.submit(filepath, session["filename"])
+    return jsonify({"success": True, "filename": session["filename"], "size": session["received"],
+                    "processing": True})
 
 @app.route("/transcribe", methods=["POST"])
 def transcribe_audio():
+    from backend import audio_processing, transcription
+
     data = request.get_json()
-    filename = data.get("filename")
+    filename = secure_filename(data.get("filename") or "")
 
     if not filename:
         return jsonify({"success": False, "error": "No filename provided"}), 400
 
-    audio_path = os.path.join(UPLOAD_FOLDER, filename)
-
-    if not os.path.exists(audio_path):
+    try:
+        record = audio_processing.resolve(filename)
+    except FileNotFoundError:
         return jsonify({"success": False, "error": "Audio file not found"}), 404
+    except Exception as e:
+        log.exception("❌ Audio processing error: %s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
 
     try:
-        with open(audio_path, "rb") as audio_file:
-            result = openai.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-        return jsonify({"success": True, "transcript": result.text})
+        result = transcription.transcribe_file(audio_processing.stored_path(record),
+                                               content_hash=record["audio_hash"])
+        return jsonify({
+            "success": True,
+            "transcript": result["text"],
+            "segments": result["segments"],
+            "duration": result["duration"],
+            "cached": result["cached"],
+            "audio": audio_summary(record)
+        })
     except Exception as e:
-        print(f"❌ Transcription error: {e}")
+        log.exception("❌ Transcription error: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
+def evaluation_model(payload):
+    """The model an evaluate request asks for (default gpt-4); raises ValueError for a non-string."""
+    model = payload.get("model") or "gpt-4"
+    if not isinstance(model, str):
+        raise ValueError("model must be a string")
+    return model
+
+def evaluation_sources(payload, csv_key="rubric_csv"):
+    """
+    Rubric and prompt part of a request block for an evaluation payload:
+    registry references (rubric_id/rubric_version, prompt_id/prompt_version)
+    or the rubric CSV inline under csv_key. Returns (fields, compiled rubric);
+    raises RegistryError or RubricError.
+    """
+    from backend import registry
+
+    fields = {}
+    if payload.get("rubric_id"):
+        rubric = registry.get_rubric(payload["rubric_id"], payload.get("rubric_version"))
+        fields["rubric_ref"] = registry.reference(rubric)
+        compiled = rubric["compiled"]
+    else:
+        fields["rubric_csv"] = payload.get(csv_key)
+        compiled = compile_rubric(payload.get(csv_key))
+    if payload.get("prompt_id"):
+        fields["prompt_ref"] = registry.reference(registry.get_prompt(payload["prompt_id"], payload.get("prompt_version")))
+    else:
+        fields["evaluation_prompt"] = registry.DEFAULT_PROMPT
+    return fields, compiled
+
 @app.route("/evaluate-transcript", methods=["POST"])
 def evaluate_transcript():
     from backend.llm_assess_interviews import evaluate_single_transcript
+    from backend.registry import RegistryError, resolve_block
 
     payload = request.get_json()
-    print("🧾 Incoming evaluation request payload:")
-    print(json.dumps(payload, indent=2))
+    if g.log_sampled:
+        log_event(log, logging.DEBUG, "🧾 Evaluation request", payload=summarize_payload(payload))
 
     transcript_text = payload.get("transcript")
-    rubric_csv = payload.get("rubric")
+    bypass_cache = bool(payload.get("bypass_cache"))
 
-    if not rubric_csv or not transcript_text:
+    if not (payload.get("rubric") or payload.get("rubric_id")) or not transcript_text:
         return jsonify({"error": "Missing rubric or transcript"}), 400
 
     try:
-        result = evaluate_single_transcript(transcript_text, rubric_csv)
+        sources, _ = evaluation_sources(payload, csv_key="rubric")
+    except RegistryError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except RubricError as e:
+        return jsonify({"success": False, "error": f"Invalid rubric: {e}"}), 400
+
+    try:
+        model = evaluation_model(payload)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    request_block = dict(sources, transcripts=[{"email": "anonymous", "transcript": transcript_text}])
+    if payload.get("async") or payload.get("stream"):
+        if payload.get("stream"):
+            return stream_evaluation_response(request_block, model=model, bypass_cache=bypass_cache)
+        return queue_evaluation_job(request_block, model=model, bypass_cache=bypass_cache, kind="evaluate-transcript")
+
+    try:
+        resolved = resolve_block(request_block)
+        result = evaluate_single_transcript(transcript_text, resolved["rubric_csv"], model=model,
+                                            prompt=resolved["evaluation_prompt"], bypass_cache=bypass_cache)
         return jsonify({"success": True, "result": result})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/submit-transcript", methods=["POST"])
 def submit_transcript():
-    import hashlib
+    from backend import similarity_index
+    from backend.storage import get_storage
+    from backend.transcript_store import entry_hash
 
     data = request.get_json()
     email = data.get("email")
@@ -177,178 +404,532 @@ def submit_transcript():
         "submitted_at": submitted_at
     }
 
-    # ---- Part 1: Append to submissions.jsonl (raw log) ----
-    submissions_path = os.path.join("instance", "submissions", "submissions.jsonl")
-    os.makedirs(os.path.dirname(submissions_path), exist_ok=True)
-    with open(submissions_path, "a") as f:
-        f.write(json.dumps(entry) + "\n")
-
-    # ---- Part 2: Update transcripts.json (deduplicated list) ----
-    transcripts_path = os.path.join("instance", "transcripts", "transcripts.json")
-    os.makedirs(os.path.dirname(transcripts_path), exist_ok=True)
-
-    transcripts = []
-    if os.path.exists(transcripts_path):
-        with open(transcripts_path, "r") as f:
-            try:
-                transcripts = json.load(f)
-            except json.JSONDecodeError:
-                transcripts = []
-
-    def entry_hash(e):
-        key = f"{e['email']}::{e['transcript']}"
-        return hashlib.md5(key.encode()).hexdigest()
-
-    existing_hashes = {entry_hash(e) for e in transcripts}
-    new_hash = entry_hash(entry)
-
-    if new_hash not in existing_hashes:
-        transcripts.append(entry)
-        with open(transcripts_path, "w") as f:
-            json.dump(transcripts, f, indent=2)
-
-        # ---- Part 3: Also append to transcripts.jsonl ----
-        transcripts_jsonl_path = os.path.join("instance", "transcripts", "transcripts.jsonl")
-        with open(transcripts_jsonl_path, "a") as f:
-            f.write(json.dumps(entry) + "\n")
+    # Raw submission log plus the deduplicated transcript store (SKILLSCOPE_STORAGE backend)
+    added, stored_id = get_storage().add_submission(entry)
+    if not added:
+        return jsonify({"success": True, "duplicate": True})
 
-    return jsonify({"success": True})
+    # Flag resubmissions with small edits and answers shared between students. The matches name
+    # other students, so they stay in the log and the index (instructors use /transcripts/similar)
+    near_duplicates = similarity_index.add(entry_hash(email, transcript), email, transcript, storage_id=stored_id)
+    if near_duplicates:
+        log_event(log, logging.INFO, "🪞 Near-duplicate submission", email=email,
+                  matches=[(m["email"], m["similarity"]) for m in near_duplicates])
+    return jsonify({"success": True, "duplicate": False})
 
 
-    request_block = {
-        "rubric_csv": rubric_csv,
-        "evaluation_prompt": prompt,
-        "transcripts": transcripts
-    }
+@app.route("/transcripts", methods=["GET"])
+def get_transcripts():
+    """
+    List stored transcripts.
+
+    Query parameters (all optional):
+      limit      page size; enables the paged {"items", "next_cursor"} response
+      cursor     transcript id to resume from (the previous page's next_cursor)
+      offset     number of matching entries to skip
+      email      only this student's transcripts (served from the email index)
+      since/until  ISO submitted_at bounds, inclusive
+      fields     comma-separated projection, e.g. name,email,submitted_at
+      format     "ndjson" streams one entry per line instead of a JSON body
+
+    With no parameters the full list is returned as a JSON array, as before.
+    Every entry carries an "id" (its transcript id, or row id with SQLite
+    storage) for GET /transcripts/<id>.
+    """
+    from itertools import islice
+    from flask import Response, stream_with_context
+    from backend import transcript_store
+    from backend.storage import get_storage
+
+    args = request.args
+    fields = [f.strip() for f in args.get("fields", "").split(",") if f.strip()] or None
+    email = args.get("email") or None
+    since = args.get("since") or None
+    until = args.get("until") or None
 
     try:
-        results = evaluate_transcript_block(request_block)
-        for r in results:
-            print(f"🧠 Scoring: {r['email']}...")
+        cursor = int(args.get("cursor", 0))
+        skip = int(args.get("offset", 0))
+        limit = int(args["limit"]) if args.get("limit") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "cursor, offset and limit must be integers"}), 400
 
-        # Save results to instance/responses/
-        email = results[0].get("email", "batch") if results else "batch"
-        user = re.sub(r"[^\w\-]", "_", email.split("@")[0])
-        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%MZ")
-        log_path = os.path.join("instance", "responses", f"llm_eval_responses_{user}_{timestamp}.jsonl")
+    storage = get_storage()
+    if cursor and not storage.is_transcript_id(cursor):
+        return jsonify({"success": False, "error": "Invalid cursor"}), 400
+    if limit is not None and limit < 1:
+        return jsonify({"success": False, "error": "limit must be positive"}), 400
 
-        with open(log_path, "a") as f:
-            for r in results:
-                f.write(json.dumps(r) + "\n")
+    matches = storage.scan_transcripts(start=cursor, email=email, since=since, until=until)
+    matches = islice(matches, skip, None)
 
-        print(f"✅ Evaluated {len(results)} transcript(s).")
-        return jsonify({
-            "success": True,
-            "evaluated": len(results),
-            "log_path": log_path,
-            "evaluations": results
-        })
+    if args.get("format") == "ndjson":
+        if limit is not None:
+            matches = islice(matches, limit)
 
-    except Exception as e:
-        print(f"❌ Evaluation error: {e}")
-        return jsonify({"success": False, "error": str(e)}), 500
+        def generate():
+            for entry_id, entry in matches:
+                yield json.dumps(transcript_store.project(entry, entry_id, fields)) + "\n"
 
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
-@app.route("/transcripts", methods=["GET"])
-def get_transcripts():
-    transcripts_path = os.path.join("instance", "transcripts", "transcripts.jsonl")
-    if not os.path.exists(transcripts_path):
-        return jsonify([])
+    if limit is None:
+        return jsonify([transcript_store.project(entry, entry_id, fields) for entry_id, entry in matches])
+
+    # Read one extra match to know whether another page exists
+    page = list(islice(matches, limit + 1))
+    next_cursor = page[limit][0] if len(page) > limit else None
+    return jsonify({
+        "items": [transcript_store.project(entry, entry_id, fields) for entry_id, entry in page[:limit]],
+        "next_cursor": next_cursor
+    })
 
-    with open(transcripts_path, "r") as f:
-        entries = [json.loads(line) for line in f if line.strip()]
 
-    return jsonify(entries)
+@app.route("/transcripts/similar", methods=["GET", "POST"])
+def similar_transcripts():
+    """
+    Near-duplicates from the MinHash/LSH index. GET ?transcript_id=<hash> (or
+    ?id=<transcript id>) for a stored transcript, or POST {"transcript": ...}
+    for any text; threshold (default SKILLSCOPE_NEAR_DUP_THRESHOLD) and
+    limit (default 10) are optional either way.
+    """
+    from backend import similarity_index
+    from backend.storage import get_storage
+    from backend.transcript_store import entry_hash
+
+    params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    try:
+        threshold = float(params["threshold"]) if params.get("threshold") is not None else None
+        limit = int(params.get("limit", 10))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "threshold and limit must be numbers"}), 400
+
+    if request.method == "POST":
+        if not params.get("transcript"):
+            return jsonify({"success": False, "error": "Missing transcript"}), 400
+        matches = similarity_index.query(params["transcript"], threshold=threshold, limit=limit)
+        return jsonify({"success": True, "matches": matches})
+
+    tid = params.get("transcript_id")
+    if not tid and params.get("id", "").isdigit():
+        entry = get_storage().get_transcript(int(params["id"]))
+        tid = entry_hash(entry["email"], entry["transcript"]) if entry else None
+    matches = similarity_index.similar_to(tid, threshold=threshold, limit=limit) if tid else None
+    if matches is None:
+        return jsonify({"success": False, "error": "Transcript not found in the similarity index"}), 404
+    return jsonify({"success": True, "transcript_id": tid, "matches": matches})
+
+
+@app.route("/transcripts/<int:transcript_id>", methods=["GET"])
+def get_transcript(transcript_id):
+    from backend import transcript_store
+    from backend.storage import get_storage
+
+    entry = get_storage().get_transcript(transcript_id)
+    if entry is None:
+        return jsonify({"success": False, "error": "Transcript not found"}), 404
+    return jsonify(transcript_store.project(entry, transcript_id))
 
 
 @app.route("/generate-eval-request", methods=["POST"])
 def generate_eval_request():
-    import json
-    from datetime import datetime, timezone
+    from backend.eval_requests import generate_request_block, REQUESTS_PATH
+    from backend.registry import RegistryError
 
-    submissions_path = os.path.join("instance", "submissions", "submissions.jsonl")
-    requests_path = os.path.join("instance", "requests", "llm_eval_requests.jsonl")
+    # ?full=1 (or {"full": true}) rescans every submission instead of only new ones
+    payload = request.get_json(silent=True) or {}
+    full = request.args.get("full") in ("1", "true") or bool(payload.get("full"))
 
-    RUBRIC_CSV = """Skill,Level,Score,Description
-Prompt Engineering,Missing,0,No prompt or completely irrelevant
-Prompt Engineering,Mastery,4,Clear, efficient, task-optimized
-Reflection,Missing,0,No reflection
-Reflection,Mastery,4,Insightful and thoughtful reflection"""
-
-    EVAL_PROMPT = "Evaluate the clarity and intent of each transcript as if submitted by a student in a technical interview."
-
-    transcripts = []
+    # {"near_duplicates": "skip" | "link" | "off"} overrides SKILLSCOPE_NEAR_DUP_MODE;
+    # {"rubric_id", "prompt_id"} pick registered ones instead of the defaults
     try:
-        with open(submissions_path, "r") as infile:
-            for line in infile:
-                try:
-                    entry = json.loads(line)
-                    if "email" in entry and "transcript" in entry:
-                        transcripts.append({
-                            "email": entry["email"],
-                            "transcript": entry["transcript"]
-                        })
-                except json.JSONDecodeError:
-                    continue
-    except FileNotFoundError:
+        block, status = generate_request_block(full=full, near_duplicates=payload.get("near_duplicates"),
+                                               rubric_id=payload.get("rubric_id"), prompt_id=payload.get("prompt_id"))
+    except RegistryError as e:
+        return jsonify({"status": "error", "message": str(e)}), 404
+    except RubricError as e:
+        return jsonify({"status": "error", "message": f"Invalid rubric: {e}"}), 400
+
+    if status == "missing":
         return jsonify({"status": "error", "message": "Submissions file not found"}), 404
 
-    if not transcripts:
-        return jsonify({"status": "empty", "message": "No valid transcript entries found."}), 200
-
-    request_entry = {
-        "rubric_csv": RUBRIC_CSV,
-        "evaluation_prompt": EVAL_PROMPT,
-        "transcripts": transcripts,
-        "received_at": datetime.now(timezone.utc).isoformat()
-    }
-
-    with open(requests_path, "a") as outfile:
-        outfile.write(json.dumps(request_entry) + "\n")
+    if block is None:
+        return jsonify({"status": "empty", "message": "No new unscored transcripts found.", "appended": 0}), 200
 
     return jsonify({
         "status": "success",
-        "appended": len(transcripts),
-        "saved_to": requests_path
+        "appended": len(block["transcripts"]),
+        "skipped_near_duplicates": len(block.get("near_duplicates_skipped", [])),
+        "full_rebuild": full,
+        # A full rebuild replaces the request log, archived segments included
+        "replaced": block.get("replaced"),
+        "saved_to": REQUESTS_PATH
     })
 @app.route("/evaluate-transcripts", methods=["POST"])
 def evaluate_multiple_transcripts():
-    from backend.llm_assess_interviews import evaluate_single_transcript
-
     payload = request.get_json()
-    print("📥 Full incoming JSON payload:")
-    print(json.dumps(payload, indent=2))
-    rubric_csv = payload.get("rubric_csv")
+    if g.log_sampled:
+        log_event(log, logging.DEBUG, "📥 Batch evaluation request", payload=summarize_payload(payload))
+    from backend.registry import RegistryError
+    from backend.scoring_engine import parse_max_in_flight
+
     transcripts = payload.get("transcripts")
+    bypass_cache = bool(payload.get("bypass_cache"))
+    # Clamped to SKILLSCOPE_MAX_IN_FLIGHT_LIMIT so one request cannot open hundreds of LLM calls
+    try:
+        max_in_flight = parse_max_in_flight(payload.get("max_in_flight"))
+    except ValueError:
+        return jsonify({"success": False, "error": "max_in_flight must be an integer"}), 400
+    try:
+        model = evaluation_model(payload)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-    if not rubric_csv or not transcripts:
-        print("🚨 Missing rubric or transcripts in payload.")
+    # The rubric comes from the registry (rubric_id, optional rubric_version) or inline as rubric_csv
+    if not (payload.get("rubric_csv") or payload.get("rubric_id")) or not transcripts:
+        log.warning("🚨 Missing rubric or transcripts in payload.")
         return jsonify({"success": False, "error": "Missing rubric or transcripts"}), 400
 
-    print(f"🔍 Called /evaluate-transcripts with {len(transcripts)} transcript(s).")
-    print("🔎 Payload emails:")
-    for i, t in enumerate(transcripts):
-        print(f"  {i+1:02d}. {t.get('email', 'unknown')}")
+    try:
+        sources, compiled = evaluation_sources(payload)
+    except RegistryError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except RubricError as e:
+        return jsonify({"success": False, "error": f"Invalid rubric: {e}"}), 400
 
+    log_event(log, logging.INFO, f"🔍 Called /evaluate-transcripts with {len(transcripts)} transcript(s).",
+              transcripts=len(transcripts))
+
+    request_block = {
+        **sources,
+        "transcripts": [
+            {
+                "email": entry.get("email", "unknown@none.edu"),
+                "transcript": entry.get("transcript", "")
+            }
+            for entry in transcripts
+        ],
+        # Opt-in: score several short transcripts per LLM request
+        "pack": bool(payload.get("pack")),
+        # Cohort for the analytics rollups; a transcript's own "cohort" wins
+        "cohort": payload.get("cohort"),
+        # "link" reuses a near-duplicate's cached evaluation instead of calling the LLM
+        "near_duplicates": payload.get("near_duplicates")
+    }
+    for block_entry, entry in zip(request_block["transcripts"], transcripts):
+        if entry.get("cohort"):
+            block_entry["cohort"] = entry["cohort"]
+
+    if payload.get("async") or payload.get("stream"):
+        for block_entry, entry in zip(request_block["transcripts"], transcripts):
+            block_entry["name"] = entry.get("name", "Unknown")
+        if payload.get("stream"):
+            return stream_evaluation_response(request_block, model=model, max_in_flight=max_in_flight,
+                                              bypass_cache=bypass_cache)
+        return queue_evaluation_job(request_block, model=model, max_in_flight=max_in_flight, bypass_cache=bypass_cache)
+
+    packing_stats = {}
+    try:
+        scored = evaluate_transcript_block(request_block, model=model, max_in_flight=max_in_flight,
+                                           bypass_cache=bypass_cache, stats=packing_stats)
+    except Exception as e:
+        log.exception("❌ Evaluation error: %s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    # evaluate_transcript_block keeps input order, so results line up with the payload
     results = []
-    for entry in transcripts:
-        try:
-            name = entry.get("name", "Unknown")
-            email = entry.get("email", "unknown@none.edu")
-            text = entry.get("transcript", "")
-            result = evaluate_single_transcript(text, rubric_csv)
-            results.append({ "name": name, "email": email, "score": result })
-            print(f"🧠 Scoring: {email}...")
-        except Exception as e:
-            print(f"❌ Error scoring {email}: {e}")
-            results.append({ "name": name, "email": email, "error": str(e) })
-
-    print(f"✅ Evaluated {len(results)} transcript(s).")
-    return jsonify({
+    for entry, result in zip(transcripts, scored):
+        results.append({
+            "name": entry.get("name", "Unknown"),
+            "email": result["email"],
+            "score": result
+        })
+
+    from backend.llm_assess_interviews import save_results
+    saved_path = save_results([dict(result, name=entry["name"]) for entry, result in zip(results, scored)],
+                              compiled.content_hash, model)
+
+    log.info("✅ Evaluated %d transcript(s).", len(results))
+    body = {
         "success": True,
         "result": f"Evaluated {len(results)} transcript(s).",
-        "evaluations": results
-    })
+        "evaluations": results,
+        "results_file": os.path.basename(saved_path)
+    }
+    if packing_stats:
+        body["packing"] = packing_stats
+    return jsonify(body)
+
+def stream_evaluation_response(request_block, model="gpt-4", max_in_flight=None, bypass_cache=False):
+    """
+    "stream": true on the evaluate routes: NDJSON events, one per line
+    (token deltas, then a result per transcript, then done) as they happen.
+    """
+    from flask import Response, stream_with_context
+    from backend.llm_assess_interviews import stream_evaluation
+
+    events = stream_evaluation(request_block, model=model, max_in_flight=max_in_flight, bypass_cache=bypass_cache)
+
+    def generate():
+        yield json.dumps({"event": "start", "total": len(request_block["transcripts"])}) + "\n"
+        for event in events:
+            yield json.dumps(event) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def queue_evaluation_job(request_block, model="gpt-4", max_in_flight=None, bypass_cache=False,
+                         kind="evaluate-transcripts"):
+    from backend import job_queue
+
+    job = job_queue.submit_job(request_block, model=model, max_in_flight=max_in_flight, bypass_cache=bypass_cache,
+                               kind=kind)
+    log_event(log, logging.INFO, f"📨 Queued job {job['id']} with {job['total']} transcript(s).",
+              job_id=job["id"], transcripts=job["total"])
+    return jsonify({
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events"
+    }), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    from backend import job_queue
+
+    job = job_queue.load_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    body = job_queue.job_summary(job)
+    # ?results=1 includes per-transcript results, ordered like the submitted transcripts
+    if request.args.get("results") in ("1", "true"):
+        body["results"] = sorted(job_queue.load_results(job_id), key=lambda r: r["index"])
+    return jsonify(body)
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Server-sent events: one "result" event per finished transcript, then "done"."""
+    import time
+    from flask import Response, stream_with_context
+    from backend import job_queue
+
+    if job_queue.load_job(job_id) is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    # Reconnecting EventSource clients resume after the last event they saw
+    try:
+        sent = int(request.headers.get("Last-Event-ID", request.args.get("from", -1))) + 1
+    except ValueError:
+        sent = 0
+
+    def generate():
+        # Events are numbered by result line; the byte offset carries the position between polls
+        position, offset = 0, 0
+        idle = 0.0
+        while True:
+            results, offset = job_queue.read_results(job_id, offset)
+            for result in results:
+                if position >= sent:
+                    yield f"id: {position}\nevent: result\ndata: {json.dumps(result)}\n\n"
+                position += 1
+
+            if not results:
+                job = job_queue.load_job(job_id)
+                # The last lines may have landed between the read and the status check
+                if job["status"] in job_queue.FINISHED_STATUSES and not job_queue.read_results(job_id, offset)[0]:
+                    yield f"event: done\ndata: {json.dumps(job_queue.job_summary(job))}\n\n"
+                    return
+
+            if results:
+                idle = 0.0
+            elif idle >= 15:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            time.sleep(0.5)
+            idle += 0.5
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/list-evaluation-files", methods=["GET"])
+def list_evaluation_files():
+    """
+    List saved evaluation result files, newest first.
+
+    Query parameters (all optional):
+      limit/offset  page through the listing; enables the {"items", "total"} response
+      email, rubric_hash, model  only files containing matching results
+      since/until   ISO time bounds on when a file was written
+
+    With no limit the filenames are returned as a plain JSON array.
+    """
+    from backend import results_store
+
+    args = request.args
+    try:
+        offset = int(args.get("offset", 0))
+        limit = int(args["limit"]) if args.get("limit") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "offset and limit must be integers"}), 400
+    if offset < 0 or (limit is not None and limit < 1):
+        return jsonify({"success": False, "error": "offset must be >= 0 and limit positive"}), 400
+
+    files, total = results_store.list_files(offset=offset, limit=limit, email=args.get("email") or None,
+                                            rubric_hash=args.get("rubric_hash") or None,
+                                            model=args.get("model") or None,
+                                            since=args.get("since") or None, until=args.get("until") or None)
+    if limit is None:
+        return jsonify([f["filename"] for f in files])
+    return jsonify({"items": files, "total": total,
+                    "next_offset": offset + limit if offset + limit < total else None})
+
+
+@app.route("/get-evaluation-file", methods=["GET"])
+def get_evaluation_file():
+    """
+    Return a result file as NDJSON. Supports HTTP Range requests, or
+    ?start=&end= byte bounds (end exclusive) for reading part of a file.
+    """
+    from flask import Response
+    from backend import results_store
+
+    filename = request.args.get("filename", "")
+    path = results_store.file_path(filename)
+    if path is None:
+        return jsonify({"success": False, "error": "Evaluation file not found"}), 404
+
+    if "start" not in request.args and "end" not in request.args:
+        if results_store.is_archived(path):
+            return Response(results_store.read_range(filename), mimetype="application/x-ndjson")
+        return send_from_directory(results_store.RESPONSES_DIR, filename, mimetype="application/x-ndjson",
+                                   conditional=True)
+
+    try:
+        start = int(request.args.get("start", 0))
+        end = int(request.args["end"]) if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "start and end must be integers"}), 400
+    if start < 0 or (end is not None and end < start):
+        return jsonify({"success": False, "error": "Invalid byte range"}), 400
+
+    return Response(results_store.read_range(filename, start, end), mimetype="application/x-ndjson",
+                    headers={"X-File-Size": str(results_store.file_size(filename))})
+
+
+@app.route("/evaluations/latest", methods=["GET"])
+def latest_evaluation():
+    """The most recent saved evaluation for ?email=, from the results index."""
+    from backend import results_store
+
+    email = request.args.get("email")
+    if not email:
+        return jsonify({"success": False, "error": "Missing email"}), 400
+    result = results_store.latest_for_email(email)
+    if result is None:
+        return jsonify({"success": False, "error": "No evaluation found"}), 404
+    source = result.pop("_source")
+    return jsonify({"success": True, "evaluation": result, "source": source})
+
+
+@app.route("/analytics", methods=["GET"])
+def score_analytics():
+    """
+    Score rollups from the structured results. Without ?rubric_hash= lists
+    the rubrics that have any; with it returns per-skill means and
+    distributions, optionally for one ?cohort=.
+    """
+    from backend import analytics
+
+    rubric_hash = request.args.get("rubric_hash")
+    if not rubric_hash:
+        return jsonify({"success": True, "rubrics": analytics.rubrics()})
+    summary = analytics.rollup(rubric_hash, cohort=request.args.get("cohort"))
+    if summary is None:
+        return jsonify({"success": False, "error": "No structured results for this rubric/cohort"}), 404
+    return jsonify({"success": True, **summary})
+
+
+@app.route("/rubrics", methods=["GET"])
+def list_rubrics():
+    """Registered rubrics (instance/rubrics/*.csv) with their current and past versions."""
+    from backend import registry
+    return jsonify({"success": True, "rubrics": registry.list_rubrics(), "default": registry.DEFAULT_RUBRIC_ID})
+
+
+@app.route("/rubrics/<rubric_id>", methods=["GET"])
+def get_registered_rubric(rubric_id):
+    """One registered rubric (?version= for a past one): its CSV plus the compile summary."""
+    from backend import registry
+
+    try:
+        rubric = registry.get_rubric(rubric_id, request.args.get("version"))
+    except registry.RegistryError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except RubricError as e:
+        return jsonify({"success": False, "error": f"Invalid rubric: {e}"}), 400
+    return jsonify({"success": True, **registry.reference(rubric), "rubric_csv": rubric["text"],
+                    **rubric["compiled"].summary(model=request.args.get("model", "gpt-4"))})
+
+
+@app.route("/prompts", methods=["GET"])
+def list_prompts():
+    """Registered evaluation prompts (instance/prompts/*.txt)."""
+    from backend import registry
+    return jsonify({"success": True, "prompts": registry.list_prompts(), "default": registry.DEFAULT_PROMPT_ID})
+
+
+@app.route("/prompts/<prompt_id>", methods=["GET"])
+def get_registered_prompt(prompt_id):
+    from backend import registry
+
+    try:
+        prompt = registry.get_prompt(prompt_id, request.args.get("version"))
+    except registry.RegistryError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    return jsonify({"success": True, **registry.reference(prompt), "text": prompt["text"]})
+
+
+@app.route("/rubrics/compile", methods=["POST"])
+def compile_rubric_route():
+    """Validate a rubric and report its hash, skills and prompt token overhead."""
+    payload = request.get_json(silent=True) or {}
+    try:
+        compiled = compile_rubric(payload.get("rubric_csv", ""))
+    except RubricError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    model = payload.get("model", "gpt-4")
+    summary = compiled.summary(model=model)
+    if payload.get("evaluation_prompt"):
+        summary.update(compiled.token_counts(payload["evaluation_prompt"], model=model))
+    return jsonify({"success": True, **summary})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_route():
+    """
+    Prometheus text exposition. Under gunicorn (SKILLSCOPE_METRICS_DIR) it
+    covers every worker: counters and histograms summed, gauges per worker.
+    """
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+@app.route("/maintenance/stats", methods=["GET"])
+def maintenance_stats():
+    """Live and archived segment sizes of the rotating JSONL logs (see backend/maintenance.py)."""
+    from backend import maintenance
+    return jsonify({"success": True, "logs": maintenance.stats()})
+
+
+@app.route("/evaluation-cache/stats", methods=["GET"])
+def evaluation_cache_stats():
+    from backend import eval_cache
+    return jsonify(eval_cache.stats())
 
 if __name__ == "__main__":
     app.run(port=5050, debug=True)
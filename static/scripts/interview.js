@@ -7,6 +7,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
     let mediaRecorder;
     let recordedChunks = [];
+    let chunkedUpload = null;
+
+    const CHUNK_INTERVAL_MS = 5000;
+    const MAX_UPLOAD_RETRIES = 5;
     let sessionId = localStorage.getItem("sessionId") || (Date.now() + '-' + Math.random().toString(36).substring(2, 10));
     localStorage.setItem("sessionId", sessionId);
 
@@ -67,7 +71,14 @@ document.addEventListener("DOMContentLoaded", () => {
                 transcriptBox.textContent = "Transcribing... please wait.";
             }
 
-            await fetchTranscript(filename);  // Automatically begin transcription
+            if (data.transcript && data.transcript.text) {
+                transcriptPreview.textContent = data.transcript.text;
+                submitButton.style.display = "block";
+            } else if (data.status_url) {
+                await pollTranscription(data.status_url, filename);
+            } else {
+                await fetchTranscript(filename);  // Automatically begin transcription
+            }
 
             const stopButton = document.getElementById("stopButton");
             if (stopButton) stopButton.disabled = true;
@@ -81,6 +92,141 @@ document.addEventListener("DOMContentLoaded", () => {
 }
 
 
+    // ---- Chunked upload: send audio while recording, resume after dropped requests ----
+
+    async function startChunkedUpload(filename) {
+        const res = await fetch("/uploads", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ filename })
+        });
+        const data = await res.json();
+        if (!res.ok || !data.success) {
+            throw new Error(data.error || `Upload init failed with status ${res.status}`);
+        }
+        return {
+            id: data.upload_id,
+            filename: data.filename,
+            uploaded: 0,        // bytes the server has acknowledged
+            pending: [],        // recorded blobs not yet acknowledged
+            sending: null,      // promise for the upload loop, if running
+            failed: false
+        };
+    }
+
+    function queueChunk(upload, blob) {
+        upload.pending.push(blob);
+        if (!upload.sending) {
+            upload.sending = drainChunks(upload).finally(() => { upload.sending = null; });
+        }
+    }
+
+    async function drainChunks(upload) {
+        while (upload.pending.length > 0 && !upload.failed) {
+            const blob = upload.pending[0];
+            let attempt = 0;
+            while (true) {
+                try {
+                    const res = await fetch(`/uploads/${upload.id}?offset=${upload.uploaded}`, {
+                        method: "PUT",
+                        headers: { "Content-Type": "application/octet-stream" },
+                        body: blob
+                    });
+                    const data = await res.json();
+                    if (!res.ok || !data.success) {
+                        throw Object.assign(new Error(data.error || `Chunk failed with status ${res.status}`), { status: res.status });
+                    }
+                    upload.uploaded = data.received;
+                    upload.pending.shift();   // acknowledged: free the memory
+                    break;
+                } catch (err) {
+                    attempt++;
+                    if (err.status === 413 || attempt > MAX_UPLOAD_RETRIES) {
+                        upload.failed = true;
+                        console.error("❌ Chunk upload failed:", err);
+                        return;
+                    }
+                    console.warn(`⚠️ Chunk upload retry ${attempt}:`, err);
+                    await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+                    await resyncUpload(upload, blob);
+                }
+            }
+        }
+    }
+
+    // Ask the server how much it has and trim the head chunk to match
+    async function resyncUpload(upload, blob) {
+        try {
+            const res = await fetch(`/uploads/${upload.id}`);
+            const data = await res.json();
+            if (!data.success) return;
+            const ahead = data.received - upload.uploaded;
+            if (ahead > 0 && ahead <= blob.size) {
+                upload.pending[0] = blob.slice(ahead);
+                upload.uploaded = data.received;
+            }
+        } catch (err) {
+            console.warn("⚠️ Upload status check failed:", err);
+        }
+    }
+
+    async function finishChunkedUpload(upload) {
+        while (upload.sending) await upload.sending;
+        if (upload.failed || upload.pending.length > 0) {
+            throw new Error("Audio chunks could not be uploaded.");
+        }
+
+        const res = await fetch(`/uploads/${upload.id}/finalize`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ size: upload.uploaded })
+        });
+        const data = await res.json();
+        if (!res.ok || !data.success) {
+            throw new Error(data.error || `Finalize failed with status ${res.status}`);
+        }
+        return data.filename;
+    }
+
+    async function completeRecording() {
+        const transcriptBox = document.getElementById("transcriptPreview");
+        try {
+            const filename = await finishChunkedUpload(chunkedUpload);
+            console.log("✅ Upload successful:", filename);
+            if (transcriptBox) {
+                transcriptBox.textContent = "Transcribing... please wait.";
+            }
+            await fetchTranscript(filename);
+            stopButton.disabled = true;
+        } catch (err) {
+            console.error("❌ Upload error:", err);
+            alert("Upload failed. See console for details.");
+        }
+    }
+
+    // The upload's background transcription job; falls back to /transcribe if it fails
+    async function pollTranscription(statusUrl, filename) {
+        try {
+            while (true) {
+                const response = await fetch(statusUrl);
+                const job = await response.json();
+                if (job.status === "done") {
+                    transcriptPreview.textContent = job.transcript.text;
+                    submitButton.style.display = "block";
+                    return;
+                }
+                if (job.status !== "processing") {
+                    console.warn("⚠️ Transcription job failed, retrying directly:", job.error);
+                    break;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1500));
+            }
+        } catch (err) {
+            console.warn("⚠️ Transcription status unavailable, retrying directly:", err);
+        }
+        await fetchTranscript(filename);
+    }
+
     async function fetchTranscript(filename) {
         try {
             const response = await fetch("/transcribe", {
@@ -105,21 +251,38 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     startButton.addEventListener("click", () => {
-        navigator.mediaDevices.getUserMedia({ audio: true }).then(stream => {
+        navigator.mediaDevices.getUserMedia({ audio: true }).then(async stream => {
             mediaRecorder = new MediaRecorder(stream);
             recordedChunks = [];
 
+            try {
+                chunkedUpload = await startChunkedUpload(`${sessionId}.webm`);
+            } catch (err) {
+                // Fall back to a single upload once recording stops
+                console.warn("⚠️ Chunked upload unavailable, buffering recording:", err);
+                chunkedUpload = null;
+            }
+
             mediaRecorder.ondataavailable = e => {
-                if (e.data.size > 0) recordedChunks.push(e.data);
+                if (e.data.size === 0) return;
+                if (chunkedUpload) {
+                    queueChunk(chunkedUpload, e.data);
+                } else {
+                    recordedChunks.push(e.data);
+                }
             };
 
             mediaRecorder.onstop = () => {
-                const blob = new Blob(recordedChunks, { type: "audio/webm" });
-                uploadRecording(blob, sessionId);
                 stopTimer();
+                if (chunkedUpload) {
+                    completeRecording();
+                } else {
+                    const blob = new Blob(recordedChunks, { type: "audio/webm" });
+                    uploadRecording(blob, sessionId);
+                }
             };
 
-            mediaRecorder.start();
+            mediaRecorder.start(CHUNK_INTERVAL_MS);
 
             // Button styling changes
             startButton.disabled = true;
@@ -1,5 +1,6 @@
 document.addEventListener("DOMContentLoaded", () => {
   const rubricInput = document.getElementById("rubricInput");
+  const rubricSelect = document.getElementById("rubricSelect");
   const rubricPreview = document.getElementById("rubricPreview");
   const transcriptList = document.getElementById("transcriptList");
   const submitEvalButton = document.getElementById("submitEvalButton");
@@ -8,59 +9,94 @@ document.addEventListener("DOMContentLoaded", () => {
   const selectAllBtn = document.getElementById("selectAllBtn");
 
   let rubricCSV = "";
+  // A registered rubric is sent by id and version instead of its CSV
+  let rubricRef = null;
   const selectedTranscripts = new Set();
   let allTranscripts = [];
+  const transcriptBodies = new Map();
 
-  function fetchTranscripts() {
-    fetch("/transcripts")
-      .then(res => res.json())
-      .then(data => {
-        allTranscripts = data;
-        transcriptList.innerHTML = "";
-
-        data.forEach((entry, index) => {
-          const name = entry.name || "Unknown";
-          const time = entry.submitted_at || entry.timestamp || "no time";
-          const label = `${name} – ${new Date(time).toLocaleString()}`;
-
-          const btn = document.createElement("button");
-          btn.className = "transcript-button";
-          btn.textContent = label;
-          btn.dataset.index = index;
-
-          btn.addEventListener("click", () => {
-            const key = JSON.stringify(entry);
-            const isSelected = selectedTranscripts.has(key);
-
-            if (isSelected) {
-              selectedTranscripts.delete(key);
-              btn.classList.remove("selected");
-              btn.style.backgroundColor = "";
-            } else {
-              selectedTranscripts.add(key);
-              btn.classList.add("selected");
-              btn.style.backgroundColor = "#1e7f3c"; // dark green
-              btn.style.color = "#fff";
-            }
-
-            updateTranscriptPreview();
-          });
-
-          transcriptList.appendChild(btn);
+  const PAGE_SIZE = 200;
+  // Up to this many students stream live; larger selections run as a background job
+  const STREAM_LIMIT = 25;
+
+  // Transcript bodies are only fetched once a transcript is selected
+  async function loadTranscript(id) {
+    if (!transcriptBodies.has(id)) {
+      const res = await fetch(`/transcripts/${id}`);
+      if (!res.ok) throw new Error(`Failed to load transcript ${id}`);
+      transcriptBodies.set(id, await res.json());
+    }
+    return transcriptBodies.get(id);
+  }
+
+  function renderTranscriptButton(entry, index) {
+    const name = entry.name || "Unknown";
+    const time = entry.submitted_at || entry.timestamp || "no time";
+    const label = `${name} – ${new Date(time).toLocaleString()}`;
+
+    const btn = document.createElement("button");
+    btn.className = "transcript-button";
+    btn.textContent = label;
+    btn.dataset.index = index;
+
+    btn.addEventListener("click", () => {
+      const isSelected = selectedTranscripts.has(entry.id);
+
+      if (isSelected) {
+        selectedTranscripts.delete(entry.id);
+        btn.classList.remove("selected");
+        btn.style.backgroundColor = "";
+      } else {
+        selectedTranscripts.add(entry.id);
+        btn.classList.add("selected");
+        btn.style.backgroundColor = "#1e7f3c"; // dark green
+        btn.style.color = "#fff";
+      }
+
+      updateTranscriptPreview();
+    });
+
+    transcriptList.appendChild(btn);
+  }
+
+  async function fetchTranscripts() {
+    allTranscripts = [];
+    transcriptList.innerHTML = "";
+
+    try {
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ fields: "name,email,submitted_at", limit: PAGE_SIZE });
+        if (cursor !== null) params.set("cursor", cursor);
+
+        const res = await fetch(`/transcripts?${params}`);
+        const page = await res.json();
+
+        page.items.forEach(entry => {
+          renderTranscriptButton(entry, allTranscripts.length);
+          allTranscripts.push(entry);
         });
-      })
-      .catch(err => {
-        transcriptList.innerHTML = "Failed to load transcripts.";
-        console.error("Transcript load error:", err);
-      });
+        cursor = page.next_cursor;
+      } while (cursor !== null && cursor !== undefined);
+    } catch (err) {
+      transcriptList.innerHTML = "Failed to load transcripts.";
+      console.error("Transcript load error:", err);
+    }
   }
 
-  function updateTranscriptPreview() {
-    const selectedArray = Array.from(selectedTranscripts).map(x => JSON.parse(x));
+  async function updateTranscriptPreview() {
+    const selectedArray = allTranscripts.filter(t => selectedTranscripts.has(t.id));
 
     if (selectedArray.length === 1) {
       const t = selectedArray[0];
-      transcriptPreview.textContent = `[${t.name} – ${t.submitted_at}]\n\n${t.transcript}`;
+      transcriptPreview.textContent = `[${t.name} – ${t.submitted_at}]\n\nLoading...`;
+      try {
+        const full = await loadTranscript(t.id);
+        transcriptPreview.textContent = `[${t.name} – ${t.submitted_at}]\n\n${full.transcript}`;
+      } catch (err) {
+        transcriptPreview.textContent = "Failed to load transcript.";
+        console.error("Transcript load error:", err);
+      }
     } else if (selectedArray.length > 1) {
       transcriptPreview.textContent = selectedArray.map(t => `${t.name} – ${t.submitted_at}`).join("\n");
     } else {
@@ -73,71 +109,98 @@ document.addEventListener("DOMContentLoaded", () => {
     rubricPreview.textContent = rubricCSV || "No rubric provided.";
   }
 
+  async function loadRegisteredRubrics() {
+    try {
+      const res = await fetch("/rubrics");
+      const data = await res.json();
+      (data.rubrics || []).filter(r => !r.error).forEach(r => {
+        const option = document.createElement("option");
+        option.value = r.id;
+        option.textContent = `${r.id} (${r.version})`;
+        rubricSelect.appendChild(option);
+      });
+    } catch (err) {
+      console.error("Rubric list error:", err);
+    }
+  }
+
+  rubricSelect.addEventListener("change", async () => {
+    rubricRef = null;
+    rubricCSV = "";
+    if (!rubricSelect.value) {
+      rubricPreview.textContent = "No rubric loaded.";
+      return;
+    }
+    try {
+      const res = await fetch(`/rubrics/${encodeURIComponent(rubricSelect.value)}`);
+      const data = await res.json();
+      if (!data.success) throw new Error(data.error);
+      rubricInput.value = "";
+      parseRubric(data.rubric_csv);
+      rubricRef = { rubric_id: data.id, rubric_version: data.version };
+    } catch (err) {
+      rubricPreview.textContent = "Failed to load rubric.";
+      console.error("Rubric load error:", err);
+    }
+  });
+
   rubricInput.addEventListener("change", () => {
     const file = rubricInput.files[0];
     if (file) {
+      rubricSelect.value = "";
+      rubricRef = null;
       const reader = new FileReader();
       reader.onload = e => parseRubric(e.target.result);
       reader.readAsText(file);
     }
   });
 
-  submitEvalButton.addEventListener("click", () => {
+  submitEvalButton.addEventListener("click", async () => {
   if (!rubricCSV || selectedTranscripts.size === 0) {
     alert("Please upload a rubric and select at least one transcript.");
     return;
   }
 
-  const payload = Array.from(selectedTranscripts).map(x => JSON.parse(x)).map(entry => ({
+  let selectedEntries;
+  try {
+    selectedEntries = await Promise.all(Array.from(selectedTranscripts).map(loadTranscript));
+  } catch (err) {
+    evaluationSummary.textContent = "Failed to load selected transcripts.";
+    console.error("Transcript load error:", err);
+    return;
+  }
+
+  const payload = selectedEntries.map(entry => ({
     name: entry.name || "Unknown",
     email: entry.email || "unknown@none.edu",
     transcript: entry.transcript,
     submitted_at: entry.submitted_at || entry.timestamp || "unknown"
   }));
 
+  const streaming = payload.length <= STREAM_LIMIT;
+
   fetch("/evaluate-transcripts", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ rubric_csv: rubricCSV, transcripts: payload })
+    body: JSON.stringify({
+      ...(rubricRef || { rubric_csv: rubricCSV }),
+      transcripts: payload, async: !streaming, stream: streaming
+    })
+  })
+  .then(res => {
+    if (streaming && res.ok) {
+      return { success: true, stream: res };
+    }
+    return res.json();
   })
-  .then(res => res.json())
   .then(data => {
     if (data.success) {
-  let summaryText = `${data.result || "Evaluated"}\n\n`;
-
-  if (data.evaluations && Array.isArray(data.evaluations)) {
-    data.evaluations.forEach(entry => {
-      summaryText += `🔹 ${entry.name} (${entry.email})\n`;
-      if (entry.error) {
-        summaryText += `  ❌ Error: ${entry.error}\n\n`;
+      evaluationSummary.textContent = `Evaluating ${payload.length} transcript(s)...`;
+      if (data.stream) {
+        followEvaluationStream(data.stream, payload);
       } else {
-        Object.entries(entry.score).forEach(([skill, result]) => {
-          summaryText += `  • ${skill}: ${result.level} (${result.score}) – ${result.description}\n`;
-        });
-        summaryText += `\n`;
+        followEvaluationJob(data.events_url, payload.length);
       }
-    });
-  }
-
-  evaluationSummary.textContent = summaryText.trim();
-
-
-if (data.evaluations && Array.isArray(data.evaluations)) {
-  data.evaluations.forEach(entry => {
-    summaryText += `🔹 ${entry.name} (${entry.email})\n`;
-
-    if (entry.error) {
-      summaryText += `  ❌ Error: ${entry.error}\n\n`;
-    } else {
-      Object.entries(entry.score).forEach(([skill, result]) => {
-        summaryText += `  • ${skill}: ${result.level} (${result.score}) – ${result.description}\n`;
-      });
-      summaryText += `\n`;
-    }
-  });
-}
-
-evaluationSummary.textContent = summaryText.trim();
 
       selectedTranscripts.clear();
       fetchTranscripts();
@@ -163,14 +226,100 @@ evaluationSummary.textContent = summaryText.trim();
   });
 });
 
+  // Show feedback token by token as the model writes it (NDJSON events)
+  async function followEvaluationStream(res, payload) {
+    const entries = payload.map(p => ({ name: p.name, email: p.email, feedback: "", done: false }));
+    let finished = 0;
+
+    function render(header) {
+      let summaryText = `${header}\n\n`;
+      entries.forEach(entry => {
+        if (!entry.feedback && !entry.done) return;
+        summaryText += `🔹 ${entry.name} (${entry.email})${entry.done ? "" : " ✍️"}\n`;
+        summaryText += `  ${entry.feedback}\n\n`;
+      });
+      evaluationSummary.textContent = summaryText.trim();
+    }
+
+    function handle(event) {
+      if (event.event === "token") {
+        entries[event.index].feedback += event.text;
+      } else if (event.event === "result") {
+        Object.assign(entries[event.index], { feedback: event.feedback, done: true });
+        finished += 1;
+      } else if (event.event === "done") {
+        render(`Evaluated ${finished} transcript(s).`);
+        return;
+      } else if (event.event === "error") {
+        render(`Evaluation failed after ${finished} transcript(s): ${event.error}`);
+        return;
+      }
+      render(`Evaluated ${finished} of ${entries.length} transcript(s)...`);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    try {
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop();
+        lines.filter(Boolean).forEach(line => handle(JSON.parse(line)));
+      }
+    } catch (err) {
+      console.error("Evaluation stream error:", err);
+      render(`Evaluation stream interrupted after ${finished} transcript(s).`);
+    }
+  }
+
+  // Show each student's result as soon as the background job finishes it
+  function followEvaluationJob(eventsUrl, total) {
+    const results = [];
+    const source = new EventSource(eventsUrl);
+
+    function render(header) {
+      let summaryText = `${header}\n\n`;
+      results.sort((a, b) => a.index - b.index).forEach(entry => {
+        summaryText += `🔹 ${entry.name} (${entry.email})\n`;
+        if (entry.error) {
+          summaryText += `  ❌ Error: ${entry.error}\n\n`;
+        } else {
+          summaryText += `  ${entry.feedback}\n\n`;
+        }
+      });
+      evaluationSummary.textContent = summaryText.trim();
+    }
+
+    source.addEventListener("result", e => {
+      results.push(JSON.parse(e.data));
+      render(`Evaluated ${results.length} of ${total} transcript(s)...`);
+    });
+
+    source.addEventListener("done", e => {
+      const job = JSON.parse(e.data);
+      source.close();
+      if (job.status === "failed") {
+        render(`Evaluation failed after ${results.length} transcript(s): ${job.error}`);
+      } else {
+        render(`Evaluated ${results.length} transcript(s).`);
+      }
+    });
+
+    source.onerror = err => {
+      console.error("Evaluation stream error:", err);
+    };
+  }
+
 
   selectAllBtn.addEventListener("click", () => {
     selectedTranscripts.clear();
     const buttons = document.querySelectorAll(".transcript-button");
     buttons.forEach((btn, index) => {
       const entry = allTranscripts[index];
-      const key = JSON.stringify(entry);
-      selectedTranscripts.add(key);
+      selectedTranscripts.add(entry.id);
       btn.classList.add("selected");
       btn.style.backgroundColor = "#1e7f3c";
       btn.style.color = "#fff";
@@ -178,5 +327,6 @@ evaluationSummary.textContent = summaryText.trim();
     updateTranscriptPreview();
   });
 
+  loadRegisteredRubrics();
   fetchTranscripts();
 });
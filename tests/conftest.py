@@ -0,0 +1,95 @@
+# tests/conftest.py
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# The app is not an installed package; tests import backend/ from the checkout
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Flask test client that skips resuming jobs and starting maintenance on the first request."""
+    import server
+
+    monkeypatch.setattr(server, "_jobs_resumed", True)
+    return server.app.test_client()
+
+
+@pytest.fixture
+def audio_dir(tmp_path, monkeypatch):
+    """backend.audio_processing storing under tmp_path, with threads in place of the process pool."""
+    from backend import audio_processing, transcription
+
+    audio = tmp_path / "uploads" / "audio"
+    monkeypatch.setattr(audio_processing, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(audio_processing, "AUDIO_DIR", str(audio))
+    monkeypatch.setattr(audio_processing, "INDEX_PATH", str(audio / "index.jsonl"))
+    monkeypatch.setattr(audio_processing, "LOCK_PATH", str(audio / "index.lock"))
+    monkeypatch.setattr(audio_processing, "JOBS_DIR", str(audio / "jobs"))
+    for name, value in (("_records", {}), ("_first_by_hash", {}), ("_pos", 0), ("_inode", None), ("_pending", {})):
+        monkeypatch.setattr(audio_processing, name, value)
+    # Without ffmpeg recordings are stored as uploaded; threads stand in for the process pool,
+    # whose workers would not see these patched paths
+    monkeypatch.setattr(transcription, "FFMPEG", None)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(audio_processing, "_get_executor", lambda: pool)
+    monkeypatch.setattr(audio_processing, "_transcriber", None)
+    yield audio
+    audio_processing.shutdown()
+    pool.shutdown(wait=True)
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    """backend.results_store writing under tmp_path, with a fresh in-memory index."""
+    from backend import results_store
+
+    directory = tmp_path / "responses"
+    monkeypatch.setattr(results_store, "RESPONSES_DIR", str(directory))
+    for name, filename in (("MANIFEST_PATH", "manifest.jsonl"), ("LATEST_PATH", "latest_index.jsonl"),
+                           ("SCORES_PATH", "scores_index.jsonl"), ("LOCK_PATH", "results.lock")):
+        monkeypatch.setattr(results_store, name, str(directory / filename))
+    for name, value in (("_files", {}), ("_manifest_pos", 0), ("_latest", {}), ("_latest_pos", 0), ("_inodes", {})):
+        monkeypatch.setattr(results_store, name, value)
+    return directory
+
+
+@pytest.fixture
+def transcript_dir(tmp_path, monkeypatch):
+    """backend.transcript_store under tmp_path, with a fresh in-memory view; returns the patched paths."""
+    from backend import transcript_store
+    from backend.log_segments import SegmentedLog
+
+    directory = str(tmp_path / "transcripts")
+    paths = {
+        "TRANSCRIPT_DIR": directory,
+        "LOG_PATH": os.path.join(directory, "transcripts.jsonl"),
+        "HASH_INDEX_PATH": os.path.join(directory, "transcripts.hashes"),
+        "EMAIL_INDEX_PATH": os.path.join(directory, "transcripts.emails.jsonl"),
+        "LOCK_PATH": os.path.join(directory, "transcripts.lock"),
+    }
+    for name, value in paths.items():
+        monkeypatch.setattr(transcript_store, name, value)
+    monkeypatch.setattr(transcript_store, "transcript_log",
+                        SegmentedLog(paths["LOG_PATH"], paths["LOCK_PATH"], time_field="submitted_at"))
+    # Fresh in-memory view, as a new process would have
+    for name, value in (("_hashes", set()), ("_hash_pos", 0), ("_hash_inode", None), ("_emails", {}),
+                        ("_positions", {}), ("_email_pos", 0), ("_email_inode", None), ("_next_id", 0)):
+        monkeypatch.setattr(transcript_store, name, value)
+    return paths
+
+
+@pytest.fixture
+def registry_dir(tmp_path, monkeypatch):
+    """backend.registry over empty rubric and prompt folders under tmp_path."""
+    from backend import registry
+
+    monkeypatch.setattr(registry, "rubrics", registry._Kind("rubric", str(tmp_path / "rubrics"), ".csv"))
+    monkeypatch.setattr(registry, "prompts", registry._Kind("prompt", str(tmp_path / "prompts"), ".txt"))
+    os.makedirs(registry.rubrics.folder)
+    os.makedirs(registry.prompts.folder)
+    return tmp_path
@@ -0,0 +1,74 @@
+# tests/test_analytics.py
+
+import pytest
+
+from backend import analytics, results_store
+
+RUBRIC_HASH = "r1"
+
+
+@pytest.fixture(autouse=True)
+def fresh(results_dir, monkeypatch):
+    for name, value in (("_pos", 0), ("_inode", None), ("_members", {}), ("_rollups", {}), ("_evaluated", {})):
+        monkeypatch.setattr(analytics, name, value)
+
+
+def save(email, score, evaluated_at, cohort=None, transcript_id=None):
+    result = {
+        "email": email, "cohort": cohort, "evaluated_at": evaluated_at, "rubric_hash": RUBRIC_HASH,
+        "transcript_id": transcript_id or f"{email}-t1", "overall_score": score,
+        "scores": {"Clarity": {"level": "L", "score": score}}
+    }
+    results_store.write_results([result], filename="llm_eval_responses_test.jsonl", rubric_hash=RUBRIC_HASH)
+
+
+def test_re_evaluation_replaces_previous_scores():
+    save("a@x.edu", 2, "2026-01-01", cohort="fall")
+    save("b@x.edu", 4, "2026-01-01", cohort="fall")
+    assert analytics.rollup(RUBRIC_HASH)["overall"]["mean"] == 3
+
+    # a is re-evaluated (and moves cohort): the old score is subtracted first
+    save("a@x.edu", 3, "2026-01-02", cohort="spring", transcript_id="a-t2")
+    summary = analytics.rollup(RUBRIC_HASH)
+    assert summary["students"] == 2
+    assert summary["overall"]["mean"] == 3.5
+    assert summary["skills"]["Clarity"]["distribution"] == {"3": 1, "4": 1}
+    assert summary["cohorts"] == {"fall": {"students": 1, "overall_mean": 4.0},
+                                  "spring": {"students": 1, "overall_mean": 3.0}}
+    assert summary["evaluations"] == 3
+
+    # An older evaluation written late doesn't replace the newer one
+    save("a@x.edu", 1, "2026-01-01T12:00", cohort="fall", transcript_id="a-t0")
+    assert analytics.rollup(RUBRIC_HASH)["overall"]["mean"] == 3.5
+    assert analytics.rollup(RUBRIC_HASH, cohort="spring")["students"] == 1
+
+
+def test_evaluations_count_distinct_student_transcripts():
+    save("a@x.edu", 2, "2026-01-01")
+    save("a@x.edu", 2, "2026-01-02")  # same transcript saved again
+    save("a@x.edu", 3, "2026-01-03", transcript_id="a-t2")
+    assert analytics.rollup(RUBRIC_HASH)["evaluations"] == 2
+    assert analytics.rubrics()[0]["evaluations"] == 2
+
+
+def test_anonymous_evaluations_get_their_own_bucket():
+    save("a@x.edu", 4, "2026-01-01")
+    save("anonymous", 1, "2026-01-01", transcript_id="t1")
+    save("anonymous", 3, "2026-01-02", transcript_id="t2")
+    save("anonymous", 3, "2026-01-03", transcript_id="t2")
+
+    summary = analytics.rollup(RUBRIC_HASH)
+    assert summary["students"] == 1
+    assert summary["overall"]["mean"] == 4
+    assert summary["evaluations"] == 1
+    assert summary["anonymous"] == {"evaluations": 2, "overall_mean": 2.0}
+
+
+def test_rebuilt_index_starts_over():
+    save("a@x.edu", 2, "2026-01-01")
+    assert analytics.rollup(RUBRIC_HASH)["students"] == 1
+    results_store.rebuild_index()
+    save("b@x.edu", 4, "2026-01-02")
+    summary = analytics.rollup(RUBRIC_HASH)
+    assert summary["students"] == 2
+    assert summary["overall"]["mean"] == 3
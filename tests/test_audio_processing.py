@@ -0,0 +1,82 @@
+# tests/test_audio_processing.py
+
+import os
+import time
+
+import pytest
+
+from backend import audio_processing, transcription
+
+
+@pytest.fixture(autouse=True)
+def store(audio_dir):
+    return audio_dir
+
+
+def upload(tmp_path, name, data):
+    os.makedirs(tmp_path / "uploads", exist_ok=True)
+    path = tmp_path / "uploads" / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def wait_for(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = audio_processing.transcription_job(job_id)
+        if job["status"] != "processing":
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still processing")
+
+
+def fake_transcribe(path, content_hash=None, **kwargs):
+    return {"text": f"text of {os.path.basename(path)}", "duration": 2.0, "cached": False,
+            "segments": [{"start": 0.0, "end": 2.0, "text": "hello"}]}
+
+
+def test_process_stores_by_hash_and_detects_duplicates(tmp_path, audio_dir):
+    first = audio_processing.process(upload(tmp_path, "a.webm", b"same bytes"), "a.webm")
+    second = audio_processing.process(upload(tmp_path, "b.webm", b"same bytes"), "b.webm")
+
+    assert not first["duplicate"] and first["stored_as"] == f"{first['audio_hash']}.webm"
+    assert second["duplicate"] and second["duplicate_of"] == "a.webm"
+    assert sorted(os.listdir(audio_dir)) == sorted(["index.jsonl", "index.lock", first["stored_as"]])
+    # Originals are removed once stored
+    assert not os.path.exists(tmp_path / "uploads" / "a.webm")
+    assert audio_processing.lookup("b.webm")["audio_hash"] == first["audio_hash"]
+
+
+def test_resolve_processes_an_upload_nobody_has(tmp_path):
+    upload(tmp_path, "late.webm", b"late upload")
+    assert audio_processing.resolve("late.webm")["filename"] == "late.webm"
+    with pytest.raises(FileNotFoundError):
+        audio_processing.resolve("missing.webm")
+
+
+def test_transcription_job_resolves_to_the_transcript(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcription, "transcribe_file", fake_transcribe)
+    job_id = audio_processing.submit_transcription(upload(tmp_path, "s.webm", b"speech"), "s.webm")
+
+    job = wait_for(job_id)
+    assert job["status"] == "done"
+    assert job["transcript"]["segments"] == [{"start": 0.0, "end": 2.0, "text": "hello"}]
+    assert job["transcript"]["text"] == f"text of {job['audio']['stored_as']}"
+    assert job["audio"]["filename"] == "s.webm"
+
+
+def test_failed_transcription_is_reported(tmp_path, monkeypatch):
+    def broken(path, **kwargs):
+        raise transcription.TranscriptionError("whisper is down")
+
+    monkeypatch.setattr(transcription, "transcribe_file", broken)
+    job = wait_for(audio_processing.submit_transcription(upload(tmp_path, "s.webm", b"speech")))
+    assert job["status"] == "failed" and job["error"] == "whisper is down"
+
+
+def test_jobs_of_a_dead_process_read_as_interrupted(monkeypatch):
+    audio_processing._write_job({"id": "a" * 32, "filename": "s.webm", "status": "processing", "pid": 1})
+    monkeypatch.setattr(audio_processing, "_alive", lambda pid: False)
+    assert audio_processing.transcription_job("a" * 32)["error"] == "interrupted"
+    assert audio_processing.transcription_job("../../etc/passwd") is None
+    assert audio_processing.transcription_job("b" * 32) is None
@@ -0,0 +1,99 @@
+# tests/test_batch_eval.py
+
+import json
+
+import pytest
+
+from backend import batch_eval
+from backend.batch_eval import StubBatchBackend, finish_checkpoint, run_batch
+from backend.registry import DEFAULT_PROMPT
+
+RUBRIC = ("Skill,Level,Score,Description\n"
+          "Clarity,Missing,0,No answer.\n"
+          "Clarity,Proficient,3,Clear answer.\n")
+MODEL = "gpt-4"
+
+
+@pytest.fixture(autouse=True)
+def batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_eval, "BATCH_DIR", str(tmp_path / "batches"))
+    monkeypatch.setattr(batch_eval.time, "sleep", lambda seconds: None)
+    return tmp_path / "batches"
+
+
+def blocks():
+    return [{"rubric_csv": RUBRIC, "transcripts": [
+        {"email": "a@x.edu", "transcript": "Q: hi\nA: one", "transcript_id": "tid-a"},
+        {"email": "b@x.edu", "transcript": "Q: hi\nA: two"},
+    ]}]
+
+
+def build_system_prompt(rubric_csv, prompt):
+    return f"{prompt}\n{rubric_csv}"
+
+
+class Interrupted(Exception):
+    pass
+
+
+class CountingBackend(StubBatchBackend):
+    """Stub backend that counts submissions and can stop the run after a number of polls."""
+
+    def __init__(self, interrupt_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.created, self.polls = 0, 0
+        self.interrupt_after = interrupt_after
+
+    def create(self, input_file_id):
+        self.created += 1
+        return super().create(input_file_id)
+
+    def retrieve(self, batch_id):
+        if self.interrupt_after is not None and self.polls >= self.interrupt_after:
+            raise Interrupted()
+        self.polls += 1
+        return super().retrieve(batch_id)
+
+
+def test_batch_lines_use_the_default_prompt():
+    line = json.loads(batch_eval.build_batch_lines(blocks(), MODEL, build_system_prompt)[0])
+    assert line["custom_id"] == "0:0"
+    assert line["body"]["messages"][0]["content"].startswith(DEFAULT_PROMPT)
+
+
+def test_run_batch_maps_results_back_to_transcripts():
+    results, checkpoint = run_batch(blocks(), MODEL, CountingBackend(polls_to_complete=2),
+                                    build_system_prompt, poll_interval=0, log=lambda message: None)
+    assert checkpoint["stage"] == "finished" and checkpoint["status"] == "completed"
+    assert [r["email"] for r in results[0]] == ["a@x.edu", "b@x.edu"]
+    assert results[0][0]["transcript_id"] == "tid-a" and "transcript_id" not in results[0][1]
+    assert all(r["feedback"].startswith("Score: 3") for r in results[0])
+
+
+def test_interrupted_batch_resumes_from_its_checkpoint(batch_dir):
+    first = CountingBackend(interrupt_after=1, polls_to_complete=3)
+    with pytest.raises(Interrupted):
+        run_batch(blocks(), MODEL, first, build_system_prompt, poll_interval=0, log=lambda message: None)
+    assert first.created == 1
+
+    checkpoints = [json.loads(path.read_text()) for path in batch_dir.glob("*.json")]
+    assert [c["stage"] for c in checkpoints] == ["submitted"]
+
+    resumed = CountingBackend(polls_to_complete=3)
+    results, checkpoint = run_batch(blocks(), MODEL, resumed, build_system_prompt,
+                                    poll_interval=0, log=lambda message: None)
+    # The same batch is polled to completion instead of being submitted again
+    assert resumed.created == 0
+    assert checkpoint["batch_id"] == checkpoints[0]["batch_id"]
+    assert len(results[0]) == 2 and not any(r["feedback"].startswith("[ERROR]") for r in results[0])
+
+
+def test_finished_checkpoint_is_reported_as_done():
+    results, checkpoint = run_batch(blocks(), MODEL, CountingBackend(polls_to_complete=1),
+                                    build_system_prompt, poll_interval=0, log=lambda message: None)
+    finish_checkpoint(checkpoint, ["out.jsonl"])
+
+    rerun = CountingBackend(polls_to_complete=1)
+    _, checkpoint = run_batch(blocks(), MODEL, rerun, build_system_prompt, poll_interval=0, log=lambda message: None)
+    assert checkpoint["stage"] == "done" and checkpoint["output_paths"] == ["out.jsonl"]
+    assert rerun.created == 0 and rerun.polls == 0
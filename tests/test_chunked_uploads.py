@@ -0,0 +1,129 @@
+# tests/test_chunked_uploads.py
+
+import io
+import os
+
+import pytest
+
+from backend import chunked_uploads
+from backend.chunked_uploads import UploadError
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_uploads, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(chunked_uploads, "PARTIAL_DIR", str(tmp_path / "uploads" / ".partial"))
+    return tmp_path / "uploads"
+
+
+def part_bytes(upload_id):
+    with open(os.path.join(chunked_uploads.PARTIAL_DIR, f"{upload_id}.part"), "rb") as f:
+        return f.read()
+
+
+def send(upload_id, offset, data, length=None):
+    length = len(data) if length is None else length
+    return chunked_uploads.append_chunk(upload_id, offset, io.BytesIO(data), length)
+
+
+def test_resend_at_current_offset_skips_bytes_already_written():
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    send(upload_id, 0, b"hello ")
+    # The acknowledgement was lost, so the client resends overlapping bytes
+    session = send(upload_id, 3, b"lo world")
+
+    assert session["received"] == 11
+    assert part_bytes(upload_id) == b"hello world"
+    assert chunked_uploads.get_upload(upload_id)["received"] == 11
+
+
+def test_offset_gap_is_rejected_with_current_size():
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    send(upload_id, 0, b"abc")
+
+    with pytest.raises(UploadError) as err:
+        send(upload_id, 5, b"xyz")
+    assert err.value.status == 409
+    assert err.value.received == 3
+    assert part_bytes(upload_id) == b"abc"
+
+
+def test_negative_offset_is_rejected():
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    with pytest.raises(UploadError) as err:
+        send(upload_id, -1, b"abc")
+    assert err.value.status == 400
+
+
+def test_oversized_chunk_is_rolled_back(monkeypatch):
+    monkeypatch.setattr(chunked_uploads, "MAX_UPLOAD_BYTES", 8)
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    send(upload_id, 0, b"12345")
+
+    # No declared length, so the limit trips only once bytes have been written
+    with pytest.raises(UploadError) as err:
+        chunked_uploads.append_chunk(upload_id, 5, io.BytesIO(b"6789"), None)
+    assert err.value.status == 413
+    assert part_bytes(upload_id) == b"12345"
+    assert send(upload_id, 5, b"678")["received"] == 8
+
+
+def test_short_chunk_is_rolled_back():
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    send(upload_id, 0, b"abc")
+
+    with pytest.raises(UploadError) as err:
+        send(upload_id, 3, b"de", length=10)
+    assert err.value.status == 400
+    assert err.value.received == 3
+    assert part_bytes(upload_id) == b"abc"
+    assert send(upload_id, 3, b"def")["received"] == 6
+
+
+def test_failed_read_is_rolled_back():
+    class Disconnect(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell():
+                raise ConnectionResetError("client went away")
+            return super().read(2)
+
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    with pytest.raises(ConnectionResetError):
+        chunked_uploads.append_chunk(upload_id, 0, Disconnect(b"abcdef"), 6)
+    assert part_bytes(upload_id) == b""
+    assert chunked_uploads.get_upload(upload_id)["received"] == 0
+
+
+def test_finalize_checks_size_and_moves_file(upload_dir):
+    upload_id = chunked_uploads.init_upload("talk.mp3", expected_size=6)["id"]
+    send(upload_id, 0, b"abc")
+    with pytest.raises(UploadError) as err:
+        chunked_uploads.finalize_upload(upload_id)
+    assert err.value.status == 409
+
+    send(upload_id, 3, b"def")
+    session, final_path = chunked_uploads.finalize_upload(upload_id)
+    assert session["status"] == "complete"
+    assert final_path == str(upload_dir / "talk.mp3")
+    with open(final_path, "rb") as f:
+        assert f.read() == b"abcdef"
+    with pytest.raises(UploadError):
+        send(upload_id, 6, b"g")
+
+
+@pytest.mark.parametrize("size", ["-1", "lots"])
+def test_bad_expected_size_is_rejected(size):
+    with pytest.raises(UploadError) as err:
+        chunked_uploads.init_upload("talk.mp3", expected_size=size)
+    assert err.value.status == 400
+
+
+def test_route_rejects_negative_offset(client):
+    upload_id = chunked_uploads.init_upload("talk.mp3")["id"]
+    res = client.put(f"/uploads/{upload_id}?offset=-4", data=b"abc")
+    assert res.status_code == 400
+    assert part_bytes(upload_id) == b""
+
+    res = client.put(f"/uploads/{upload_id}?offset=0", data=b"abc")
+    assert res.status_code == 200
+    assert res.get_json()["received"] == 3
@@ -0,0 +1,92 @@
+# tests/test_eval_cache.py
+
+import os
+import time
+
+import pytest
+
+from backend import eval_cache
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Proficient,3,Clear answer.\n"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(eval_cache, "CACHE_DIR", str(tmp_path / "evaluations"))
+    return tmp_path / "evaluations"
+
+
+def _age(key, seconds_ago):
+    stamp = time.time() - seconds_ago
+    os.utime(eval_cache._entry_path(key), (stamp, stamp))
+
+
+def test_cache_key_is_stable_and_ignores_rubric_whitespace():
+    key = eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", "transcript")
+    spaced = RUBRIC.replace(",", " , ").replace("\n", "\r\n") + "\n\n"
+    assert key == eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", "transcript")
+    assert key == eval_cache.cache_key(spaced, "prompt", "gpt-4", "transcript")
+
+
+@pytest.mark.parametrize("change", [
+    {"system_prompt": "other prompt"},
+    {"model": "gpt-4o-mini"},
+    {"transcript_text": "another transcript"},
+    {"variant": "packed"},
+])
+def test_cache_key_changes_with_every_input(change):
+    args = {"rubric_csv": RUBRIC, "system_prompt": "prompt", "model": "gpt-4", "transcript_text": "transcript"}
+    assert eval_cache.cache_key(**args) != eval_cache.cache_key(**dict(args, **change))
+
+
+def test_get_put_and_bypass():
+    key = eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", "transcript")
+    assert eval_cache.get(key) is None
+    eval_cache.put(key, {"feedback": "Score: 3"})
+    assert eval_cache.get(key) == {"feedback": "Score: 3"}
+    assert eval_cache.get(key, bypass=True) is None
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    key = eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", "old")
+    eval_cache.put(key, "stale")
+    _age(key, 120)
+    monkeypatch.setattr(eval_cache, "MAX_AGE_SECONDS", 60)
+    assert eval_cache.get(key) is None
+    assert not os.path.exists(eval_cache._entry_path(key))
+
+
+def test_evict_drops_least_recently_used_first():
+    keys = [eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", f"transcript {i}") for i in range(3)]
+    for age, key in zip((300, 200, 100), keys):
+        eval_cache.put(key, "x" * 100)
+        _age(key, age)
+    # Reading the oldest entry makes it the most recently used
+    assert eval_cache.get(keys[0]) is not None
+
+    # Entry sizes vary by a byte or two with the stored_at timestamp
+    keep = sum(os.path.getsize(eval_cache._entry_path(key)) for key in (keys[0], keys[2]))
+    assert eval_cache.evict(max_bytes=keep) == 1
+    assert [os.path.exists(eval_cache._entry_path(key)) for key in keys] == [True, False, True]
+
+
+def test_evict_removes_expired_entries():
+    key = eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", "transcript")
+    eval_cache.put(key, "value")
+    _age(key, 120)
+    assert eval_cache.evict(max_age_seconds=60) == 1
+    assert eval_cache.evict() == 0
+
+
+def test_peek_and_contains_are_not_counted_as_lookups(monkeypatch):
+    monkeypatch.setattr(eval_cache, "_stats", dict.fromkeys(eval_cache._stats, 0))
+    key = eval_cache.cache_key(RUBRIC, "prompt", "gpt-4", "transcript")
+    assert eval_cache.peek(key) is None and not eval_cache.contains(key)
+    eval_cache.put(key, "value")
+    assert eval_cache.peek(key) == "value" and eval_cache.contains(key)
+    assert eval_cache.stats()["hits"] == eval_cache.stats()["misses"] == 0
+
+    eval_cache.record_lookup(True)
+    eval_cache.record_lookup(False, bypass=True)
+    stats = eval_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bypassed"]) == (1, 0, 1)
@@ -0,0 +1,104 @@
+# tests/test_eval_requests.py
+
+import os
+
+import pytest
+
+from backend import eval_requests, registry
+from backend.log_segments import SegmentedLog
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Proficient,3,Clear answer.\n"
+
+
+class FakeStorage:
+    """Submissions as a list; offsets are list positions."""
+
+    name = "files"
+    position_key = "submissions_offset"
+
+    def __init__(self):
+        self.submissions, self.scored = [], set()
+
+    def has_submissions(self):
+        return bool(self.submissions)
+
+    def read_submissions(self, start):
+        return self.submissions[start:], start, len(self.submissions)
+
+    def load_scored_ids(self):
+        return set(self.scored)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch, registry_dir):
+    folder = tmp_path / "requests"
+    monkeypatch.setattr(eval_requests, "REQUESTS_PATH", str(folder / "llm_eval_requests.jsonl"))
+    monkeypatch.setattr(eval_requests, "STATE_PATH", str(folder / "eval_request_state.json"))
+    monkeypatch.setattr(eval_requests, "LOCK_PATH", str(folder / "eval_requests.lock"))
+    monkeypatch.setattr(eval_requests, "requests_log",
+                        SegmentedLog(eval_requests.REQUESTS_PATH, eval_requests.LOCK_PATH, time_field="received_at"))
+    os.makedirs(folder)
+
+    for kind, text in ((registry.rubrics, RUBRIC), (registry.prompts, "Evaluate.")):
+        with open(kind.path("default"), "w") as f:
+            f.write(text)
+    monkeypatch.setattr(registry, "DEFAULT_RUBRIC_ID", "default")
+    monkeypatch.setattr(registry, "DEFAULT_PROMPT_ID", "default")
+
+    fake = FakeStorage()
+    monkeypatch.setattr(eval_requests, "get_storage", lambda: fake)
+    return fake
+
+
+def emails(block):
+    return [t["email"] for t in block["transcripts"]]
+
+
+def test_missing_submissions(storage):
+    assert eval_requests.generate_request_block() == (None, "missing")
+
+
+def test_blocks_hold_only_new_unscored_transcripts(storage):
+    storage.submissions += [("a@x.edu", "one"), ("b@x.edu", "two"), ("a@x.edu", "one")]
+    block, status = eval_requests.generate_request_block()
+    assert status == "success"
+    assert emails(block) == ["a@x.edu", "b@x.edu"]
+    assert block["submissions_range"] == [0, 3]
+    assert block["rubric_ref"] == registry.reference(registry.get_rubric("default"))
+
+    assert eval_requests.generate_request_block() == (None, "empty")
+
+    storage.submissions += [("c@x.edu", "three"), ("d@x.edu", "four")]
+    storage.scored.add(eval_requests.transcript_id("d@x.edu", "four"))
+    block, _ = eval_requests.generate_request_block()
+    assert emails(block) == ["c@x.edu"]
+    assert block["submissions_range"] == [3, 5]
+    assert [emails(b) for b in eval_requests.iter_blocks()] == [["a@x.edu", "b@x.edu"], ["c@x.edu"]]
+
+
+def test_full_rebuild_replaces_the_log_and_reports_what_it_dropped(storage):
+    for i in range(3):
+        storage.submissions.append((f"s{i}@x.edu", f"text {i}"))
+        eval_requests.generate_request_block()
+        if i < 2:
+            eval_requests.requests_log.rotate(force=True)
+    eval_requests.requests_log.compress(hot=0)
+    storage.scored.add(eval_requests.transcript_id("s0@x.edu", "text 0"))
+
+    block, _ = eval_requests.generate_request_block(full=True)
+
+    assert block["full_rebuild"] is True
+    assert block["replaced"] == {"blocks": 3, "archived_segments": 2}
+    # Scored transcripts are included again
+    assert emails(block) == ["s0@x.edu", "s1@x.edu", "s2@x.edu"]
+    assert [emails(b) for b in eval_requests.iter_blocks()] == [emails(block)]
+    assert eval_requests.requests_log.stats()["segments"] == 0
+
+
+def test_route_reports_replaced_blocks(storage, client):
+    storage.submissions.append(("a@x.edu", "one"))
+    assert client.post("/generate-eval-request").get_json()["replaced"] is None
+
+    body = client.post("/generate-eval-request?full=1").get_json()
+    assert body["full_rebuild"] is True
+    assert body["replaced"] == {"blocks": 1, "archived_segments": 0}
@@ -0,0 +1,130 @@
+# tests/test_job_queue.py
+
+import json
+import os
+import threading
+
+import pytest
+
+from backend import job_queue
+from backend import llm_assess_interviews as llm
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    """Job queue under tmp_path with evaluation replaced; yields the indexes each run scored."""
+    monkeypatch.setattr(job_queue, "JOBS_DIR", str(tmp_path / "jobs"))
+    for name, value in (("_executor", None), ("_job_locks", {}), ("_futures", set()), ("_draining", False)):
+        monkeypatch.setattr(job_queue, name, value)
+    runs = []
+
+    def fake_evaluate(block, on_result=None, **kwargs):
+        runs.append([t["transcript"] for t in block["transcripts"]])
+        for position, entry in enumerate(block["transcripts"]):
+            on_result(position, {"email": entry["email"], "feedback": f"scored {entry['transcript']}"})
+
+    monkeypatch.setattr(llm, "evaluate_transcript_block", fake_evaluate)
+    monkeypatch.setattr(llm, "save_results", lambda results, rubric_hash, model: str(tmp_path / "saved.jsonl"))
+    yield runs
+    job_queue.drain(timeout=5)
+
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Proficient,3,Clear answer.\n"
+
+
+def write_job(status, done=(), partial=False):
+    """A job record as a crashed process would leave it, with results for the indexes in done."""
+    transcripts = [{"email": f"s{i}@x.edu", "name": f"S{i}", "transcript": f"t{i}"} for i in range(4)]
+    job = {"id": "a" * 32, "kind": "evaluate-transcripts", "status": status, "model": "gpt-4",
+           "max_in_flight": None, "bypass_cache": False, "total": len(transcripts), "completed": 0, "error": None,
+           "request_block": {"rubric_csv": RUBRIC, "transcripts": transcripts}, "created_at": "2026-01-01T00:00:00"}
+    os.makedirs(job_queue.JOBS_DIR, exist_ok=True)
+    job_queue._write_job(job)
+    _, results_path, _ = job_queue._paths(job["id"])
+    with open(results_path, "w") as f:
+        for i in done:
+            f.write(json.dumps({"index": i, "email": f"s{i}@x.edu", "feedback": f"scored t{i}"}) + "\n")
+        if partial:
+            f.write('{"index": 3, "email": "s3@x')
+    return job["id"]
+
+
+def test_interrupted_job_resumes_only_unscored_transcripts(jobs):
+    job_id = write_job("running", done=(0, 2), partial=True)
+
+    assert job_queue.resume_jobs() == [job_id]
+    assert job_queue.drain(timeout=5) == 0
+
+    assert jobs == [["t1", "t3"]]
+    job = job_queue.load_job(job_id)
+    assert job["status"] == "done"
+    assert job["completed"] == 4
+    results = job_queue.load_results(job_id)
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+    assert job_queue.count_results(job_id) == 4
+
+
+def test_finished_jobs_are_not_resumed(jobs):
+    write_job("done", done=(0, 1, 2, 3))
+    assert job_queue.resume_jobs() == []
+
+
+def test_drain_leaves_unstarted_jobs_queued(jobs, monkeypatch):
+    monkeypatch.setattr(job_queue, "MAX_WORKERS", 1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_evaluate(block, on_result=None, **kwargs):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(llm, "evaluate_transcript_block", slow_evaluate)
+    first = job_queue.submit_job({"rubric_csv": RUBRIC, "transcripts": [{"email": "a@x.edu", "transcript": "t"}]})
+    second = job_queue.submit_job({"rubric_csv": RUBRIC, "transcripts": [{"email": "b@x.edu", "transcript": "t"}]})
+    assert started.wait(5)
+    release.set()
+    assert job_queue.drain(timeout=5) == 0
+
+    assert job_queue.load_job(first["id"])["status"] == "done"
+    assert job_queue.load_job(second["id"])["status"] == "queued"
+
+
+def events(response):
+    """(id, event, data) for each SSE event in a streamed response, read as it arrives."""
+    buffer = b""
+    for chunk in response.response:
+        buffer += chunk
+        while b"\n\n" in buffer:
+            raw, buffer = buffer.split(b"\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in raw.decode().splitlines() if not line.startswith(":"))
+            yield fields.get("id"), fields.get("event"), json.loads(fields["data"])
+
+
+def test_events_resume_after_last_event_id(jobs, client):
+    job_id = write_job("done", done=(2, 0, 1, 3))
+    response = client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "1"}, buffered=False)
+
+    received = list(events(response))
+    assert [(event_id, event) for event_id, event, _ in received] == [("2", "result"), ("3", "result"),
+                                                                       (None, "done")]
+    assert [data["index"] for _, event, data in received if event == "result"] == [1, 3]
+
+
+def test_events_follow_a_running_job_without_replaying(jobs, client):
+    job_id = write_job("running", done=(0,))
+    _, results_path, _ = job_queue._paths(job_id)
+    response = client.get(f"/jobs/{job_id}/events", buffered=False)
+    stream = events(response)
+
+    assert next(stream)[2]["index"] == 0
+    # More results land while the client is connected, then the job finishes
+    with open(results_path, "a") as f:
+        for i in (1, 2):
+            f.write(json.dumps({"index": i, "email": f"s{i}@x.edu"}) + "\n")
+    job = job_queue.load_job(job_id)
+    job_queue._write_job(dict(job, status="done"))
+
+    rest = list(stream)
+    assert [(event_id, data.get("index")) for event_id, event, data in rest if event == "result"] == [("1", 1),
+                                                                                                        ("2", 2)]
+    assert rest[-1][1] == "done"
@@ -0,0 +1,102 @@
+# tests/test_llm_assess_interviews.py
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import eval_cache
+from backend import llm_assess_interviews as llm
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Proficient,3,Clear answer.\n"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(eval_cache, "CACHE_DIR", str(tmp_path / "evaluations"))
+    monkeypatch.setattr(eval_cache, "_stats", dict.fromkeys(eval_cache._stats, 0))
+    scored = []
+
+    def fake_score(system_prompt, text, model, compiled=None):
+        scored.append(text)
+        return "Clarity: Proficient (3)"
+
+    monkeypatch.setattr(llm, "score_transcript_with_backoff", fake_score)
+    return scored
+
+
+def key(text, variant=None):
+    system_prompt = llm.compile_rubric(RUBRIC).system_prompt(llm.registry.DEFAULT_PROMPT)
+    return eval_cache.cache_key(RUBRIC, system_prompt, "gpt-4", text, variant=variant)
+
+
+def block(*texts, **options):
+    return dict({"rubric_csv": RUBRIC, "transcripts": [{"email": f"{t}@x.edu", "transcript": t} for t in texts]},
+                **options)
+
+
+def lookups():
+    stats = eval_cache.stats()
+    return stats["hits"], stats["misses"], stats["bypassed"]
+
+
+def test_packed_lookup_counts_once_per_transcript(cache):
+    eval_cache.put(key("single"), "Clarity: Proficient (3)")
+    eval_cache.put(key("packed", variant="packed"), "Clarity: Proficient (3)")
+
+    results = llm.evaluate_transcript_block(block("single", "packed", "fresh", pack=True))
+
+    assert [r["cached"] for r in results] == [True, True, False]
+    assert cache == ["fresh"]
+    assert lookups() == (2, 1, 0)
+
+
+def test_unpacked_lookup_counts_once_per_transcript(cache):
+    eval_cache.put(key("single"), "Clarity: Proficient (3)")
+
+    llm.evaluate_transcript_block(block("single", "fresh"))
+    assert lookups() == (1, 1, 0)
+
+    llm.evaluate_transcript_block(block("single", "fresh", pack=True), bypass_cache=True)
+    assert lookups() == (1, 1, 2)
+
+
+def test_import_has_no_side_effects(tmp_path):
+    # Under gunicorn the module is imported with gunicorn's argv and no request log around
+    code = ("import sys; sys.argv = ['gunicorn', '-c', 'gunicorn.conf.py', '--bogus']\n"
+            "from backend import llm_client, llm_assess_interviews\n"
+            "assert llm_client._client is None\n")
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    done = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=60,
+                          env=dict(os.environ, SKILLSCOPE_EVAL_CACHE_DIR=str(tmp_path / "cache")))
+    assert done.returncode == 0, done.stderr
+    assert done.stdout == ""
+    assert not (tmp_path / "cache").exists()
+
+
+def test_main_scores_unscored_transcripts_of_an_input_file(tmp_path, monkeypatch):
+    scored_id = llm.transcript_id("old@x.edu", "old")
+    requests = tmp_path / "requests.jsonl"
+    requests.write_text(json.dumps(block("old", "new")) + "\n" +
+                        json.dumps(dict(block("new"), transcripts=[{"email": "new@x.edu", "transcript": "new"}])) + "\n")
+    output = tmp_path / "out" / "results.jsonl"
+    evaluated, marked = [], []
+
+    def fake_evaluate(request_block, **kwargs):
+        evaluated.append([t["transcript"] for t in request_block["transcripts"]])
+        return [{"email": t["email"], "feedback": "ok", "transcript_id": t["transcript_id"]}
+                for t in request_block["transcripts"]]
+
+    monkeypatch.setattr(llm, "evaluate_transcript_block", fake_evaluate)
+    monkeypatch.setattr(llm, "load_scored_ids", lambda: {scored_id})
+    monkeypatch.setattr(llm, "mark_scored", marked.extend)
+    monkeypatch.setattr(eval_cache, "CACHE_DIR", str(tmp_path / "cache"))
+
+    llm.main(["--input", str(requests), "--output", str(output)])
+
+    # "old" is already scored; "new" appears in both blocks but is scored once
+    assert evaluated == [["new"]]
+    assert [json.loads(line)["email"] for line in output.read_text().splitlines()] == ["new@x.edu"]
+    assert len(marked) == 1
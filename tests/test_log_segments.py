@@ -0,0 +1,109 @@
+# tests/test_log_segments.py
+
+import gzip
+import json
+import os
+
+import pytest
+
+from backend import log_segments
+from backend.log_segments import SegmentedLog
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_segments, "SEGMENT_BYTES", 200)
+    monkeypatch.setattr(log_segments, "CODEC", "gzip")
+    return SegmentedLog(str(tmp_path / "records.jsonl"), str(tmp_path / "records.lock"), time_field="at")
+
+
+def append(log, record):
+    """Append like the stores do: note the logical offset, write, rotate if over size."""
+    line = (json.dumps(record) + "\n").encode()
+    with open(log.path, "ab") as f:
+        offset = log.base() + f.seek(0, os.SEEK_END)
+        f.write(line)
+    log.rotate(by_age=False)
+    return offset
+
+
+def fill(log, count):
+    return [append(log, {"n": i, "at": "2026-01-01T00:00:00+00:00", "pad": "x" * 40}) for i in range(count)]
+
+
+def test_rotates_once_the_live_file_passes_the_size_threshold(log):
+    append(log, {"n": 0, "pad": "x" * 40})
+    assert log.segments() == []
+
+    fill(log, 6)
+    segments = log.segments()
+    assert segments and all(s["bytes"] >= 200 for s in segments)
+    assert segments[0]["start"] == 0 and segments[0]["end"] == segments[0]["bytes"]
+    # The live file picks up where the last segment ends
+    assert log.base() == segments[-1]["end"]
+    assert log.end() == log.base() + os.path.getsize(log.path)
+
+
+def test_logical_offsets_read_the_same_record_across_rotation_and_compression(log):
+    offsets = fill(log, 12)
+    assert len(log.segments()) >= 2
+    before = [json.loads(log.read(offset)) for offset in offsets]
+    assert [r["n"] for r in before] == list(range(12))
+
+    assert log.compress(hot=0) > 0
+    assert all(s["codec"] == "gzip" for s in log.segments())
+    assert [json.loads(log.read(offset)) for offset in offsets] == before
+    assert [offset for offset, _ in log.iter_records()] == offsets
+
+    # Starting mid-log, inside a compressed segment, yields exactly the later records
+    assert [r["n"] for _, r in log.iter_records(offsets[5])] == list(range(5, 12))
+    assert log.is_line_start(offsets[5]) and not log.is_line_start(offsets[5] + 1)
+    assert log.read(log.end()) is None
+
+
+def test_compaction_keeps_every_live_record(log):
+    fill(log, 14)
+    live_before = open(log.path, "rb").read()
+    records = [r for _, r in log.iter_records()]
+    archived = sum(s["records"] for s in log.segments())
+
+    # Every third archived record is superseded; the rest must all survive
+    dropped = log.compact(lambda record: record if record["n"] % 3 else None)
+    assert dropped == sum(1 for r in records[:archived] if r["n"] % 3 == 0)
+    assert [r for _, r in log.iter_records()] == [r for r in records[:archived] if r["n"] % 3] + records[archived:]
+    # The live file is never rewritten
+    assert live_before and open(log.path, "rb").read() == live_before
+    assert all(s.get("compacted") for s in log.segments())
+
+
+def test_a_crash_between_rotate_and_compress_leaves_a_readable_log(log):
+    offsets = fill(log, 12)
+    segment = log.segments()[0]
+    # compress() died after writing part of its temporary file, before swapping it in
+    partial = os.path.join(log.archive_dir, f"{segment['file']}.gz.{os.getpid()}.tmp")
+    with gzip.open(partial, "wb") as f:
+        f.write(b'{"n": 0')
+
+    assert [r["n"] for _, r in log.iter_records()] == list(range(12))
+    assert json.loads(log.read(offsets[0]))["n"] == 0
+
+    # A later maintenance run compresses the segment normally
+    log.compress(hot=0)
+    assert [r["n"] for _, r in log.iter_records()] == list(range(12))
+    assert all(s["codec"] == "gzip" for s in log.segments())
+
+
+def test_partial_trailing_line_is_left_for_the_next_read(log):
+    offsets = fill(log, 2)
+    with open(log.path, "ab") as f:
+        f.write(b'{"n": 2')
+    assert [offset for offset, _ in log.iter_lines()] == offsets
+
+
+def test_replace_drops_the_archive_and_restarts_offsets(log, tmp_path):
+    fill(log, 12)
+    replacement = tmp_path / "new.jsonl"
+    replacement.write_text(json.dumps({"n": "only"}) + "\n")
+    log.replace(str(replacement))
+    assert log.segments() == [] and log.base() == 0
+    assert [r for _, r in log.iter_records()] == [{"n": "only"}]
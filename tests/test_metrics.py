@@ -0,0 +1,133 @@
+# tests/test_metrics.py
+
+import json
+import os
+
+import pytest
+
+from backend import metrics
+
+
+def metric_set():
+    return (metrics.Counter("t_requests_total", "Requests.", ("route",)),
+            metrics.Histogram("t_latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)),
+            metrics.Gauge("t_queue_depth", "Queue depth.", lambda: 3))
+
+
+@pytest.fixture
+def multiprocess(tmp_path, monkeypatch):
+    """Multiprocess mode with only this test's metrics registered."""
+    monkeypatch.setattr(metrics, "MULTIPROCESS_DIR", str(tmp_path / "metrics"))
+    registered = metric_set()
+    monkeypatch.setattr(metrics, "_registry", list(registered))
+    return registered
+
+
+def write_worker(pid, counts, latencies, depth):
+    """Snapshot of another worker process, as its write_snapshot() would leave it."""
+    counter, histogram, _ = metric_set()
+    for route, n in counts.items():
+        counter.inc(n, route=route)
+    for value in latencies:
+        histogram.observe(value, route="/a")
+    gauge = metrics.Gauge("t_queue_depth", "Queue depth.", lambda: depth)
+    with open(os.path.join(metrics.MULTIPROCESS_DIR, f"{pid}.json"), "w") as f:
+        json.dump({"pid": pid, "metrics": {m.name: m.dump() for m in (counter, histogram, gauge)}}, f)
+
+
+def sample_lines(text):
+    return [line for line in text.splitlines() if not line.startswith("#")]
+
+
+def test_worker_snapshots_merge_into_one_exposition(multiprocess):
+    counter, histogram, _ = multiprocess
+    counter.inc(1, route="/a")
+    histogram.observe(0.05, route="/a")
+    os.makedirs(metrics.MULTIPROCESS_DIR)
+    write_worker(4242, {"/a": 2, "/b": 5}, [0.5, 3.0], depth=7)
+
+    text = metrics.render()
+    assert text.count("# TYPE t_requests_total counter") == 1
+    lines = sample_lines(text)
+    assert 't_requests_total{route="/a"} 3' in lines
+    assert 't_requests_total{route="/b"} 5' in lines
+    assert [line for line in lines if line.startswith("t_latency_seconds")] == [
+        't_latency_seconds_bucket{route="/a",le="0.1"} 1',
+        't_latency_seconds_bucket{route="/a",le="1.0"} 2',
+        't_latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        't_latency_seconds_sum{route="/a"} 3.55',
+        't_latency_seconds_count{route="/a"} 3',
+    ]
+    # Gauges are readings, not totals: one series per live worker
+    assert f't_queue_depth{{worker="{os.getpid()}"}} 3' in lines
+    assert 't_queue_depth{worker="4242"} 7' in lines
+
+
+def test_exited_worker_totals_are_kept(multiprocess):
+    counter, _, _ = multiprocess
+    counter.inc(1, route="/a")
+    os.makedirs(metrics.MULTIPROCESS_DIR)
+    write_worker(4242, {"/a": 2}, [0.5], depth=7)
+    write_worker(4343, {"/a": 4}, [], depth=1)
+    before = metrics.render()
+
+    metrics.mark_process_dead(4242)
+    metrics.mark_process_dead(4343)
+    metrics.mark_process_dead(4444)  # never wrote a snapshot
+    after = sample_lines(metrics.render())
+
+    assert 't_requests_total{route="/a"} 7' in sample_lines(before)
+    assert 't_requests_total{route="/a"} 7' in after
+    assert 't_latency_seconds_count{route="/a"} 1' in after
+    assert [line for line in after if line.startswith("t_queue_depth")] == [
+        f't_queue_depth{{worker="{os.getpid()}"}} 3']
+    assert sorted(os.listdir(metrics.MULTIPROCESS_DIR)) == sorted(["archive.json", f"{os.getpid()}.json", "metrics.lock"])
+
+    metrics.clear_snapshots()
+    assert os.listdir(metrics.MULTIPROCESS_DIR) == ["metrics.lock"]
+
+
+def test_single_process_exposition_format(monkeypatch):
+    counter, histogram, gauge = metric_set()
+    monkeypatch.setattr(metrics, "MULTIPROCESS_DIR", None)
+    monkeypatch.setattr(metrics, "_registry", [counter, histogram, gauge])
+    counter.inc(route='/say "hi"\n')
+    counter.inc(2, route="/a")
+    histogram.observe(0.1, route="/a")
+    histogram.observe(7, route="/a")
+
+    assert metrics.render().splitlines() == [
+        "# HELP t_requests_total Requests.",
+        "# TYPE t_requests_total counter",
+        't_requests_total{route="/a"} 2',
+        't_requests_total{route="/say \\"hi\\"\\n"} 1',
+        "# HELP t_latency_seconds Latency.",
+        "# TYPE t_latency_seconds histogram",
+        't_latency_seconds_bucket{route="/a",le="0.1"} 1',
+        't_latency_seconds_bucket{route="/a",le="1.0"} 1',
+        't_latency_seconds_bucket{route="/a",le="+Inf"} 2',
+        't_latency_seconds_sum{route="/a"} 7.1',
+        't_latency_seconds_count{route="/a"} 2',
+        "# HELP t_queue_depth Queue depth.",
+        "# TYPE t_queue_depth gauge",
+        "t_queue_depth 3",
+    ]
+
+
+def test_histogram_time_observes_even_when_the_block_raises():
+    _, histogram, _ = metric_set()
+    with pytest.raises(RuntimeError):
+        with histogram.time(route="/a"):
+            raise RuntimeError("boom")
+    assert histogram.dump()[0][3] == 1
+
+
+def test_metrics_route_records_request_latency(client, monkeypatch):
+    monkeypatch.setattr(metrics, "MULTIPROCESS_DIR", None)
+    client.get("/metrics")
+    res = client.get("/metrics")
+
+    assert res.content_type == "text/plain; version=0.0.4; charset=utf-8"
+    text = res.get_data(as_text=True)
+    assert "# TYPE skillscope_http_request_seconds histogram" in text
+    assert 'skillscope_http_request_seconds_count{route="/metrics",method="GET",status="200"}' in text
@@ -0,0 +1,123 @@
+# tests/test_packing.py
+
+import json
+
+import pytest
+
+from backend import eval_cache, packing
+from backend import llm_assess_interviews as llm
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Beginning,1,Hard to follow.\nClarity,Proficient,3,Clear answer.\n"
+
+
+def evaluation(level="Proficient", score=3):
+    return {"skills": [{"skill": "Clarity", "level": level, "score": score}], "feedback": "Fine."}
+
+
+def test_plan_packs_respects_budget_and_item_limit():
+    items = [("a", 100), ("b", 100), ("c", 100), ("d", 100)]
+    assert packing.plan_packs(items, token_budget=250) == [["a", "b"], ["c", "d"]]
+    assert packing.plan_packs(items, token_budget=1000, max_items=3) == [["a", "b", "c"], ["d"]]
+
+
+def test_transcript_over_budget_gets_its_own_pack():
+    items = [("a", 100), ("huge", 5000), ("b", 100)]
+    assert packing.plan_packs(items, token_budget=1000) == [["a"], ["huge"], ["b"]]
+
+
+def test_build_packed_message_delimits_each_transcript():
+    message = packing.build_packed_message([("0", "first answer"), ("1", "second answer")])
+    assert "2 student transcripts" in message
+    assert '<transcript id="0">\nfirst answer\n</transcript>' in message
+    assert '<transcript id="1">\nsecond answer\n</transcript>' in message
+
+
+def test_parse_well_formed_reply():
+    reply = "```json\n" + json.dumps({"results": [{"id": "0", "evaluation": evaluation()},
+                                                   {"id": "1", "evaluation": evaluation("Beginning", 1)}]}) + "\n```"
+    parsed = packing.parse_packed_feedback(reply, ["0", "1"])
+    assert set(parsed) == {"0", "1"}
+    assert json.loads(parsed["1"]) == evaluation("Beginning", 1)
+
+
+def test_parse_skips_missing_and_unexpected_ids():
+    reply = json.dumps({"results": [{"id": "0", "evaluation": evaluation()}, {"id": "7", "evaluation": evaluation()},
+                                    {"id": "1", "evaluation": ""}]})
+    assert set(packing.parse_packed_feedback(reply, ["0", "1", "2"])) == {"0"}
+
+
+@pytest.mark.parametrize("reply", ["no json", '{"results": "nope"}',
+                                   # a reply cut off at the completion token limit
+                                   '{"results": [{"id": "0", "evaluation": {"skills": [{"skill": "Clar'])
+def test_parse_rejects_unusable_replies(reply):
+    with pytest.raises(ValueError):
+        packing.parse_packed_feedback(reply, ["0"])
+
+
+def test_tokens_saved_never_negative():
+    assert packing.tokens_saved(500, 3, 120) == 880
+    assert packing.tokens_saved(10, 2, 120) == 0
+
+
+@pytest.fixture
+def scoring(tmp_path, monkeypatch):
+    """Packed evaluation with the API replaced: replies[...] answers packed calls, singles are recorded."""
+    monkeypatch.setattr(eval_cache, "CACHE_DIR", str(tmp_path / "evaluations"))
+    calls = {"packed": [], "single": [], "reply": None}
+
+    def fake_complete(system_prompt, message, model, response_format=None):
+        calls["packed"].append(message)
+        return calls["reply"]
+
+    def fake_score(system_prompt, text, model, compiled=None):
+        calls["single"].append(text)
+        return json.dumps(evaluation("Beginning", 1))
+
+    monkeypatch.setattr(llm, "complete_chat", fake_complete)
+    monkeypatch.setattr(llm, "score_transcript_with_backoff", fake_score)
+    return calls
+
+
+def run_packed(*texts, budget=None):
+    stats = {}
+    block = {"rubric_csv": RUBRIC, "transcripts": [{"email": f"s{i}@x.edu", "transcript": t} for i, t in enumerate(texts)]}
+    results = llm.evaluate_transcript_block(block, pack=True, pack_token_budget=budget, stats=stats)
+    return results, stats
+
+
+def test_packed_reply_scores_every_transcript(scoring):
+    scoring["reply"] = json.dumps({"results": [{"id": "0", "evaluation": evaluation()},
+                                               {"id": "1", "evaluation": evaluation()}]})
+    results, stats = run_packed("first", "second")
+
+    assert len(scoring["packed"]) == 1 and scoring["single"] == []
+    assert [r["packed"] for r in results] == [True, True]
+    assert [r["overall_score"] for r in results] == [3, 3]
+    assert (stats["requests"], stats["packed_requests"], stats["fallbacks"]) == (1, 1, 0)
+
+
+def test_transcript_missing_from_reply_falls_back_alone(scoring):
+    scoring["reply"] = json.dumps({"results": [{"id": "0", "evaluation": evaluation()},
+                                               {"id": "2", "evaluation": evaluation()}]})
+    results, stats = run_packed("first", "second", "third")
+
+    assert scoring["single"] == ["second"]
+    assert [r.get("packed", False) for r in results] == [True, False, True]
+    assert [r["overall_score"] for r in results] == [3, 1, 3]
+    assert stats["requests"] == 2
+
+
+def test_truncated_reply_falls_back_for_the_whole_pack(scoring):
+    scoring["reply"] = '{"results": [{"id": "0", "evaluation": {"skills": [{"skill": "Clar'
+    results, _ = run_packed("first", "second")
+
+    assert scoring["single"] == ["first", "second"]
+    assert not any(r.get("packed") for r in results)
+
+
+def test_transcripts_over_the_budget_are_not_packed(scoring):
+    results, stats = run_packed("word " * 50, "word " * 50, budget=10)
+
+    assert scoring["packed"] == []
+    assert len(scoring["single"]) == 2
+    assert stats["packed_requests"] == 0
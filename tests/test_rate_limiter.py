@@ -0,0 +1,71 @@
+# tests/test_rate_limiter.py
+
+import os
+
+import pytest
+
+from backend import rate_limiter
+from backend.rate_limiter import RateLimitTimeout, acquire, settle
+
+
+@pytest.fixture(autouse=True)
+def buckets(tmp_path, monkeypatch):
+    state_dir = str(tmp_path / "ratelimit")
+    monkeypatch.setattr(rate_limiter, "STATE_DIR", state_dir)
+    monkeypatch.setattr(rate_limiter, "STATE_PATH", os.path.join(state_dir, "buckets.json"))
+    monkeypatch.setattr(rate_limiter, "LOCK_PATH", os.path.join(state_dir, "buckets.lock"))
+    monkeypatch.setattr(rate_limiter, "LIMITS", {"chat.requests": 60.0, "chat.tokens": 6000.0, "audio.requests": 0.0})
+    return state_dir
+
+
+def level(name):
+    return rate_limiter._load_state()[name]["level"]
+
+
+def test_disabled_buckets_do_not_touch_the_state(buckets):
+    assert acquire({"audio.requests": 1}) == 0.0
+    assert not os.path.exists(rate_limiter.STATE_PATH)
+
+
+def test_acquire_takes_from_every_bucket():
+    assert acquire({"chat.requests": 1, "chat.tokens": 500}) == pytest.approx(0.0, abs=0.1)
+    assert level("chat.requests") == pytest.approx(59, abs=0.1)
+    assert level("chat.tokens") == pytest.approx(5500, abs=1)
+
+
+def test_acquire_times_out_when_a_bucket_is_empty():
+    acquire({"chat.requests": 60})
+    with pytest.raises(RateLimitTimeout):
+        acquire({"chat.requests": 30}, timeout=1)
+    # A refused acquire takes nothing
+    assert level("chat.requests") == pytest.approx(0, abs=0.1)
+
+
+def test_acquire_waits_for_the_bucket_to_refill():
+    acquire({"chat.requests": 60})
+    # 60 per minute refills one request per second
+    waited = acquire({"chat.requests": 0.1}, timeout=5)
+    assert 0 < waited < 1
+
+
+def test_oversized_costs_are_capped_to_the_capacity():
+    acquire({"chat.tokens": 10 ** 6}, timeout=1)
+    assert level("chat.tokens") == pytest.approx(0, abs=1)
+
+
+def test_settle_refunds_and_charges_the_difference():
+    acquire({"chat.tokens": 1000})
+    settle("chat.tokens", estimated=1000, actual=400)
+    assert level("chat.tokens") == pytest.approx(5600, abs=1)
+    settle("chat.tokens", estimated=400, actual=2000)
+    assert level("chat.tokens") == pytest.approx(4000, abs=1)
+
+
+def test_settle_never_overfills_and_ignores_unknown_costs():
+    acquire({"chat.tokens": 100})
+    settle("chat.tokens", estimated=5000, actual=0)
+    assert level("chat.tokens") == 6000.0
+    settle("chat.tokens", estimated=100, actual=None)
+    settle("audio.requests", estimated=1, actual=5)
+    assert level("chat.tokens") == 6000.0
+    assert "audio.requests" not in rate_limiter._load_state()
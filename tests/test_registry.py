@@ -0,0 +1,83 @@
+# tests/test_registry.py
+
+import pytest
+
+from backend import registry
+from backend.registry import RegistryError
+from backend.rubric import RubricError
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Proficient,3,Clear answer.\n"
+REVISED = "Skill,Level,Score,Description\nClarity,Proficient,3,Clear and concise answer.\n"
+
+
+def write(kind, item_id, text):
+    with open(kind.path(item_id), "w") as f:
+        f.write(text)
+
+
+def test_current_version_is_cached_until_the_file_changes(registry_dir):
+    write(registry.rubrics, "intro", RUBRIC)
+    first = registry.get_rubric("intro")
+    assert registry.get_rubric("intro") is first
+    assert first["version"] == first["compiled"].content_hash[:12]
+
+    write(registry.rubrics, "intro", REVISED)
+    revised = registry.get_rubric("intro")
+    assert revised["version"] != first["version"]
+    assert "concise" in revised["text"]
+    # Past versions stay available from their snapshots
+    assert registry.get_rubric("intro", first["version"])["text"] == RUBRIC
+    assert registry.rubrics.versions("intro") == [first["version"], revised["version"]]
+
+
+def test_resolve_block_uses_the_pinned_versions(registry_dir):
+    write(registry.rubrics, "intro", RUBRIC)
+    write(registry.prompts, "task", "Evaluate the answer.\n")
+    block = {"rubric_ref": registry.reference(registry.get_rubric("intro")),
+             "prompt_ref": registry.reference(registry.get_prompt("task")), "transcripts": []}
+    write(registry.rubrics, "intro", REVISED)
+
+    resolved = registry.resolve_block(block)
+    assert resolved["rubric_csv"] == RUBRIC
+    assert resolved["evaluation_prompt"] == "Evaluate the answer."
+    inline = {"rubric_csv": RUBRIC, "transcripts": []}
+    assert registry.resolve_block(inline) is inline
+
+
+@pytest.mark.parametrize("item_id, version, message", [
+    ("../secrets", None, "Invalid rubric id"),
+    ("missing", None, "Unknown rubric"),
+    ("intro", "nothex", "Invalid rubric version"),
+    ("intro", "0123456789ab", "Unknown rubric version"),
+])
+def test_lookup_errors(registry_dir, item_id, version, message):
+    write(registry.rubrics, "intro", RUBRIC)
+    with pytest.raises(RegistryError, match=message):
+        registry.get_rubric(item_id, version)
+
+
+def test_invalid_files_are_listed_with_their_error(registry_dir):
+    write(registry.rubrics, "intro", RUBRIC)
+    write(registry.rubrics, "broken", "Skill,Level\nA,B\n")
+    write(registry.prompts, "empty", "   ")
+
+    with pytest.raises(RubricError):
+        registry.get_rubric("broken")
+    with pytest.raises(RegistryError, match="empty"):
+        registry.get_prompt("empty")
+    listed = {entry["id"]: entry for entry in registry.list_rubrics()}
+    assert "error" in listed["broken"]
+    assert listed["intro"]["skills"] == ["Clarity"]
+    assert registry.list_prompts() == [{"id": "empty", "error": "Prompt empty is empty"}]
+
+
+def test_registry_routes(registry_dir, client):
+    write(registry.rubrics, "intro", RUBRIC)
+    version = registry.get_rubric("intro")["version"]
+    write(registry.rubrics, "intro", REVISED)
+
+    assert [r["id"] for r in client.get("/rubrics").get_json()["rubrics"]] == ["intro"]
+    body = client.get(f"/rubrics/intro?version={version}").get_json()
+    assert (body["version"], body["rubric_csv"], body["rows"]) == (version, RUBRIC, 1)
+    assert client.get("/rubrics/missing").status_code == 404
+    assert client.get("/prompts/missing").status_code == 404
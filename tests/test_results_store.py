@@ -0,0 +1,32 @@
+# tests/test_results_store.py
+
+from backend import results_store
+
+
+def result(email, summary, evaluated_at):
+    return {"email": email, "summary": summary, "evaluated_at": evaluated_at}
+
+
+def test_latest_for_email_follows_the_newest_write(results_dir):
+    first = results_store.write_results([result("a@x.edu", "first", "2026-01-01T00:00:00+00:00"),
+                                         result("b@x.edu", "other", "2026-01-01T00:00:00+00:00")])
+    assert results_store.latest_for_email("a@x.edu")["summary"] == "first"
+
+    second = results_store.write_results([result("a@x.edu", "second", "2026-01-02T00:00:00+00:00")],
+                                         filename="llm_eval_responses_a_later.jsonl")
+    latest = results_store.latest_for_email("a@x.edu")
+    assert latest["summary"] == "second"
+    assert latest["_source"] == {"filename": "llm_eval_responses_a_later.jsonl", "offset": 0}
+    assert second != first
+    assert results_store.latest_for_email("b@x.edu")["summary"] == "other"
+    assert results_store.latest_for_email("c@x.edu") is None
+
+
+def test_latest_route_keeps_source_out_of_the_evaluation(results_dir, client):
+    results_store.write_results([result("a@x.edu", "first", "2026-01-01T00:00:00+00:00")],
+                                filename="llm_eval_responses_a_one.jsonl")
+
+    body = client.get("/evaluations/latest?email=a@x.edu").get_json()
+    assert body["evaluation"] == result("a@x.edu", "first", "2026-01-01T00:00:00+00:00")
+    assert body["source"] == {"filename": "llm_eval_responses_a_one.jsonl", "offset": 0}
+    assert client.get("/evaluations/latest?email=c@x.edu").status_code == 404
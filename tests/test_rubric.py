@@ -0,0 +1,67 @@
+# tests/test_rubric.py
+
+import pytest
+
+from backend import rubric
+from backend.rubric import RubricError, compile_rubric
+
+RUBRIC = """Skill,Level,Score,Description
+Clarity,Beginning,1,"Hard to follow, rambling."
+Clarity,Proficient,3,Clear answer.
+Depth,Proficient,3,Explains trade-offs, with examples.
+"""
+
+
+def test_descriptions_with_commas_parse():
+    compiled = compile_rubric(RUBRIC)
+    assert [row["Description"] for row in compiled.rows] == [
+        "Hard to follow, rambling.", "Clear answer.", "Explains trade-offs, with examples."]
+    assert list(compiled.skills) == ["Clarity", "Depth"]
+    assert [row["Score"] for row in compiled.skills["Clarity"]] == [1, 3]
+
+
+def test_compiled_rubrics_are_memoized_by_content():
+    compiled = compile_rubric(RUBRIC)
+    assert compile_rubric(RUBRIC) is compiled
+    # Whitespace and line endings don't change the content hash
+    assert compile_rubric(RUBRIC.replace("\n", "\r\n") + "\n\n") is compiled
+    assert compiled.content_hash == rubric.rubric_hash(RUBRIC)
+    assert compile_rubric(RUBRIC.replace("Clear answer.", "Clear.")) is not compiled
+
+
+def test_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(rubric, "MEMO_SIZE", 2)
+    monkeypatch.setattr(rubric, "_memo", rubric.OrderedDict())
+    monkeypatch.setattr(rubric, "_raw_hashes", rubric.OrderedDict())
+    for i in range(4):
+        compile_rubric(f"Skill,Level,Score,Description\nS{i},L,1,d\n")
+    assert len(rubric._memo) == 2 and len(rubric._raw_hashes) == 2
+
+
+def test_system_prompt_keeps_the_rubric_prefix_stable():
+    compiled = compile_rubric(RUBRIC)
+    first, second = compiled.system_prompt("Task one."), compiled.system_prompt("Task two.")
+    assert first.startswith(compiled.prefix) and second.startswith(compiled.prefix)
+    # The per-batch task comes after the rubric, never inside the shared prefix
+    assert "Task one." not in compiled.prefix
+    assert first.index("Task one.") > first.index("Depth – Proficient (3)")
+    assert compiled.system_prompt("Task one.") is first
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "empty"),
+    ("Skill,Level,Description\nA,B,c\n", "missing column"),
+    ("Skill,Level,Score,Description\n", "no rows"),
+    ("Skill,Level,Score,Description\nA,,1,d\n", "needs a Skill and a Level"),
+    ("Skill,Level,Score,Description\nA,B,high,d\n", "non-integer Score"),
+])
+def test_invalid_rubrics_raise(text, message):
+    with pytest.raises(RubricError, match=message):
+        compile_rubric(text)
+
+
+def test_summary_reports_skills_and_token_counts():
+    summary = compile_rubric(RUBRIC).summary()
+    assert summary["rows"] == 3
+    assert summary["skills"]["Clarity"] == [{"level": "Beginning", "score": 1}, {"level": "Proficient", "score": 3}]
+    assert 0 < summary["rubric_tokens"] < summary["prefix_tokens"]
@@ -0,0 +1,155 @@
+# tests/test_scoring_engine.py
+
+import random
+import threading
+import time
+
+import pytest
+
+from backend import scoring_engine
+from backend.scoring_engine import RetryBudget, call_with_backoff, parse_max_in_flight, score_many
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Backoff delays are recorded instead of slept."""
+    delays = []
+    monkeypatch.setattr(scoring_engine.time, "sleep", delays.append)
+    monkeypatch.setattr(scoring_engine, "retry_budget", RetryBudget())
+    return delays
+
+
+def test_score_many_keeps_input_order():
+    def score(n):
+        time.sleep(random.uniform(0, 0.01))
+        return n * 2
+
+    assert score_many(range(20), score, max_in_flight=8) == [n * 2 for n in range(20)]
+
+
+def test_score_many_respects_max_in_flight():
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def score(n):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return n
+
+    score_many(range(12), score, max_in_flight=3)
+    assert peak <= 3
+
+
+def test_score_many_reports_each_result():
+    seen = {}
+    results = score_many(range(5), lambda n: n + 1, max_in_flight=2, on_result=seen.__setitem__)
+    assert seen == dict(enumerate(results))
+
+
+def test_score_many_turns_failures_into_results_with_on_error():
+    def score(n):
+        if n == 3:
+            raise RuntimeError("boom")
+        return n
+
+    results = score_many(range(5), score, max_in_flight=4, on_error=lambda item, e: f"[ERROR] {item}: {e}")
+    assert results == [0, 1, 2, "[ERROR] 3: boom", 4]
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4])
+def test_score_many_reraises_without_on_error(max_in_flight):
+    def score(n):
+        if n == 2:
+            raise RuntimeError("boom")
+        return n
+
+    with pytest.raises(RuntimeError, match="boom"):
+        score_many(range(4), score, max_in_flight=max_in_flight)
+
+
+def test_score_many_empty():
+    assert score_many([], lambda n: n) == []
+
+
+def test_parse_max_in_flight_clamps_and_rejects():
+    assert parse_max_in_flight(None) is None
+    assert parse_max_in_flight("3") == 3
+    assert parse_max_in_flight(0) == 1
+    assert parse_max_in_flight(10 ** 6) == scoring_engine.MAX_IN_FLIGHT_LIMIT
+    for bad in ("abc", 2.5, True, [4]):
+        with pytest.raises(ValueError):
+            parse_max_in_flight(bad)
+
+
+def test_call_with_backoff_retries_transient_errors(no_sleep):
+    failures = [FakeAPIError(429), FakeAPIError(503)]
+
+    def call():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    assert call_with_backoff(call, base_delay=1.0, max_delay=4.0) == "ok"
+    assert len(no_sleep) == 2
+    assert 0.5 <= no_sleep[0] <= 1.0 and 1.0 <= no_sleep[1] <= 2.0
+
+
+def test_call_with_backoff_honors_retry_after(no_sleep):
+    failures = [FakeAPIError(429, retry_after="7")]
+
+    def call():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    assert call_with_backoff(call) == "ok"
+    assert no_sleep == [7.0]
+
+
+def test_call_with_backoff_does_not_retry_other_errors(no_sleep):
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise FakeAPIError(400)
+
+    with pytest.raises(FakeAPIError):
+        call_with_backoff(call)
+    assert len(calls) == 1 and no_sleep == []
+
+
+def test_call_with_backoff_gives_up_after_max_retries(no_sleep):
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise FakeAPIError(500)
+
+    with pytest.raises(FakeAPIError):
+        call_with_backoff(call, max_retries=2)
+    assert len(calls) == 3
+
+
+def test_call_with_backoff_stops_when_the_budget_is_spent(monkeypatch, no_sleep):
+    monkeypatch.setattr(scoring_engine, "retry_budget", RetryBudget(ratio=0, reserve=1))
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise FakeAPIError(429)
+
+    with pytest.raises(FakeAPIError):
+        call_with_backoff(call, max_retries=5)
+    assert len(calls) == 2
@@ -0,0 +1,103 @@
+# tests/test_similarity_index.py
+
+import random
+
+import pytest
+
+from backend import similarity_index as index
+
+WORDS = [f"w{i}" for i in range(500)]
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(index, "INDEX_PATH", str(tmp_path / "minhash.jsonl"))
+    monkeypatch.setattr(index, "LOCK_PATH", str(tmp_path / "minhash.lock"))
+    for name, value in (("_pos", 0), ("_inode", None), ("_entries", {}), ("_buckets", {})):
+        monkeypatch.setattr(index, name, value)
+
+
+@pytest.fixture
+def rng():
+    return random.Random(1234)
+
+
+def text(rng, n=200):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def edited(original, rng, changes=2):
+    words = original.split()
+    for i in rng.sample(range(len(words)), changes):
+        words[i] = "edited"
+    return " ".join(words)
+
+
+def shares_bucket(a, b):
+    return any(x == y for x, y in zip(index._bands(index.signature(a)), index._bands(index.signature(b))))
+
+
+def test_signature_is_deterministic(rng):
+    sample = text(rng)
+    assert index.signature(sample) == index.signature(sample.upper())
+    assert index.signature("") is None
+
+
+def test_near_duplicates_share_a_bucket_and_unrelated_texts_do_not(rng):
+    originals = [text(rng) for _ in range(20)]
+    for original in originals:
+        assert shares_bucket(original, edited(original, rng))
+    for a, b in zip(originals, originals[1:]):
+        assert not shares_bucket(a, b)
+
+
+def test_add_returns_near_duplicates_indexed_before(rng):
+    original, unrelated = text(rng), text(rng)
+    assert index.add("t1", "a@x.edu", original, storage_id=1) == []
+    assert index.add("t2", "b@x.edu", unrelated, storage_id=2) == []
+
+    matches = index.add("t3", "c@x.edu", edited(original, rng), storage_id=3)
+    assert [m["transcript_id"] for m in matches] == ["t1"]
+    assert matches[0]["similarity"] >= index.THRESHOLD
+    assert index.size() == 3
+    assert [m["transcript_id"] for m in index.similar_to("t1")] == ["t3"]
+
+
+def test_remove_drops_band_entries(rng):
+    original = text(rng)
+    index.add("t1", "a@x.edu", original)
+    index.add("t2", "b@x.edu", edited(original, rng))
+
+    assert index.remove("t1")
+    assert not index.remove("t1")
+    assert index.size() == 1
+    assert all("t1" not in bucket for bucket in index._buckets.values())
+    assert index.query(original, exclude="t2") == []
+    assert index.similar_to("t1") is None
+
+
+def test_update_replaces_band_entries(rng):
+    original, replacement = text(rng), text(rng)
+    index.add("t1", "a@x.edu", original, storage_id=1)
+    index.add("t2", "b@x.edu", edited(original, rng))
+
+    assert index.update("t1", "a@x.edu", replacement, storage_id=9)
+    assert not index.update("missing", "z@x.edu", replacement)
+    assert index.size() == 2
+    assert index.similar_to("t1") == []
+    match = index.query(replacement)[0]
+    assert (match["transcript_id"], match["id"], match["similarity"]) == ("t1", 9, 1.0)
+    buckets = sum(bucket.count("t1") for bucket in index._buckets.values())
+    assert buckets == index.BANDS
+
+
+def test_another_process_sees_removals(rng, monkeypatch):
+    original = text(rng)
+    index.add("t1", "a@x.edu", original)
+    index.remove("t1")
+
+    # A fresh process replays the log, including the removal
+    for name, value in (("_pos", 0), ("_inode", None), ("_entries", {}), ("_buckets", {})):
+        monkeypatch.setattr(index, name, value)
+    assert index.size() == 0
+    assert index._buckets == {}
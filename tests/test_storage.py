@@ -0,0 +1,94 @@
+# tests/test_storage.py
+
+import pytest
+
+from backend import storage
+from backend.log_segments import SegmentedLog
+from backend.storage import FileStorage, SQLiteStorage, StorageError
+
+
+@pytest.fixture
+def file_paths(tmp_path, monkeypatch, transcript_dir):
+    submissions = tmp_path / "submissions"
+    submissions.mkdir()
+    monkeypatch.setattr(storage, "SUBMISSIONS_PATH", str(submissions / "submissions.jsonl"))
+    monkeypatch.setattr(storage, "SUBMISSIONS_LOCK_PATH", str(submissions / "submissions.lock"))
+    monkeypatch.setattr(storage, "SCORED_PATH", str(tmp_path / "responses" / "scored_transcripts.jsonl"))
+    monkeypatch.setattr(storage, "SCORED_LOCK_PATH", str(tmp_path / "responses" / "scored_transcripts.lock"))
+    monkeypatch.setattr(storage, "submissions_log",
+                        SegmentedLog(storage.SUBMISSIONS_PATH, storage.SUBMISSIONS_LOCK_PATH, time_field="submitted_at"))
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def backend(request, tmp_path, file_paths):
+    return FileStorage() if request.param == "files" else SQLiteStorage(str(tmp_path / "skillscope.db"))
+
+
+def submission(email, text, day=1):
+    return {"name": email.split("@")[0], "email": email, "transcript": text,
+            "submitted_at": f"2026-01-0{day}T00:00:00+00:00"}
+
+
+def test_submissions_dedupe_transcripts_and_read_incrementally(backend):
+    assert not backend.has_submissions()
+    added = [backend.add_submission(submission(email, text))
+             for email, text in (("a@x.edu", "one"), ("b@x.edu", "two"), ("a@x.edu", "one"))]
+    assert [flag for flag, _ in added] == [True, True, False]
+    assert added[0][1] < added[1][1] and added[2][1] is None
+    assert backend.has_submissions()
+
+    # Every submission is logged, duplicates included; the mark resumes after them
+    entries, start, end = backend.read_submissions(0)
+    assert entries == [("a@x.edu", "one"), ("b@x.edu", "two"), ("a@x.edu", "one")]
+    backend.add_submission(submission("c@x.edu", "three"))
+    assert backend.read_submissions(end)[0] == [("c@x.edu", "three")]
+
+
+def test_scan_filters_and_lookups(backend):
+    ids = [backend.add_submission(submission(email, f"text {day}", day))[1]
+           for day, email in enumerate(["a@x.edu", "b@x.edu", "a@x.edu"], start=1)]
+
+    assert [entry_id for entry_id, _ in backend.scan_transcripts()] == ids
+    assert [entry_id for entry_id, _ in backend.scan_transcripts(email="a@x.edu")] == [ids[0], ids[2]]
+    assert [entry_id for entry_id, _ in backend.scan_transcripts(start=ids[1])] == ids[1:]
+    assert [e["email"] for _, e in backend.scan_transcripts(since="2026-01-02", until="2026-01-02T23:59")] == \
+        ["b@x.edu"]
+    assert backend.get_transcript(ids[1])["transcript"] == "text 2"
+    assert backend.is_transcript_id(ids[2]) and not backend.is_transcript_id(ids[2] + 100)
+
+
+def test_scored_index(backend):
+    assert backend.mark_scored([{"transcript_id": "t1", "email": "a@x.edu"}, {"email": "no id"}]) == 1
+    backend.mark_scored([{"transcript_id": "t2", "email": "b@x.edu", "evaluated_at": "2026-01-02"}])
+    assert backend.load_scored_ids() == {"t1", "t2"}
+
+
+def test_import_files_keeps_ids_and_translates_the_high_water_mark(tmp_path, file_paths):
+    files = FileStorage()
+    for email, text in (("a@x.edu", "one"), ("b@x.edu", "two"), ("a@x.edu", "one"), ("c@x.edu", "three")):
+        files.add_submission(submission(email, text))
+    files.mark_scored([{"transcript_id": "t1", "email": "a@x.edu"}])
+    # The file backend handed out the first two submissions already
+    first_two = files.read_submissions(0)[0][:2]
+    state = {"submissions_offset": _offset_after(2)}
+
+    db = SQLiteStorage(str(tmp_path / "skillscope.db"))
+    counts = db.import_files(state)
+
+    assert counts == {"submissions": 4, "transcripts": 3, "scored": 1}
+    assert [entry_id for entry_id, _ in db.scan_transcripts()] == [entry_id for entry_id, _ in files.scan_transcripts()]
+    assert db.load_scored_ids() == {"t1"}
+    assert state["submissions_rowid"] == 2
+    assert db.read_submissions(0)[0][:2] == first_two
+    assert db.read_submissions(state["submissions_rowid"])[0] == [("a@x.edu", "one"), ("c@x.edu", "three")]
+
+    with pytest.raises(StorageError):
+        db.import_files()
+
+
+def _offset_after(count):
+    """Byte offset just past the first count submission lines."""
+    offset = 0
+    for _, (line_offset, line) in zip(range(count), storage.submissions_log.iter_lines()):
+        offset = line_offset + len(line)
+    return offset
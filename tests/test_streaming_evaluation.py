@@ -0,0 +1,81 @@
+# tests/test_streaming_evaluation.py
+
+import json
+
+import pytest
+
+from backend import eval_cache
+from backend import llm_assess_interviews as llm
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Beginning,1,Hard to follow.\nClarity,Proficient,3,Clear answer.\n"
+REPLY = json.dumps({"skills": [{"skill": "Clarity", "level": "Proficient", "score": 3}], "feedback": "Clear."})
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """Streaming with the API replaced: replies[text] is streamed word by word; saves are recorded."""
+    monkeypatch.setattr(eval_cache, "CACHE_DIR", str(tmp_path / "evaluations"))
+    state = {"replies": {}, "streamed": [], "saved": [], "repaired": []}
+
+    def fake_stream(system_prompt, user_content, model, response_format=None):
+        text = user_content.rsplit("\n", 1)[-1]
+        state["streamed"].append(text)
+        reply = state["replies"].get(text, REPLY)
+        for i in range(0, len(reply), 10):
+            yield reply[i:i + 10]
+
+    def fake_repair(reply, compiled, model):
+        state["repaired"].append(reply)
+        return REPLY
+
+    monkeypatch.setattr(llm, "stream_chat", fake_stream)
+    monkeypatch.setattr(llm, "repair_reply", fake_repair)
+    monkeypatch.setattr(llm, "save_results", lambda results, rubric_hash, model: state["saved"].append(results)
+                        or str(tmp_path / "llm_eval_responses_x.jsonl"))
+    return state
+
+
+def block(*texts):
+    return {"rubric_csv": RUBRIC, "transcripts": [{"email": f"{t}@x.edu", "name": t, "transcript": t} for t in texts]}
+
+
+def test_tokens_then_result_then_done(model):
+    events = list(llm.stream_evaluation(block("alpha")))
+
+    kinds = [event["event"] for event in events]
+    assert kinds[-2:] == ["result", "done"] and set(kinds[:-2]) == {"token"}
+    assert "".join(event["text"] for event in events if event["event"] == "token") == REPLY
+    result = events[-2]
+    assert (result["index"], result["name"], result["cached"], result["overall_score"]) == (0, "alpha", False, 3)
+    assert events[-1] == {"event": "done", "evaluated": 1, "results_file": "llm_eval_responses_x.jsonl"}
+    assert [r["email"] for r in model["saved"][0]] == ["alpha@x.edu"]
+
+
+def test_cached_transcripts_skip_the_stream(model):
+    list(llm.stream_evaluation(block("alpha"), save=False))
+    events = list(llm.stream_evaluation(block("alpha", "beta"), save=False))
+
+    assert model["streamed"] == ["alpha", "beta"]
+    results = {event["index"]: event for event in events if event["event"] == "result"}
+    assert results[0]["cached"] and not results[1]["cached"]
+    assert {event["index"] for event in events if event["event"] == "token"} == {1}
+    assert model["saved"] == []
+
+
+def test_off_schema_stream_is_repaired_before_caching(model):
+    model["replies"]["alpha"] = "I think it was pretty clear overall."
+    events = list(llm.stream_evaluation(block("alpha"), save=False))
+
+    assert model["repaired"] == ["I think it was pretty clear overall."]
+    assert events[-2]["score_status"] == "valid"
+    assert eval_cache.peek(eval_cache.cache_key(RUBRIC, llm.compile_rubric(RUBRIC).system_prompt(
+        llm.registry.DEFAULT_PROMPT), "gpt-4", "alpha")) == REPLY
+
+
+def test_evaluate_transcript_route_streams_ndjson(model, client):
+    res = client.post("/evaluate-transcript", json={"rubric": RUBRIC, "transcript": "alpha", "stream": True})
+    assert res.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert events[0] == {"event": "start", "total": 1}
+    assert [event["event"] for event in events][-2:] == ["result", "done"]
+    assert events[-2]["email"] == "anonymous"
@@ -0,0 +1,71 @@
+# tests/test_structured_scores.py
+
+import json
+
+import pytest
+
+from backend.rubric import compile_rubric
+from backend.structured_scores import ScoreParseError, parse_scores, result_fields
+
+RUBRIC = """Skill,Level,Score,Description
+Clarity,Beginning,1,Hard to follow.
+Clarity,Proficient,3,Clear answer.
+Depth,Beginning,1,Surface level.
+Depth,Proficient,3,Explains trade-offs.
+"""
+
+
+@pytest.fixture
+def compiled():
+    return compile_rubric(RUBRIC)
+
+
+def reply(*skills, feedback="Good."):
+    return json.dumps({"skills": [{"skill": s, "level": l, "score": n} for s, l, n in skills], "feedback": feedback})
+
+
+def test_valid_reply(compiled):
+    sheet = parse_scores(reply(("Clarity", "Proficient", 3), ("Depth", "Beginning", 1)), compiled)
+    assert sheet["status"] == "valid"
+    assert sheet["scores"] == {"Clarity": {"level": "Proficient", "score": 3},
+                               "Depth": {"level": "Beginning", "score": 1}}
+    assert sheet["overall_score"] == 2
+    assert sheet["max_score"] == 3
+
+
+def test_fences_and_trailing_commas_are_repaired(compiled):
+    text = '```json\n{"skills": [{"skill": "Clarity", "level": "Proficient", "score": 3,},' \
+           ' {"skill": "Depth", "level": "Proficient", "score": 3},], "feedback": "Fine",}\n```'
+    sheet = parse_scores(text, compiled)
+    assert sheet["status"] == "repaired"
+    assert sheet["overall_score"] == 3
+
+
+def test_level_case_and_disagreeing_score_are_repaired(compiled):
+    sheet = parse_scores(reply(("clarity", "proficient", 3), ("Depth", "Beginning", 3)), compiled)
+    assert sheet["status"] == "repaired"
+    # The level is the judgement: Depth's score is taken from the rubric row
+    assert sheet["scores"] == {"Clarity": {"level": "Proficient", "score": 3},
+                               "Depth": {"level": "Beginning", "score": 1}}
+
+
+def test_missing_and_unknown_skills(compiled):
+    sheet = parse_scores(reply(("Clarity", "Proficient", 3), ("Charisma", "Proficient", 3)), compiled)
+    assert sheet["status"] == "repaired"
+    assert sheet["missing"] == ["Depth"]
+    assert list(sheet["scores"]) == ["Clarity"]
+
+
+@pytest.mark.parametrize("text", ["no json here", reply(("Charisma", "Proficient", 3)), "[1, 2]"])
+def test_unusable_replies_raise(compiled, text):
+    with pytest.raises(ScoreParseError):
+        parse_scores(text, compiled)
+
+
+def test_result_fields(compiled):
+    fields = result_fields(reply(("Clarity", "Proficient", 3), ("Depth", "Proficient", 3)), compiled)
+    assert fields["score_status"] == "valid"
+    assert fields["rubric_hash"] == compiled.content_hash
+    assert fields["feedback"].startswith("Score: 3/3")
+    assert result_fields("[ERROR] boom", compiled) == {"feedback": "[ERROR] boom"}
+    assert result_fields("gibberish", compiled) == {"feedback": "gibberish", "score_status": "unparsed"}
@@ -0,0 +1,88 @@
+# tests/test_stub_openai.py
+
+import json
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from backend.rubric import compile_rubric
+from backend.structured_scores import parse_scores
+from benchmarks.stub_openai import start_stub_server
+
+RUBRIC = "Skill,Level,Score,Description\nClarity,Beginning,1,Hard to follow.\nClarity,Proficient,3,Clear answer.\n"
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**config):
+        server, base_url = start_stub_server(**dict({"latency": 0}, **config))
+        servers.append(server)
+        return server, openai.OpenAI(base_url=base_url, api_key="stub", max_retries=0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def chat(client, user_content, **kwargs):
+    system_prompt = compile_rubric(RUBRIC).system_prompt("Evaluate.")
+    return client.chat.completions.create(model="gpt-4", messages=[
+        {"role": "system", "content": system_prompt}, {"role": "user", "content": user_content}], **kwargs)
+
+
+def test_chat_completion_scores_against_the_rubric(stub):
+    server, client = stub()
+    first = chat(client, "My answer.")
+    reply = first.choices[0].message.content
+
+    sheet = parse_scores(reply, compile_rubric(RUBRIC))
+    assert sheet["status"] == "valid"
+    assert chat(client, "My answer.").choices[0].message.content == reply
+    assert first.usage.completion_tokens == 12
+    assert server.config.requests == 2
+
+
+def test_packed_prompt_gets_one_result_per_transcript(stub):
+    _, client = stub()
+    content = '<transcript id="0">\nfirst\n</transcript>\n\n<transcript id="1">\nsecond\n</transcript>'
+    results = json.loads(chat(client, content).choices[0].message.content)["results"]
+    assert [r["id"] for r in results] == ["0", "1"]
+    assert all(r["evaluation"]["skills"][0]["skill"] == "Clarity" for r in results)
+
+
+def test_streamed_completion_matches_the_plain_one(stub):
+    _, client = stub(token_interval=0)
+    plain = chat(client, "My answer.").choices[0].message.content
+    chunks = chat(client, "My answer.", stream=True, stream_options={"include_usage": True})
+    parts, usage = [], None
+    for chunk in chunks:
+        if chunk.choices:
+            parts.append(chunk.choices[0].delta.content or "")
+        usage = chunk.usage or usage
+    assert "".join(parts) == plain
+    assert usage.completion_tokens == 12
+
+
+def test_injected_rate_limits_and_errors(stub):
+    server, client = stub(rate_limit_rate=1.0)
+    with pytest.raises(openai.RateLimitError):
+        chat(client, "My answer.")
+    assert server.config.rate_limited == 1
+
+    server, client = stub(error_rate=1.0)
+    with pytest.raises(openai.InternalServerError):
+        chat(client, "My answer.")
+    assert server.config.errors == 1
+
+
+def test_transcription_segments_cover_the_audio(stub):
+    _, client = stub(audio_bytes_per_second=1000)
+    result = client.audio.transcriptions.create(model="whisper-1", file=("talk.mp3", b"\0" * 12000),
+                                                response_format="verbose_json")
+    assert result.duration >= 12
+    assert [(s.start, s.end) for s in result.segments][:2] == [(0.0, 5.0), (5.0, 10.0)]
+    assert result.segments[-1].end == result.duration
@@ -0,0 +1,151 @@
+# tests/test_transcript_store.py
+
+import json
+import os
+
+import pytest
+
+from backend import transcript_store
+
+
+@pytest.fixture(autouse=True)
+def store(transcript_dir):
+    return transcript_dir
+
+
+def entry(email, text, submitted_at="2026-01-01T00:00:00+00:00"):
+    return {"name": email.split("@")[0], "email": email, "transcript": text, "submitted_at": submitted_at}
+
+
+def test_append_assigns_increasing_ids_and_dedupes():
+    assert transcript_store.append_transcript(entry("a@x.edu", "one")) == (True, 0)
+    assert transcript_store.append_transcript(entry("b@x.edu", "two")) == (True, 1)
+    assert transcript_store.append_transcript(entry("a@x.edu", "one")) == (False, None)
+    # Same text from another student is a different transcript
+    assert transcript_store.append_transcript(entry("b@x.edu", "one")) == (True, 2)
+
+    assert transcript_store.get_entry(1)["transcript"] == "two"
+    assert transcript_store.get_entry(7) is None
+    assert transcript_store.is_entry_id(2) and not transcript_store.is_entry_id(3)
+
+
+def test_scan_filters_and_resumes_from_an_id():
+    for i, email in enumerate(["a@x.edu", "b@x.edu", "a@x.edu", "c@x.edu"]):
+        transcript_store.append_transcript(entry(email, f"text {i}", f"2026-01-0{i + 1}T00:00:00+00:00"))
+
+    assert [entry_id for entry_id, _, _ in transcript_store.scan()] == [0, 1, 2, 3]
+    assert [entry_id for entry_id, _, _ in transcript_store.scan(start=2)] == [2, 3]
+    assert [entry_id for entry_id, _, _ in transcript_store.scan(email="a@x.edu")] == [0, 2]
+    assert [entry_id for entry_id, _, _ in transcript_store.scan(email="a@x.edu", start=1)] == [2]
+    assert [entry_id for entry_id, _, _ in transcript_store.scan(since="2026-01-02", until="2026-01-03T23:59")] == [1, 2]
+
+
+def test_project_sets_the_id_and_limits_fields():
+    transcript_store.append_transcript(entry("a@x.edu", "one"))
+    stored = transcript_store.get_entry(0)
+    assert transcript_store.project(stored, 0, ["email"]) == {"email": "a@x.edu", "id": 0}
+
+
+def test_compact_keeps_ids(store):
+    for i in range(3):
+        transcript_store.append_transcript(entry(f"s{i}@x.edu", f"text {i}"))
+    # A duplicate and a malformed line written behind the store's back
+    with open(store["LOG_PATH"], "a") as f:
+        f.write(json.dumps(dict(entry("s0@x.edu", "text 0"), id=9)) + "\n")
+        f.write("{not json\n")
+
+    assert transcript_store.compact() == 3
+    assert [(entry_id, e["email"]) for entry_id, e in transcript_store.iter_entries()] == \
+        [(0, "s0@x.edu"), (1, "s1@x.edu"), (2, "s2@x.edu")]
+    assert transcript_store.append_transcript(entry("s3@x.edu", "text 3")) == (True, 3)
+
+
+def test_rebuild_numbers_entries_without_ids():
+    kept = transcript_store.rebuild([entry("a@x.edu", "one"), entry("a@x.edu", "one"),
+                                     {"email": "b@x.edu"}, entry("c@x.edu", "three")])
+    assert kept == 2
+    assert [entry_id for entry_id, _ in transcript_store.iter_entries()] == [0, 1]
+    assert transcript_store.get_entry(1)["email"] == "c@x.edu"
+
+
+def test_legacy_entries_keep_their_offset_as_id(store):
+    os.makedirs(store["TRANSCRIPT_DIR"])
+    offsets = []
+    with open(store["LOG_PATH"], "wb") as log, open(store["HASH_INDEX_PATH"], "w") as hashes, \
+            open(store["EMAIL_INDEX_PATH"], "w") as emails:
+        for email in ("a@x.edu", "b@x.edu"):
+            line = (json.dumps(entry(email, "legacy")) + "\n").encode()
+            offsets.append(log.tell())
+            emails.write(json.dumps({"email": email, "offset": log.tell(), "length": len(line)}) + "\n")
+            hashes.write(transcript_store.entry_hash(email, "legacy") + "\n")
+            log.write(line)
+
+    assert [entry_id for entry_id, _ in transcript_store.iter_entries()] == offsets
+    assert transcript_store.get_entry(offsets[1])["email"] == "b@x.edu"
+    added, new_id = transcript_store.append_transcript(entry("c@x.edu", "new"))
+    assert added and new_id == offsets[1] + 1
+
+    transcript_store.compact()
+    assert [entry_id for entry_id, _ in transcript_store.iter_entries()] == offsets + [new_id]
+
+
+def test_a_rebuild_by_another_process_is_noticed():
+    for i in range(2):
+        transcript_store.append_transcript(entry(f"s{i}@x.edu", f"text {i}"))
+    stale = {name: getattr(transcript_store, name) for name in
+             ("_hashes", "_hash_pos", "_hash_inode", "_emails", "_positions", "_email_pos", "_email_inode", "_next_id")}
+    stale = {name: value.copy() if hasattr(value, "copy") else value for name, value in stale.items()}
+
+    # Another process rebuilds into longer index files
+    transcript_store.rebuild([entry(f"t{i}@x.edu", f"rebuilt {i}") for i in range(3)])
+    for name, value in stale.items():
+        setattr(transcript_store, name, value)
+
+    assert transcript_store.ids_for_email("s0@x.edu") == []
+    assert transcript_store.get_entry(2)["email"] == "t2@x.edu"
+    assert transcript_store.append_transcript(entry("s0@x.edu", "text 0")) == (True, 3)
+
+
+@pytest.fixture
+def stored():
+    for i, email in enumerate(["a@x.edu", "b@x.edu", "a@x.edu", "c@x.edu", "b@x.edu"]):
+        transcript_store.append_transcript(entry(email, f"text {i}", f"2026-01-0{i + 1}T00:00:00+00:00"))
+
+
+def test_transcripts_route_pages_with_a_cursor(client, stored):
+    first = client.get("/transcripts?limit=2&fields=email").get_json()
+    assert first == {"items": [{"email": "a@x.edu", "id": 0}, {"email": "b@x.edu", "id": 1}], "next_cursor": 2}
+
+    second = client.get("/transcripts?limit=2&fields=email&cursor=2").get_json()
+    assert [item["id"] for item in second["items"]] == [2, 3]
+    last = client.get(f"/transcripts?limit=2&cursor={second['next_cursor']}").get_json()
+    assert [item["id"] for item in last["items"]] == [4]
+    assert last["next_cursor"] is None
+    assert last["items"][0]["transcript"] == "text 4"
+
+
+def test_transcripts_route_filters(client, stored):
+    def ids(query):
+        return [item["id"] for item in client.get(f"/transcripts?{query}").get_json()]
+
+    assert ids("") == [0, 1, 2, 3, 4]
+    assert ids("email=b@x.edu") == [1, 4]
+    assert ids("since=2026-01-02&until=2026-01-03T23:59") == [1, 2]
+    assert ids("email=a@x.edu&offset=1") == [2]
+
+
+def test_transcripts_route_streams_ndjson(client, stored):
+    res = client.get("/transcripts?format=ndjson&limit=3&fields=name")
+    assert res.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert lines == [{"name": "a", "id": 0}, {"name": "b", "id": 1}, {"name": "a", "id": 2}]
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=0", "cursor=99"])
+def test_transcripts_route_rejects_bad_parameters(client, stored, query):
+    assert client.get(f"/transcripts?{query}").status_code == 400
+
+
+def test_single_transcript_route(client, stored):
+    assert client.get("/transcripts/3").get_json()["email"] == "c@x.edu"
+    assert client.get("/transcripts/42").status_code == 404
@@ -0,0 +1,94 @@
+# tests/test_transcription.py
+
+import io
+import time
+
+import pytest
+
+from backend import transcription
+
+
+class FakeWhisper:
+    """Just enough of the OpenAI client for transcribe_file: one segment per call."""
+
+    def __init__(self):
+        self.calls = 0
+        self.audio = self
+        self.transcriptions = self
+
+    def create(self, model, file, **kwargs):
+        self.calls += 1
+        return {"text": "hello there", "segments": [{"start": 0.0, "end": 1.5, "text": " hello there "}]}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcription, "CACHE_DIR", str(tmp_path / "audio_cache"))
+    monkeypatch.setattr(transcription.rate_limiter, "LIMITS", {})
+    return tmp_path / "audio_cache"
+
+
+def test_plan_segments_overlaps_neighbours():
+    assert transcription.plan_segments(300, segment_seconds=600) == [(0.0, 300)]
+    plan = transcription.plan_segments(1500, segment_seconds=600, overlap_seconds=10)
+    assert plan == [(0.0, 600), (590.0, 600), (1180.0, 320)]
+
+
+def test_merge_segments_cuts_overlaps_at_their_midpoint():
+    pieces = [
+        (0.0, {"segments": [{"start": 0.0, "end": 4.0, "text": "one"}, {"start": 596.0, "end": 599.0, "text": "two"}]}),
+        # Starts inside the overlap (590-600): "two" again, then "three"
+        (590.0, {"segments": [{"start": 6.0, "end": 9.0, "text": "two"}, {"start": 20.0, "end": 25.0, "text": "three"}]}),
+    ]
+    text, segments = transcription.merge_segments(pieces, overlap_seconds=10)
+    assert text == "one two three"
+    assert [s["start"] for s in segments] == [0.0, 596.0, 610.0]
+
+
+def test_merge_segments_keeps_text_without_segments():
+    text, segments = transcription.merge_segments([(0.0, {"text": " just text "})])
+    assert text == "just text" and segments == [{"start": 0.0, "end": None, "text": "just text"}]
+
+
+def test_transcribe_file_caches_by_content_hash(tmp_path):
+    path = tmp_path / "a.webm"
+    path.write_bytes(b"recording")
+    client = FakeWhisper()
+
+    first = transcription.transcribe_file(str(path), client=client)
+    again = transcription.transcribe_file(str(path), client=client)
+    assert first["cached"] is False and again["cached"] is True
+    assert again["segments"] == [{"start": 0.0, "end": 1.5, "text": "hello there"}]
+    assert client.calls == 1
+
+    # A normalized copy is looked up under the original's hash
+    copy = tmp_path / "a.ogg"
+    copy.write_bytes(b"normalized")
+    assert transcription.transcribe_file(str(copy), client=client, content_hash=first["audio_hash"])["cached"]
+    assert transcription.transcribe_file(str(path), client=client, bypass_cache=True)["cached"] is False
+    assert client.calls == 2
+
+
+def test_upload_audio_returns_a_job_that_resolves_to_segments(client, audio_dir, tmp_path, monkeypatch):
+    import server
+
+    (tmp_path / "uploads").mkdir(exist_ok=True)
+    monkeypatch.setattr(server, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    whisper = FakeWhisper()
+    original = transcription.transcribe_file
+    monkeypatch.setattr(transcription, "transcribe_file", lambda path, **kwargs: original(path, client=whisper, **kwargs))
+
+    response = client.post("/upload-audio", data={"filename": "s1.webm", "audio": (io.BytesIO(b"speech"), "s1.webm")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["processing"] and body["status_url"] == f"/transcriptions/{body['job_id']}"
+
+    deadline = time.time() + 5
+    while (status := client.get(body["status_url"]).get_json())["status"] == "processing" and time.time() < deadline:
+        time.sleep(0.01)
+    assert status["status"] == "done"
+    assert status["transcript"] == {"text": "hello there", "speaker_labels": [],
+                                    "segments": [{"start": 0.0, "end": 1.5, "text": "hello there"}]}
+    assert status["audio"]["duplicate"] is False
+    assert client.get("/transcriptions/" + "0" * 32).status_code == 404
@@ -0,0 +1,11 @@
+# wsgi.py
+
+"""
+Production entry point: `gunicorn wsgi:app` (settings in gunicorn.conf.py,
+which gunicorn reads from the working directory). `python server.py` is
+still the debug server.
+"""
+
+from server import app
+
+__all__ = ["app"]